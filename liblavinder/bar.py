@@ -137,6 +137,10 @@ STRETCH = Obj("STRETCH")
 CALCULATED = Obj("CALCULATED")
 STATIC = Obj("STATIC")
 
+# Reasons for which a widget can ask to be redrawn
+CONTENT = Obj("CONTENT")
+GEOMETRY = Obj("GEOMETRY")
+
 
 class Bar(Gap, configurable.Configurable):
     """A bar, which can contain widgets
@@ -162,6 +166,14 @@ class Bar(Gap, configurable.Configurable):
         self.saved_focus = None
 
         self.queued_draws = 0
+        # damage accumulated since the last frame was drawn
+        self._full_redraw = False
+        self._geometry_damaged = False
+        self._damaged = set()
+        # the (offset, length) of each widget as of the last layout
+        self._layout = []
+        self.full_redraws = 0
+        self.partial_redraws = 0
 
     def _configure(self, lavinder, screen):
         Gap._configure(self, lavinder, screen)
@@ -201,7 +213,7 @@ class Bar(Gap, configurable.Configurable):
         for i in self.widgets:
             lavinder.register_widget(i)
             i._configure(lavinder, self)
-        self._resize(self.length, self.widgets)
+        self._layout_widgets()
 
     def finalize(self):
         self.drawer.finalize()
@@ -231,6 +243,14 @@ class Bar(Gap, configurable.Configurable):
                 i.offsety = offset
                 offset += i.length
 
+    def _layout_widgets(self):
+        self._resize(self.length, self.widgets)
+        self._layout = [(i.offset, i.length) for i in self.widgets]
+        # each widget draws to a pixmap of its own size, so it has to follow
+        # the widget's length around
+        for i in self.widgets:
+            i.drawer.resize(i.width, i.height)
+
     def handle_Expose(self, e):  # noqa: N802
         self.draw()
 
@@ -281,17 +301,53 @@ class Bar(Gap, configurable.Configurable):
             self.saved_focus.window.set_input_focus()
 
     def draw(self):
+        """Schedule a redraw of the whole bar"""
+        self._full_redraw = True
+        self._queue_draw()
+
+    def damage(self, widget, reason=CONTENT):
+        """Schedule a redraw of a single widget
+
+        The reason is CONTENT if only what the widget displays changed, or
+        GEOMETRY if its length may have changed too, in which case the
+        widgets it pushes around are redrawn as well.
+        """
+        if reason is GEOMETRY:
+            self._geometry_damaged = True
+        self._damaged.add(widget)
+        self._queue_draw()
+
+    def _queue_draw(self):
         if self.queued_draws == 0:
-            self.lavinder.call_soon(self._actual_draw)
+            self.lavinder.schedule_redraw(self._actual_draw)
         self.queued_draws += 1
 
     def _actual_draw(self):
         self.queued_draws = 0
-        self._resize(self.length, self.widgets)
-        for i in self.widgets:
+        damaged, self._damaged = self._damaged, set()
+        if self._full_redraw:
+            self.full_redraws += 1
+            self._full_redraw = self._geometry_damaged = False
+            self._layout_widgets()
+            widgets = self.widgets
+            redraw_end = True
+        else:
+            self.partial_redraws += 1
+            old_layout = self._layout
+            if self._geometry_damaged:
+                self._geometry_damaged = False
+                self._layout_widgets()
+            widgets = [
+                w for w, old, new in zip(self.widgets, old_layout, self._layout)
+                if w in damaged or old != new
+            ]
+            redraw_end = old_layout[-1:] != self._layout[-1:]
+
+        for i in widgets:
             i.draw()
-        if self.widgets:
-            end = i.offset + i.length
+        if self.widgets and redraw_end:
+            offset, length = self._layout[-1]
+            end = offset + length
             if end < self.length:
                 if self.horizontal:
                     self.drawer.draw(offsetx=end, width=self.length - end)
@@ -306,7 +362,11 @@ class Bar(Gap, configurable.Configurable):
             height=self.height,
             position=self.position,
             widgets=[i.info() for i in self.widgets],
-            window=self.window.window.wid
+            window=self.window.window.wid,
+            redraws=dict(
+                full=self.full_redraws,
+                partial=self.partial_redraws,
+            ),
         )
 
     def is_show(self):
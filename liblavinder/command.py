@@ -19,10 +19,12 @@
 # SOFTWARE.
 
 import abc
+import functools
 import inspect
 import traceback
 import os
 
+from . import hook
 from . import ipc
 from .utils import get_cache_dir
 from .log_utils import logger
@@ -49,6 +51,28 @@ EXCEPTION = 2
 
 SOCKBASE = "lavindersocket.%s"
 
+# Marks a batch request: (BATCH, [(selectors, name, args, kwargs), ...])
+BATCH = "batch"
+# Commands that tear down the IPC server, which only one-shot calls handle
+UNBATCHABLE = frozenset(["restart", "shutdown"])
+
+
+def _event_arg(obj):
+    """Make a hook argument JSON serializable for event subscribers"""
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return [_event_arg(i) for i in obj]
+    if isinstance(obj, dict):
+        return {str(k): _event_arg(v) for k, v in obj.items()}
+    wid = getattr(getattr(obj, "window", None), "wid", None)
+    if wid is not None:
+        return dict(id=wid, name=getattr(obj, "name", None))
+    name = getattr(obj, "name", None)
+    if isinstance(name, str):
+        return dict(name=name)
+    return None
+
 
 def format_selectors(lst):
     """
@@ -71,6 +95,7 @@ class _Server(ipc.Server):
             os.unlink(fname)
         ipc.Server.__init__(self, fname, self.call, eventloop)
         self.lavinder = lavinder
+        self._hook_listeners = {}
         self.widgets = {}
         for i in conf.screens:
             for j in i.gaps:
@@ -79,8 +104,75 @@ class _Server(ipc.Server):
                         if w.name:
                             self.widgets[w.name] = w
 
+    def check_topics(self, topics):
+        """Subscriptions are for hook events, see liblavinder.hook.subscribe"""
+        for topic in topics:
+            if not isinstance(topic, str) or topic not in hook.subscribe.hooks:
+                return "Unknown event: %s" % (topic,)
+
+    def subscribe_hooks(self, topics):
+        """Forward the hook events of topics to the subscribed clients"""
+        for topic in topics:
+            listener = self._hook_listeners.get(topic)
+            if listener is None:
+                listener = functools.partial(self.publish_hook, topic)
+                self._hook_listeners[topic] = listener
+            hook.subscribe._subscribe(topic, listener)
+
+    def publish_hook(self, event, *args, **kwargs):
+        """Forward a fired hook event to its subscribers
+
+        Besides the serialized hook arguments, each message says which group
+        and window have the focus, which is what most subscribers would
+        otherwise have to ask for right after each event.
+        """
+        if not self.has_subscribers(event):
+            return
+        screen = getattr(self.lavinder, "current_screen", None)
+        group = screen.group if screen is not None else None
+        window = group.current_window if group is not None else None
+        args = [_event_arg(i) for i in args]
+        msg = dict(
+            event=event,
+            args=args,
+            group=group.name if group is not None else None,
+            window=window.window.wid if window is not None else None,
+        )
+        key = None
+        if args and isinstance(args[0], dict):
+            key = args[0].get("id", args[0].get("name"))
+        self.publish(event, msg, key)
+
     def call(self, data):
-        selectors, name, args, kwargs = data
+        if data[0] == BATCH:
+            return self.call_batch(data[1])
+        return self.call_one(*data)
+
+    def call_batch(self, calls):
+        """Run a list of command tuples in one go
+
+        The commands are run in order within the same event loop turn. The
+        result is a list of per-command (state, value) pairs, so a failing
+        command does not prevent the following ones from running. Restarting
+        or shutting down is refused, as the server would go away halfway.
+        """
+        if not isinstance(calls, (list, tuple)):
+            return (ERROR, "Batch must be a list of commands.")
+        results = []
+        for call in calls:
+            # call_one reports the errors of the command itself, only a
+            # malformed selector or command name gets through
+            try:
+                selectors, name, args, kwargs = call
+                if name in UNBATCHABLE:
+                    results.append((ERROR, "%s cannot be batched." % name))
+                    continue
+                results.append(self.call_one(selectors, name, args, kwargs))
+            except (TypeError, ValueError):
+                results.append((ERROR, "Invalid command: %r" % (call,)))
+        return (SUCCESS, results)
+
+    def call_one(self, selectors, name, args, kwargs):
         try:
             obj = self.lavinder.select(selectors)
         except _SelectError as v:
@@ -240,11 +332,16 @@ def find_sockfile(display=None):
 
 
 class Client(_CommandRoot):
-    """Exposes a command tree used to communicate with a running instance of Lavinder"""
-    def __init__(self, fname=None, is_json=False):
+    """Exposes a command tree used to communicate with a running instance of Lavinder
+
+    With persistent=True all calls share one multiplexed connection to the
+    server instead of connecting once per call. With binary=True messages use
+    the compact binary encoding of liblavinder.ipc_codec instead of marshal.
+    """
+    def __init__(self, fname=None, is_json=False, persistent=False, binary=False):
         if not fname:
             fname = find_sockfile()
-        self.client = ipc.Client(fname, is_json)
+        self.client = ipc.Client(fname, is_json, persistent, binary)
         _CommandRoot.__init__(self)
 
     def call(self, selectors, name, *args, **kwargs):
@@ -256,6 +353,46 @@ class Client(_CommandRoot):
         else:
             raise CommandException(val)
 
+    def batch(self, calls):
+        """Run several commands with a single request to the server
+
+        Each call is either a lazy call, e.g. ``lazy.group["1"].info()``, or
+        a (selectors, name, args, kwargs) tuple. Returns the list of results
+        in the same order; a command that failed has a CommandError or
+        CommandException instance in place of its result.
+        """
+        data = []
+        for call in calls:
+            if isinstance(call, _Call):
+                call = (call.selectors, call.name, call.args, call.kwargs)
+            data.append(tuple(call))
+        state, val = self.client.call((BATCH, data))
+        if state != SUCCESS:
+            raise CommandError(val)
+
+        results = []
+        for state, result in val:
+            if state == ERROR:
+                result = CommandError(result)
+            elif state == EXCEPTION:
+                result = CommandException(result)
+            results.append(result)
+        return results
+
+    def subscribe(self, *events):
+        """Yield hook events as they are fired in the running Lavinder
+
+        Each event is a dictionary with the event name, its serialized
+        arguments and the names of the focused group and window, e.g.::
+
+            for event in Client().subscribe("focus_change", "setgroup"):
+                print(event["event"], event["group"], event["window"])
+
+        If the client does not keep up, older events of the same kind are
+        replaced by newer ones, and a client far behind is disconnected.
+        """
+        return self.client.subscribe(events)
+
 
 class CommandRoot(_CommandRoot):
     def __init__(self, lavinder):
@@ -52,6 +52,9 @@ class Config:
         "widget_defaults",
         "extension_defaults",
         "bring_front_click",
+        "coalesce_events",
+        "frame_rate",
+        "relayout_grab_server",
         "wmname",
     ]
 
@@ -21,6 +21,7 @@
 from liblavinder.dgroups import DGroups
 from xcffib.xproto import EventMask, WindowError, AccessError, DrawableError
 import asyncio
+import collections
 import functools
 import io
 import logging
@@ -46,6 +47,7 @@ from ..utils import LavinderError, get_cache_dir
 from ..widget.base import _Widget
 from ..extension.base import _Extension
 from .. import command
+from .. import drawer
 from .. import hook
 from .. import utils
 from .. import window
@@ -64,6 +66,91 @@ def _import_module(module_name, dir_path):
     return module
 
 
+# Certain events expose the affected window id as an "event" attribute.
+_EVENT_EVENTS = frozenset([
+    "EnterNotify",
+    "ButtonPress",
+    "ButtonRelease",
+    "KeyPress",
+])
+
+
+# Events that have to be handled in the order they arrive; nothing is
+# coalesced across them.
+_BARRIER_EVENTS = frozenset([
+    xcffib.xproto.MapRequestEvent,
+    xcffib.xproto.MapNotifyEvent,
+    xcffib.xproto.UnmapNotifyEvent,
+    xcffib.xproto.DestroyNotifyEvent,
+    xcffib.xproto.ReparentNotifyEvent,
+    xcffib.xproto.ButtonPressEvent,
+    xcffib.xproto.ButtonReleaseEvent,
+    xcffib.xproto.KeyPressEvent,
+])
+
+# ConfigureRequest value_mask bits and the event fields they cover
+_CONFIGURE_FIELDS = (
+    (xcffib.xproto.ConfigWindow.X, "x"),
+    (xcffib.xproto.ConfigWindow.Y, "y"),
+    (xcffib.xproto.ConfigWindow.Width, "width"),
+    (xcffib.xproto.ConfigWindow.Height, "height"),
+    (xcffib.xproto.ConfigWindow.BorderWidth, "border_width"),
+    (xcffib.xproto.ConfigWindow.Sibling, "sibling"),
+    (xcffib.xproto.ConfigWindow.StackMode, "stack_mode"),
+)
+
+
+def coalesce_events(events):
+    """Drop the events of a batch that are superseded by a later one
+
+    Only the last MotionNotify per window, the last PropertyNotify per
+    (window, atom) and the last ConfigureRequest per window are kept. Fields
+    of a dropped ConfigureRequest that the kept one does not set are merged
+    into the kept one, so no requested change is lost. Nothing is coalesced
+    across the events in `_BARRIER_EVENTS`.
+
+    Returns a `(events, dropped)` tuple.
+    """
+    kept = []
+    motion = set()
+    properties = set()
+    configures = {}
+    # walk backwards, so the first event seen for a key is the one to keep
+    for e in reversed(events):
+        cls = e.__class__
+        if cls is xcffib.xproto.MotionNotifyEvent:
+            if e.event in motion:
+                continue
+            motion.add(e.event)
+        elif cls is xcffib.xproto.PropertyNotifyEvent:
+            key = (e.window, e.atom)
+            if key in properties:
+                continue
+            properties.add(key)
+        elif cls is xcffib.xproto.ConfigureRequestEvent:
+            later = configures.get(e.window)
+            if later is not None:
+                for bit, field in _CONFIGURE_FIELDS:
+                    if e.value_mask & bit and not later.value_mask & bit:
+                        setattr(later, field, getattr(e, field))
+                        later.value_mask |= bit
+                continue
+            configures[e.window] = e
+        elif cls in _BARRIER_EVENTS:
+            motion.clear()
+            properties.clear()
+            configures.clear()
+        kept.append(e)
+    kept.reverse()
+    return kept, len(events) - len(kept)
+
+
+@functools.lru_cache(maxsize=None)
+def _class_handler(cls, handler):
+    """Return the `handle_X` function defined on a window class, or None"""
+    return getattr(cls, handler, None)
+
+
 class Lavinder(command.CommandObject):
     """This object is the `root` of the command graph"""
     def __init__(
@@ -75,6 +162,9 @@ class Lavinder(command.CommandObject):
         no_spawn=False,
         state=None
     ):
+        self._startup_time = time.monotonic()
+        # seconds from start to some points of interest, for lavinder_info()
+        self.startup_timings = {}
         self._restart = False
         self.no_spawn = no_spawn
 
@@ -183,6 +273,19 @@ class Lavinder(command.CommandObject):
                 self.groups.append(sp)
                 self.groups_map[sp.name] = sp
 
+        # the layouts look their border colours up on every relayout
+        self._alloc_border_colors()
+
+        # redraws of bars and panels are batched into frames of at most
+        # frame_rate per second
+        frame_rate = getattr(config, "frame_rate", 60)
+        self.frame_interval = 1.0 / frame_rate if frame_rate else 0
+        self._redraws = collections.OrderedDict()
+        self._frame_handle = None
+        self._last_frame = 0
+        self.frames = 0
+        self.redraw_requests = 0
+
         self.setup_eventloop()
         self.server = command._Server(self.fname, self, config, self._eventloop)
 
@@ -203,6 +306,20 @@ class Lavinder(command.CommandObject):
             xcffib.xproto.FocusInEvent,
             xcffib.xproto.NoExposureEvent
         ])
+        # event class -> (ename, handler name, window attribute, our handler)
+        self._event_dispatch = {}
+        self.coalesce_events = getattr(config, "coalesce_events", True)
+        self.events_coalesced = 0
+        # round trips spent in manage(), for lavinder_info()
+        self.managed_windows = 0
+        self.manage_round_trips = 0
+        # the Relayout that window changes are batched into, if any
+        self.relayout = None
+        # the number of relayouts, and the X requests and seconds the last
+        # one took
+        self.relayouts = 0
+        self.relayout_requests = 0
+        self.relayout_time = 0
 
         self.conn.flush()
         self.conn.xsync()
@@ -211,6 +328,9 @@ class Lavinder(command.CommandObject):
         # Map and Grab keys
         for key in self.config.keys:
             self.map_key(key)
+        # Make the bindings work while we are still scanning for windows
+        self.conn.flush()
+        self.startup_timings["grab_keys"] = time.monotonic() - self._startup_time
 
         # It fixes problems with focus when clicking windows of some specific clients like xterm
         def noop(lavinder):
@@ -239,6 +359,7 @@ class Lavinder(command.CommandObject):
                 logger.exception("failed restoring state")
 
         self.scan()
+        self.startup_timings["scan_complete"] = time.monotonic() - self._startup_time
         self.update_net_desktops()
         hook.subscribe.setgroup(self.update_net_desktops)
 
@@ -248,6 +369,7 @@ class Lavinder(command.CommandObject):
         }
         self.setup_selection()
         hook.fire("startup_complete")
+        self.startup_timings["startup_complete"] = time.monotonic() - self._startup_time
 
     def setup_selection(self):
         primary = self.conn.atoms["PRIMARY"]
@@ -529,9 +651,19 @@ class Lavinder(command.CommandObject):
                 return
             self.widgets_map[w.name] = w
 
-    @functools.lru_cache()
     def color_pixel(self, name):
-        return self.conn.screens[0].default_colormap.alloc_color(name).pixel
+        return self.conn.screens[0].default_colormap.pixel(name)
+
+    def _alloc_border_colors(self):
+        """Allocate the border colours of all the layouts in one go"""
+        colors = []
+        for layout in self.config.layouts + [self.config.floating_layout]:
+            for name in layout._variable_defaults:
+                if name.startswith("border_"):
+                    value = getattr(layout, name)
+                    if isinstance(value, str):
+                        colors.append(value)
+        self.conn.screens[0].default_colormap.alloc_pixels(colors)
 
     @property
     def current_layout(self):
@@ -546,20 +678,47 @@ class Lavinder(command.CommandObject):
         return self.current_screen.group.current_window
 
     def scan(self):
+        """Manage the windows that already exist when we start
+
+        The requests for all the windows are sent in two bursts, one to find
+        out which windows to manage and one for everything manage() needs,
+        rather than one round trip per window and property.
+        """
+        start = time.monotonic()
+        round_trips = self.conn.round_trips
         _, _, children = self.root.query_tree()
+
+        wm_state = [("WM_STATE", xcffib.xproto.GetPropertyType.Any)]
+        if sum(item.prefetch(wm_state, attributes=True) for item in children):
+            self.conn.round_trips += 1
+
+        candidates = []
         for item in children:
             try:
                 attrs = item.get_attributes()
                 state = item.get_wm_state()
             except (xcffib.xproto.WindowError, xcffib.xproto.AccessError):
+                item.clear_prefetch()
                 continue
 
-            if attrs and attrs.map_state == xcffib.xproto.MapState.Unmapped:
-                continue
-            if state and state[0] == window.WithdrawnState:
+            if attrs and attrs.map_state == xcffib.xproto.MapState.Unmapped or \
+                    state and state[0] == window.WithdrawnState:
+                item.clear_prefetch()
                 continue
+            candidates.append(item)
+
+        if sum(
+            item.prefetch(xcbq.MANAGE_PROPERTIES, geometry=True)
+            for item in candidates
+        ):
+            self.conn.round_trips += 1
+        for item in candidates:
             self.manage(item)
 
+        self.startup_timings["scan"] = time.monotonic() - start
+        self.startup_timings["scan_windows"] = len(candidates)
+        self.startup_timings["scan_round_trips"] = self.conn.round_trips - round_trips
+
     def unmanage(self, win):
         c = self.windows_map.get(win)
         if c:
@@ -600,6 +759,26 @@ class Lavinder(command.CommandObject):
         self.current_screen.resize()
 
     def manage(self, w):
+        """Manage the given xcbq.Window, returning its client object
+
+        All the properties needed to set up a new client are requested up
+        front, so that managing a window costs a single round trip to the X
+        server instead of one per property.
+        """
+        new = w.wid not in self.windows_map
+        round_trips = self.conn.round_trips
+        if new and w.prefetch(xcbq.MANAGE_PROPERTIES, attributes=True, geometry=True):
+            self.conn.round_trips += 1
+        try:
+            c = self._manage(w)
+        finally:
+            w.clear_prefetch()
+        if new and c is not None:
+            self.managed_windows += 1
+            self.manage_round_trips += self.conn.round_trips - round_trips
+        return c
+
+    def _manage(self, w):
         try:
             attrs = w.get_attributes()
             internal = w.get_property("QTILE_INTERNAL")
@@ -682,6 +861,32 @@ class Lavinder(command.CommandObject):
         for key in self.keys_map.values():
             self.map_key(key)
 
+    def _resolve_event(self, e):
+        """Build and cache the dispatch entry for the class of event `e`
+
+        The entry is an `(ename, handler, window_attr, manager_handler)` tuple,
+        where `handler` is the `handle_X` method name, `window_attr` is the
+        event attribute holding the affected window id (or None) and
+        `manager_handler` is our own bound handler (or None). Event classes
+        never change shape, so this only has to be done once per class.
+        """
+        cls = e.__class__
+        ename = cls.__name__
+        if ename.endswith("Event"):
+            ename = ename[:-5]
+        if hasattr(e, "window"):
+            window_attr = "window"
+        elif hasattr(e, "drawable"):
+            window_attr = "drawable"
+        elif ename in _EVENT_EVENTS:
+            window_attr = "event"
+        else:
+            window_attr = None
+        handler = "handle_%s" % ename
+        entry = (ename, handler, window_attr, getattr(self, handler, None))
+        self._event_dispatch[cls] = entry
+        return entry
+
     def get_target_chain(self, ename, e):
         """Returns a chain of targets that can handle this event
 
@@ -693,72 +898,129 @@ class Lavinder(command.CommandObject):
         of the handlers returns False or None, or the end of the chain is
         reached.
         """
-        chain = []
-        handler = "handle_%s" % ename
-        # Certain events expose the affected window id as an "event" attribute.
-        event_events = [
-            "EnterNotify",
-            "ButtonPress",
-            "ButtonRelease",
-            "KeyPress",
-        ]
-        if hasattr(e, "window"):
-            c = self.windows_map.get(e.window)
-        elif hasattr(e, "drawable"):
-            c = self.windows_map.get(e.drawable)
-        elif ename in event_events:
-            c = self.windows_map.get(e.event)
-        else:
-            c = None
+        entry = self._event_dispatch.get(e.__class__) or self._resolve_event(e)
+        _, handler, window_attr, manager_handler = entry
 
-        if c is not None and hasattr(c, handler):
-            chain.append(getattr(c, handler))
+        chain = []
+        if window_attr is not None:
+            c = self.windows_map.get(getattr(e, window_attr))
+            if c is not None and hasattr(c, handler):
+                chain.append(getattr(c, handler))
 
-        if hasattr(self, handler):
-            chain.append(getattr(self, handler))
+        if manager_handler is not None:
+            chain.append(manager_handler)
 
         if not chain:
             logger.info("Unhandled event: %r" % ename)
         return chain
 
-    def _xpoll(self):
+    def _dispatch_event(self, entry, e):
+        """Pass an event along its target chain, see `get_target_chain`
+
+        This is the allocation free equivalent of walking the list returned by
+        `get_target_chain`, used for every event read in `_xpoll`.
+        """
+        ename, handler, window_attr, manager_handler = entry
+        logger.debug("Handling: %s", ename)
+
+        found = False
+        if window_attr is not None:
+            c = self.windows_map.get(getattr(e, window_attr))
+            if c is not None:
+                # Handlers set on the instance win over the class ones, e.g.
+                # the ones Bar._configure installs on its window.Internal.
+                h = c.__dict__.get(handler)
+                if h is not None:
+                    found = True
+                    if not h(e):
+                        return
+                else:
+                    h = _class_handler(c.__class__, handler)
+                    if h is not None:
+                        found = True
+                        if not h(c, e):
+                            return
+
+        if manager_handler is not None:
+            manager_handler(e)
+        elif not found:
+            logger.info("Unhandled event: %r", ename)
+
+    def _handle_event(self, e):
+        if e.__class__ in self.ignored_events:
+            return
+        entry = self._event_dispatch.get(e.__class__)
+        if entry is None:
+            entry = self._resolve_event(e)
+        self._dispatch_event(entry, e)
+
+    def _connection_failed(self):
+        """Check for a broken X connection, shutting down if there is one"""
+        error_code = self.conn.conn.has_error()
+        if error_code:
+            error_string = xcbq.XCB_CONN_ERRORS[error_code]
+            logger.exception("Shutting down due to X connection error %s (%s)" % (error_string, error_code))
+            self.stop()
+            return True
+        return False
+
+    def _read_events(self):
+        """Read the next events off the X connection
+
+        Returns the next event in a list, or with `coalesce_events` set all
+        the queued events. An empty list means the queue is empty and None
+        that the connection is gone.
+        """
+        events = []
         while True:
             try:
                 e = self.conn.conn.poll_for_event()
-                if not e:
-                    break
-
-                ename = e.__class__.__name__
-
-                if ename.endswith("Event"):
-                    ename = ename[:-5]
-                if e.__class__ not in self.ignored_events:
-                    logger.debug(ename)
-                    for h in self.get_target_chain(ename, e):
-                        logger.debug("Handling: %s" % ename)
-                        r = h(e)
-                        if not r:
-                            break
-            # Catch some bad X exceptions. Since X is event based, race
-            # conditions can occur almost anywhere in the code. For
-            # example, if a window is created and then immediately
-            # destroyed (before the event handler is evoked), when the
-            # event handler tries to examine the window properties, it
-            # will throw a WindowError exception. We can essentially
-            # ignore it, since the window is already dead and we've got
-            # another event in the queue notifying us to clean it up.
+            # X errors for requests on windows that are already gone, see
+            # _xpoll.
             except (WindowError, AccessError, DrawableError):
-                pass
-
+                continue
             except Exception:
-                error_code = self.conn.conn.has_error()
-                if error_code:
-                    error_string = xcbq.XCB_CONN_ERRORS[error_code]
-                    logger.exception("Shutting down due to X connection error %s (%s)" % (error_string, error_code))
-                    self.stop()
-                    return
-
+                if self._connection_failed():
+                    return None
                 logger.exception("Got an exception in poll loop")
+                continue
+            if not e:
+                return events
+            events.append(e)
+            if not self.coalesce_events:
+                return events
+
+    def _xpoll(self):
+        while True:
+            events = self._read_events()
+            if events is None:
+                return
+            if not events:
+                break
+            if len(events) > 1:
+                events, dropped = coalesce_events(events)
+                if dropped:
+                    self.events_coalesced += dropped
+                    logger.debug("Coalesced %d X events", dropped)
+
+            for e in events:
+                try:
+                    self._handle_event(e)
+                # Catch some bad X exceptions. Since X is event based, race
+                # conditions can occur almost anywhere in the code. For
+                # example, if a window is created and then immediately
+                # destroyed (before the event handler is evoked), when the
+                # event handler tries to examine the window properties, it
+                # will throw a WindowError exception. We can essentially
+                # ignore it, since the window is already dead and we've got
+                # another event in the queue notifying us to clean it up.
+                except (WindowError, AccessError, DrawableError):
+                    pass
+
+                except Exception:
+                    if self._connection_failed():
+                        return
+                    logger.exception("Got an exception in poll loop")
         self.conn.flush()
 
     def graceful_shutdown(self):
@@ -1226,6 +1488,35 @@ class Lavinder(command.CommandObject):
             self.conn.flush()
         return self._eventloop.call_later(delay, f)
 
+    def schedule_redraw(self, func):
+        """ Ask for func to be called to paint something on the next frame.
+
+        Requests are collected until the frame is due, and a func requested
+        several times in the meantime is only called once. When nothing was
+        painted for a whole frame interval the frame is drawn as soon as the
+        event loop is idle, otherwise it waits for the rest of the interval.
+        """
+        self.redraw_requests += 1
+        self._redraws[func] = None
+        if self._frame_handle is not None:
+            return
+        delay = self._last_frame + self.frame_interval - self._eventloop.time()
+        if delay > 0:
+            self._frame_handle = self.call_later(delay, self._draw_frame)
+        else:
+            self._frame_handle = self.call_soon(self._draw_frame)
+
+    def _draw_frame(self):
+        self._frame_handle = None
+        self._last_frame = self._eventloop.time()
+        self.frames += 1
+        redraws, self._redraws = self._redraws, collections.OrderedDict()
+        for func in redraws:
+            try:
+                func()
+            except Exception:
+                logger.exception("Error redrawing with %s:", func)
+
     def run_in_executor(self, func, *args):
         """ A wrapper for running a function in the event loop's default
         executor. """
@@ -1575,8 +1866,78 @@ class Lavinder(command.CommandObject):
         ]
 
     def cmd_lavinder_info(self):
-        """Returns a dictionary of info on the Lavinder instance"""
-        return dict(socketname=self.fname)
+        """Returns a dictionary of info on the Lavinder instance
+
+        Besides the socket name this has some performance counters:
+
+            - events_coalesced: X events dropped by the `coalesce_events` stage
+            - manage_round_trips: average X round trips per managed window
+            - startup: seconds from start until the keys were grabbed
+              (grab_keys), the startup scan was done (scan_complete) and
+              startup completed (startup_complete), plus the time taken by
+              the scan itself and the windows and round trips it took
+            - subscriptions: clients subscribed to hook events over IPC,
+              the events published to them, and how many events were
+              coalesced or clients dropped because they were too slow
+            - render: the frames painted and the redraws requested of
+              them, see `frame_rate`
+            - text_layouts: the size of the cache of shaped text layouts
+              shared by all widgets, and its hits and misses
+            - text_surfaces: the same for the cache of pre-rendered text,
+              along with the memory it takes in bytes
+            - colors: the colours allocated for window borders, and the
+              round trips saved by looking them up again
+            - relayout: the number of group relayouts, and the X requests
+              the last one sent to configure, map, unmap and colour windows
+              and the seconds it took, see `relayout_grab_server`
+        """
+        if self.managed_windows:
+            manage_round_trips = self.manage_round_trips / self.managed_windows
+        else:
+            manage_round_trips = 0
+        colormap = self.conn.screens[0].default_colormap
+        return dict(
+            socketname=self.fname,
+            events_coalesced=self.events_coalesced,
+            manage_round_trips=manage_round_trips,
+            startup=self.startup_timings,
+            subscriptions=dict(
+                clients=len(set().union(*self.server.subscribers.values())),
+                published=self.server.published,
+                coalesced=self.server.coalesced,
+                dropped=self.server.dropped,
+            ),
+            render=dict(
+                frames=self.frames,
+                redraw_requests=self.redraw_requests,
+            ),
+            text_layouts=drawer.layout_cache.info(),
+            text_surfaces=drawer.text_surface_cache.info(),
+            colors=dict(
+                pixels=len(colormap.pixels),
+                round_trips_saved=colormap.hits,
+            ),
+            relayout=dict(
+                count=self.relayouts,
+                last_requests=self.relayout_requests,
+                last_time=self.relayout_time,
+            ),
+        )
+
+    def cmd_hook_stats(self, reset=False):
+        """Returns the time spent in each hook listener, slowest first
+
+        Each entry has the hook event, the listener name, the number of calls,
+        the total, average and maximum time per call in seconds, and the
+        number of calls that raised an exception. Use this to find slow hooks
+        in the config.
+
+        Parameters
+        ==========
+        reset :
+            Start counting again after returning the current numbers
+        """
+        return hook.stats(reset)
 
     def cmd_shutdown(self):
         """Quit Lavinder"""
@@ -208,6 +208,28 @@ SUPPORTED_ATOMS.extend(WindowTypes.keys())
 SUPPORTED_ATOMS.extend(net_wm_states)
 # SUPPORTED_ATOMS.extend(key for key in WindowStates.keys() if key)
 
+# The properties read while a new client is managed, as (property, type) pairs,
+# see Window.prefetch()
+MANAGE_PROPERTIES = (
+    ("QTILE_INTERNAL", "CARDINAL"),
+    ("_NET_WM_WINDOW_TYPE", "ATOM"),
+    ("_NET_WM_STATE", "ATOM"),
+    ("_NET_WM_DESKTOP", "CARDINAL"),
+    ("_NET_WM_PID", "CARDINAL"),
+    ("_NET_WM_ICON", "CARDINAL"),
+    ("_NET_WM_VISIBLE_NAME", "UTF8_STRING"),
+    ("_NET_WM_NAME", "UTF8_STRING"),
+    (xcffib.xproto.Atom.WM_NAME, "UTF8_STRING"),
+    (xcffib.xproto.Atom.WM_NAME, xcffib.xproto.GetPropertyType.Any),
+    ("WM_CLASS", "STRING"),
+    ("WM_WINDOW_ROLE", "STRING"),
+    ("WM_TRANSIENT_FOR", "WINDOW"),
+    ("WM_PROTOCOLS", "ATOM"),
+    ("WM_STATE", xcffib.xproto.GetPropertyType.Any),
+    ("WM_HINTS", xcffib.xproto.GetPropertyType.Any),
+    ("WM_NORMAL_HINTS", xcffib.xproto.GetPropertyType.Any),
+)
+
 XCB_CONN_ERRORS = {
     1: 'XCB_CONN_ERROR',
     2: 'XCB_CONN_CLOSED_EXT_NOTSUPPORTED',
@@ -257,28 +279,71 @@ ConfigureMasks = MaskMap(xcffib.xproto.ConfigWindow)
 AttributeMasks = MaskMap(CW)
 
 
+# Atoms interned when connecting, besides the ones named in PropertyMap,
+# WindowTypes and SUPPORTED_ATOMS
+PRELOAD_ATOMS = [
+    "UTF8_STRING",
+    "CLIPBOARD",
+    "WM_PROTOCOLS",
+    "WM_DELETE_WINDOW",
+    "WM_TAKE_FOCUS",
+    "WM_WINDOW_ROLE",
+    "_NET_WM_ICON",
+    "_NET_WM_USER_TIME",
+    "_NET_SYSTEM_TRAY_OPCODE",
+    "_XEMBED",
+    "_XEMBED_EMBEDDED_NOTIFY",
+]
+
+
+def _preload_names():
+    names = set(PRELOAD_ATOMS)
+    names.update(WindowTypes.keys())
+    names.update(SUPPORTED_ATOMS)
+    for name, (type, _) in PropertyMap.items():
+        names.add(name)
+        names.add(type)
+    return sorted(names)
+
+
 class AtomCache:
+    """Two way mapping between atom names and values
+
+    All the atoms lavinder uses are interned at once when connecting, which
+    costs a single round trip.
+    """
     def __init__(self, conn):
         self.conn = conn
         self.atoms = {}
         self.reverse = {}
 
-        # We can change the pre-loads not to wait for a return
-        for name in WindowTypes.keys():
-            self.insert(name=name)
-
         for i in dir(xcffib.xproto.Atom):
             if not i.startswith("_"):
                 self.insert(name=i, atom=getattr(xcffib.xproto.Atom, i))
 
+        self.intern(_preload_names())
+
+    def intern(self, names):
+        """Intern several atoms, waiting for all the replies at once"""
+        cookies = [
+            (name, self.conn.conn.core.InternAtom(False, len(name), name))
+            for name in names if name not in self.atoms
+        ]
+        for name, cookie in cookies:
+            self.insert(name=name, atom=cookie.reply().atom)
+        if cookies:
+            self.conn.round_trips += 1
+
     def insert(self, name=None, atom=None):
         assert name or atom
         if atom is None:
             c = self.conn.conn.core.InternAtom(False, len(name), name)
             atom = c.reply().atom
+            self.conn.round_trips += 1
         if name is None:
             c = self.conn.conn.core.GetAtomName(atom)
             name = c.reply().name.to_string()
+            self.conn.round_trips += 1
         self.atoms[name] = atom
         self.reverse[atom] = name
 
@@ -328,6 +393,10 @@ class Colormap:
     def __init__(self, conn, cid):
         self.conn = conn
         self.cid = cid
+        # colour -> pixel, as pixels are only valid for their colormap
+        self.pixels = {}
+        # lookups answered from pixels, each saving a round trip
+        self.hits = 0
 
     def alloc_color(self, color):
         """
@@ -338,13 +407,45 @@ class Colormap:
                 self.cid, len(color), color
             ).reply()
         except xcffib.xproto.NameError:
-
-            def x8to16(i):
-                return 0xffff * (i & 0xff) // 0xff
-            r = x8to16(int(color[-6] + color[-5], 16))
-            g = x8to16(int(color[-4] + color[-3], 16))
-            b = x8to16(int(color[-2] + color[-1], 16))
-            return self.conn.conn.core.AllocColor(self.cid, r, g, b).reply()
+            return self._alloc_rgb(color).reply()
+
+    def _alloc_rgb(self, color):
+        def x8to16(i):
+            return 0xffff * (i & 0xff) // 0xff
+        r = x8to16(int(color[-6] + color[-5], 16))
+        g = x8to16(int(color[-4] + color[-3], 16))
+        b = x8to16(int(color[-2] + color[-1], 16))
+        return self.conn.conn.core.AllocColor(self.cid, r, g, b)
+
+    def pixel(self, color):
+        """The pixel of color, which is only allocated the first time"""
+        pixel = self.pixels.get(color)
+        if pixel is None:
+            pixel = self.pixels[color] = self.alloc_color(color).pixel
+            self.conn.round_trips += 1
+        else:
+            self.hits += 1
+        return pixel
+
+    def alloc_pixels(self, colors):
+        """Allocate several colours, waiting for all the replies at once"""
+        cookies = [
+            (color, self.conn.conn.core.AllocNamedColor(self.cid, len(color), color))
+            for color in set(colors) if color not in self.pixels
+        ]
+        unnamed = []
+        for color, cookie in cookies:
+            try:
+                self.pixels[color] = cookie.reply().pixel
+            except xcffib.xproto.NameError:
+                try:
+                    unnamed.append((color, self._alloc_rgb(color)))
+                except (ValueError, IndexError):
+                    # not a colour, let pixel() complain when it's used
+                    pass
+        for color, cookie in unnamed:
+            self.pixels[color] = cookie.reply().pixel
+        self.conn.round_trips += bool(cookies) + bool(unnamed)
 
 
 class Xinerama:
@@ -443,6 +544,80 @@ class Window:
     def __init__(self, conn, wid):
         self.conn = conn
         self.wid = wid
+        self._prefetched = None
+
+    def prefetch(self, properties=(), attributes=False, geometry=False):
+        """Request several replies at once, without waiting for any of them
+
+        `properties` is a list of (property, type) pairs, as passed to
+        get_property(). get_property(), get_attributes() and get_geometry()
+        collect their replies from these requests instead of doing a round
+        trip each, and keep returning them until clear_prefetch() is called.
+        Setting a property drops its prefetched value.
+
+        Returns the number of requests sent. They are not waited for, so
+        prefetching for several windows before reading any of the replies
+        costs a single round trip in total.
+        """
+        if self._prefetched is None:
+            self._prefetched = {}
+        prefetched = self._prefetched
+        requested = len(prefetched)
+        core = self.conn.conn.core
+        atoms = self.conn.atoms
+
+        if attributes and "attributes" not in prefetched:
+            prefetched["attributes"] = core.GetWindowAttributes(self.wid)
+        if geometry and "geometry" not in prefetched:
+            prefetched["geometry"] = core.GetGeometry(self.wid)
+        for prop, type in properties:
+            if isinstance(prop, str):
+                prop = atoms[prop]
+            if isinstance(type, str):
+                type = atoms[type]
+            if (prop, type) not in prefetched:
+                prefetched[prop, type] = core.GetProperty(
+                    False, self.wid, prop, type, 0, (2 ** 32) - 1
+                )
+        return len(prefetched) - requested
+
+    def clear_prefetch(self):
+        """Drop the replies requested by prefetch()"""
+        if self._prefetched is None:
+            return
+        for reply in self._prefetched.values():
+            if isinstance(reply, xcffib.Cookie):
+                reply.discard_reply()
+        self._prefetched = None
+
+    def _drop_prefetched(self, prop):
+        for key in [k for k in self._prefetched if isinstance(k, tuple) and k[0] == prop]:
+            reply = self._prefetched.pop(key)
+            if isinstance(reply, xcffib.Cookie):
+                reply.discard_reply()
+
+    def _reply(self, key, request, *args):
+        """Return the reply to request(*args)
+
+        The reply is taken from the prefetched requests if `key` was
+        prefetched, see prefetch().
+        """
+        prefetched = self._prefetched
+        if prefetched is None or key not in prefetched:
+            self.conn.round_trips += 1
+            return request(*args).reply()
+
+        reply = prefetched[key]
+        if isinstance(reply, xcffib.Cookie):
+            try:
+                reply = reply.reply()
+            except (xcffib.xproto.WindowError, xcffib.xproto.AccessError,
+                    xcffib.xproto.DrawableError) as e:
+                reply = e
+            prefetched[key] = reply
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
 
     def _property_string(self, r):
         """Extract a string from a window property reply message"""
@@ -583,8 +758,7 @@ class Window:
             return self._property_utf8(r)
 
     def get_geometry(self):
-        q = self.conn.conn.core.GetGeometry(self.wid)
-        return q.reply()
+        return self._reply("geometry", self.conn.conn.core.GetGeometry, self.wid)
 
     def get_wm_desktop(self):
         r = self.get_property("_NET_WM_DESKTOP", "CARDINAL", unpack=int)
@@ -672,6 +846,9 @@ class Window:
             # wrap it.
             value = [value]
 
+        if self._prefetched is not None:
+            self._drop_prefetched(self.conn.atoms[name])
+
         try:
             self.conn.conn.core.ChangePropertyChecked(
                 xcffib.xproto.PropMode.Replace,
@@ -701,17 +878,16 @@ class Window:
             else:
                 type, _ = PropertyMap[prop]
 
+        if isinstance(prop, str):
+            prop = self.conn.atoms[prop]
+        if isinstance(type, str):
+            type = self.conn.atoms[type]
+
         try:
-            r = self.conn.conn.core.GetProperty(
-                False, self.wid,
-                self.conn.atoms[prop]
-                if isinstance(prop, str)
-                else prop,
-                self.conn.atoms[type]
-                if isinstance(type, str)
-                else type,
-                0, (2 ** 32) - 1
-            ).reply()
+            r = self._reply(
+                (prop, type), self.conn.conn.core.GetProperty,
+                False, self.wid, prop, type, 0, (2 ** 32) - 1
+            )
         except (xcffib.xproto.WindowError, xcffib.xproto.AccessError):
             logger.warning(
                 'X error in GetProperty (wid=%r, prop=%r), ignoring',
@@ -735,16 +911,20 @@ class Window:
 
     def list_properties(self):
         r = self.conn.conn.core.ListProperties(self.wid).reply()
+        self.conn.round_trips += 1
         return [self.conn.atoms.get_name(i) for i in r.atoms]
 
     def map(self):
         self.conn.conn.core.MapWindow(self.wid)
 
-    def unmap(self):
-        self.conn.conn.core.UnmapWindowChecked(self.wid).check()
+    def unmap(self, check=True):
+        if check:
+            self.conn.conn.core.UnmapWindowChecked(self.wid).check()
+        else:
+            self.conn.conn.core.UnmapWindow(self.wid)
 
     def get_attributes(self):
-        return self.conn.conn.core.GetWindowAttributes(self.wid).reply()
+        return self._reply("attributes", self.conn.conn.core.GetWindowAttributes, self.wid)
 
     def ungrab_key(self, key, modifiers):
         """Passing None means any key, or any modifier"""
@@ -805,6 +985,7 @@ class Window:
 
     def query_tree(self):
         q = self.conn.conn.core.QueryTree(self.wid).reply()
+        self.conn.round_trips += 1
         root = None
         parent = None
         if q.root:
@@ -839,6 +1020,8 @@ class Connection:
     def __init__(self, display):
         self.conn = xcffib.connect(display=display)
         self._connected = True
+        # the number of requests we blocked on a reply for
+        self.round_trips = 0
         self.cursors = Cursors(self)
         self.setup = self.conn.get_setup()
         extensions = self.extensions()
@@ -960,6 +1143,9 @@ class Connection:
     def grab_server(self):
         return self.conn.core.GrabServer()
 
+    def ungrab_server(self):
+        return self.conn.core.UngrabServer()
+
     def get_setup(self):
         return self.conn.get_setup()
 
@@ -29,6 +29,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import collections
+import functools
 import math
 import cairocffi
 import xcffib.xproto
@@ -37,25 +38,210 @@ from . import pangocffi
 from . import utils
 
 
+@functools.lru_cache(maxsize=256)
+def _parse_colour(colour):
+    return utils.rgb(colour)
+
+
+def rgba(colour):
+    """Parse a colour spec like utils.rgb, remembering the result"""
+    try:
+        return _parse_colour(colour)
+    except TypeError:
+        # lists can't be cached
+        return utils.rgb(colour)
+
+
+def _is_gradient(colour):
+    """Whether colour is a list of colours rather than a single one
+
+    A tuple of numbers is a single (r, g, b[, a]) colour.
+    """
+    if isinstance(colour, tuple):
+        return not colour or not all(isinstance(i, (int, float)) for i in colour)
+    return isinstance(colour, list)
+
+
+@functools.lru_cache(maxsize=64)
+def _gradient(colours, height):
+    linear = cairocffi.LinearGradient(0.0, 0.0, 0.0, height)
+    step_size = 1.0 / (len(colours) - 1)
+    step = 0.0
+    for c in colours:
+        linear.add_color_stop_rgba(step, *rgba(c))
+        step += step_size
+    return linear
+
+
+class LayoutCache:
+    """An LRU cache of shaped text layouts, shared by all drawers
+
+    Layouts are keyed by everything that affects their shape: the font, its
+    size, markup, wrapping, width and the text itself. Widgets showing the
+    same strings, on any bar, share a layout and pango only shapes it once.
+    The layouts are never modified once cached.
+    """
+    def __init__(self, size=256):
+        self.size = size
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, create):
+        """Get the [layout, pixel size] entry for key, calling create() to
+        make the layout if it isn't cached"""
+        entries = self._entries
+        try:
+            entry = entries[key]
+        except KeyError:
+            self.misses += 1
+            entry = entries[key] = [create(), None]
+            if len(entries) > self.size:
+                entries.popitem(last=False)
+        else:
+            self.hits += 1
+            entries.move_to_end(key)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self):
+        return dict(
+            layouts=len(self._entries),
+            hits=self.hits,
+            misses=self.misses,
+        )
+
+
+layout_cache = LayoutCache()
+
+
+class SurfaceCache:
+    """An LRU cache of text rendered to image surfaces, bounded in bytes
+
+    Entries are keyed by the text's layout, colour and shadow, so painting
+    text that was drawn before is a single blit rather than one or two runs
+    of pango.
+    """
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        """Get the (surface, margin) for key, calling render() to draw it if
+        it isn't cached"""
+        entries = self._entries
+        try:
+            entry = entries[key]
+        except KeyError:
+            self.misses += 1
+            surface, margin = render()
+            size = surface.get_stride() * surface.get_height()
+            if size > self.max_bytes:
+                return surface, margin
+            entry = entries[key] = (surface, margin, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self.bytes -= entries.popitem(last=False)[1][2]
+        else:
+            self.hits += 1
+            entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def info(self):
+        return dict(
+            surfaces=len(self._entries),
+            bytes=self.bytes,
+            hits=self.hits,
+            misses=self.misses,
+        )
+
+
+text_surface_cache = SurfaceCache()
+
+
 class TextLayout:
     def __init__(self, drawer, text, colour, font_family, font_size,
-                 font_shadow, wrap=True, markup=False):
+                 font_shadow, wrap=True, markup=False, cache=False):
         self.drawer, self.colour = drawer, colour
-        layout = drawer.ctx.create_layout()
-        layout.set_alignment(pangocffi.ALIGN_CENTER)
-        if not wrap:  # pango wraps by default
-            layout.set_ellipsize(pangocffi.ELLIPSIZE_END)
-        desc = pangocffi.FontDescription.from_string(font_family)
-        desc.set_absolute_size(pangocffi.units_from_double(float(font_size)))
-        layout.set_font_description(desc)
         self.font_shadow = font_shadow
-        self.layout = layout
-        self.markup = markup
-        self.text = text
+        # paint through text_surface_cache, for text that is shown over and
+        # over again
+        self.cache = cache
+        self._font = font_family
+        self._family = None
+        self._font_size = float(font_size)
+        self._wrap = wrap
         self._width = None
+        self._markup = markup
+        self._text = text
+        # the layout_cache entry for the above, looked up when needed so that
+        # setting several attributes in a row only does one lookup
+        self._entry = None
 
     def finalize(self):
-        self.layout.finalize()
+        # the layout itself is shared through the cache
+        self._entry = None
+
+    def _get_entry(self):
+        if self._entry is None:
+            self._key = (self._font, self._family, self._font_size, self._wrap,
+                         self._width, self._markup, self._text)
+            self._entry = layout_cache.get(self._key, self._create_layout)
+        return self._entry
+
+    def _create_layout(self):
+        layout = self.drawer.ctx.create_layout()
+        layout.set_alignment(pangocffi.ALIGN_CENTER)
+        if not self._wrap:  # pango wraps by default
+            layout.set_ellipsize(pangocffi.ELLIPSIZE_END)
+        desc = pangocffi.FontDescription.from_string(self._font)
+        if self._family is not None:
+            desc.set_family(self._family)
+        desc.set_absolute_size(pangocffi.units_from_double(self._font_size))
+        layout.set_font_description(desc)
+        if self._width is not None:
+            layout.set_width(pangocffi.units_from_double(self._width))
+        value = self._text
+        if self._markup:
+            # pangocffi doesn't like None here, so we use "".
+            if value is None:
+                value = ''
+            attrlist, value, accel_char = pangocffi.parse_markup(value)
+            layout.set_attributes(attrlist)
+        layout.set_text(utils.scrub_to_utf8(value))
+        return layout
+
+    def _pixel_size(self):
+        entry = self._get_entry()
+        if entry[1] is None:
+            entry[1] = entry[0].get_pixel_size()
+        return entry[1]
+
+    def _update(self, name, value):
+        if getattr(self, name) != value:
+            setattr(self, name, value)
+            self._entry = None
+
+    @property
+    def layout(self):
+        return self._get_entry()[0]
+
+    @property
+    def markup(self):
+        return self._markup
+
+    @markup.setter
+    def markup(self, value):
+        self._update("_markup", value)
 
     @property
     def text(self):
@@ -63,34 +249,26 @@ class TextLayout:
 
     @text.setter
     def text(self, value):
-        if self.markup:
-            # pangocffi doesn't like None here, so we use "".
-            if value is None:
-                value = ''
-            attrlist, value, accel_char = pangocffi.parse_markup(value)
-            self.layout.set_attributes(attrlist)
-        self.layout.set_text(utils.scrub_to_utf8(value))
+        self._update("_text", value)
 
     @property
     def width(self):
         if self._width is not None:
             return self._width
         else:
-            return self.layout.get_pixel_size()[0]
+            return self._pixel_size()[0]
 
     @width.setter
     def width(self, value):
-        self._width = value
-        self.layout.set_width(pangocffi.units_from_double(value))
+        self._update("_width", value)
 
     @width.deleter
     def width(self):
-        self._width = None
-        self.layout.set_width(-1)
+        self._update("_width", None)
 
     @property
     def height(self):
-        return self.layout.get_pixel_size()[1]
+        return self._pixel_size()[1]
 
     def fontdescription(self):
         return self.layout.get_font_description()
@@ -102,9 +280,7 @@ class TextLayout:
 
     @font_family.setter
     def font_family(self, font):
-        d = self.fontdescription()
-        d.set_family(font)
-        self.layout.set_font_description(d)
+        self._update("_family", font)
 
     @property
     def font_size(self):
@@ -113,12 +289,45 @@ class TextLayout:
 
     @font_size.setter
     def font_size(self, size):
-        d = self.fontdescription()
-        d.set_size(size)
-        d.set_absolute_size(pangocffi.units_from_double(size))
-        self.layout.set_font_description(d)
+        self._update("_font_size", float(size))
+
+    def _render(self):
+        width, height = self._pixel_size()
+        if self._width is not None:
+            width = max(width, self._width)
+        # glyphs may stick out of the layout's logical extents a little
+        margin = int(self._font_size / 4) + 1
+        surface = cairocffi.ImageSurface(
+            cairocffi.FORMAT_ARGB32,
+            int(width) + 2 * margin + 1,
+            height + 2 * margin + 1,
+        )
+        ctx = pangocffi.patch_cairo_context(cairocffi.Context(surface))
+        if self.font_shadow is not None:
+            ctx.set_source_rgba(*rgba(self.font_shadow))
+            ctx.move_to(margin + 1, margin + 1)
+            ctx.show_layout(self.layout)
+        ctx.set_source_rgba(*rgba(self.colour))
+        ctx.move_to(margin, margin)
+        ctx.show_layout(self.layout)
+        surface.flush()
+        return surface, margin
 
     def draw(self, x, y):
+        # gradients depend on where they're drawn, so can't be cached
+        if self.cache and not _is_gradient(self.colour) and \
+                not _is_gradient(self.font_shadow):
+            self._get_entry()
+            surface, margin = text_surface_cache.get(
+                (self._key, self.colour, self.font_shadow), self._render
+            )
+            ctx = self.drawer.ctx
+            ctx.set_source_surface(surface, x - margin, y - margin)
+            ctx.rectangle(x - margin, y - margin,
+                          surface.get_width(), surface.get_height())
+            ctx.fill()
+            return
+
         if self.font_shadow is not None:
             self.drawer.set_source_rgb(self.font_shadow)
             self.drawer.ctx.move_to(x + 1, y + 1)
@@ -206,24 +415,18 @@ class Drawer:
     """ A helper class for drawing and text layout.
 
     We have a drawer object for each widget in the bar. The underlying surface
-    is a pixmap with the same size as the bar itself. We draw to the pixmap
-    starting at offset 0, 0, and when the time comes to display to the window,
-    we copy the appropriate portion of the pixmap onto the window.
+    is a pixmap sized to the widget, which the bar resizes whenever it lays
+    its widgets out. We draw to the pixmap starting at offset 0, 0, and when
+    the time comes to display to the window, we copy the pixmap onto the
+    window at the widget's offset.
     """
     def __init__(self, lavinder, wid, width, height):
         self.lavinder = lavinder
         self.wid, self.width, self.height = wid, width, height
 
-        self.pixmap = self.lavinder.conn.conn.generate_id()
+        self.pixmap = None
+        self.surface = None
         self.gc = self.lavinder.conn.conn.generate_id()
-
-        self.lavinder.conn.conn.core.CreatePixmap(
-            self.lavinder.conn.default_screen.root_depth,
-            self.pixmap,
-            self.wid,
-            self.width,
-            self.height
-        )
         self.lavinder.conn.conn.core.CreateGC(
             self.gc,
             self.wid,
@@ -233,21 +436,74 @@ class Drawer:
                 self.lavinder.conn.default_screen.white_pixel
             ]
         )
+        self._create_pixmap(max(width, 1), max(height, 1))
+        self.clear((0, 0, 1))
+
+    def _create_pixmap(self, width, height):
+        self.pixmap_width, self.pixmap_height = width, height
+        self.pixmap = self.lavinder.conn.conn.generate_id()
+        self.lavinder.conn.conn.core.CreatePixmap(
+            self.lavinder.conn.default_screen.root_depth,
+            self.pixmap,
+            self.wid,
+            width,
+            height
+        )
         self.surface = cairocffi.XCBSurface(
-            lavinder.conn.conn,
+            self.lavinder.conn.conn,
             self.pixmap,
             self.find_root_visual(),
-            self.width,
-            self.height,
+            width,
+            height,
         )
         self.ctx = self.new_ctx()
-        self.clear((0, 0, 1))
 
-    def finalize(self):
-        self.lavinder.conn.conn.core.FreeGC(self.gc)
-        self.lavinder.conn.conn.core.FreePixmap(self.pixmap)
+    def _free_pixmap(self):
         self.ctx = None
+        self.surface.finish()
         self.surface = None
+        self.lavinder.conn.conn.core.FreePixmap(self.pixmap)
+        self.pixmap = None
+
+    @staticmethod
+    def _fit(size, current):
+        # Grow with some headroom so that widgets whose length changes by a
+        # few pixels at a time don't reallocate on every change, and only
+        # shrink once most of the pixmap has gone unused.
+        if size > current:
+            return size + size // 8
+        if size < current // 2:
+            return size
+        return current
+
+    def resize(self, width, height):
+        """Resize the canvas, reallocating the pixmap if it doesn't fit
+
+        The contents of the canvas are lost when the pixmap is reallocated,
+        so the owner should redraw after resizing. Returns True if a new
+        pixmap was allocated.
+        """
+        width, height = max(width, 1), max(height, 1)
+        self.width, self.height = width, height
+        pixmap_width = self._fit(width, self.pixmap_width)
+        pixmap_height = self._fit(height, self.pixmap_height)
+        if (pixmap_width, pixmap_height) == (self.pixmap_width, self.pixmap_height):
+            return False
+        self._free_pixmap()
+        self._create_pixmap(pixmap_width, pixmap_height)
+        return True
+
+    @property
+    def pixmap_bytes(self):
+        """The approximate X server memory used by the pixmap"""
+        depth = self.lavinder.conn.default_screen.root_depth
+        # pixmaps deeper than 16 bits are stored with 32 bits per pixel
+        bpp = 32 if depth > 16 else (16 if depth > 8 else 8)
+        return self.pixmap_width * self.pixmap_height * bpp // 8
+
+    def finalize(self):
+        self.lavinder.conn.conn.core.FreeGC(self.gc)
+        self._free_pixmap()
 
     def _rounded_rect(self, x, y, width, height, linewidth):
         aspect = 1.0
@@ -308,8 +564,8 @@ class Drawer:
             self.gc,
             0, 0,  # srcx, srcy
             offsetx, offsety,  # dstx, dsty
-            self.width if width is None else width,
-            self.height if height is None else height
+            min(self.width if width is None else width, self.pixmap_width),
+            min(self.height if height is None else height, self.pixmap_height)
         )
 
     def find_root_visual(self):
@@ -322,25 +578,21 @@ class Drawer:
         return pangocffi.patch_cairo_context(cairocffi.Context(self.surface))
 
     def set_source_rgb(self, colour):
-        if type(colour) == list:
+        if _is_gradient(colour):
             if len(colour) == 0:
                 # defaults to black
-                self.ctx.set_source_rgba(*utils.rgb("#000000"))
+                colour = "#000000"
             elif len(colour) == 1:
-                self.ctx.set_source_rgba(*utils.rgb(colour[0]))
+                colour = colour[0]
             else:
-                linear = cairocffi.LinearGradient(0.0, 0.0, 0.0, self.height)
-                step_size = 1.0 / (len(colour) - 1)
-                step = 0.0
-                for c in colour:
-                    rgb_col = utils.rgb(c)
-                    if len(rgb_col) < 4:
-                        rgb_col[3] = 1
-                    linear.add_color_stop_rgba(step, *rgb_col)
-                    step += step_size
-                self.ctx.set_source(linear)
-        else:
-            self.ctx.set_source_rgba(*utils.rgb(colour))
+                # patterns don't change once built, so they can be shared by
+                # every drawer of the same height
+                colours = tuple(
+                    tuple(c) if isinstance(c, list) else c for c in colour
+                )
+                self.ctx.set_source(_gradient(colours, self.height))
+                return
+        self.ctx.set_source_rgba(*rgba(colour))
 
     def clear(self, colour):
         self.set_source_rgb(colour)
@@ -27,6 +27,9 @@
 # SOFTWARE.
 
 import contextlib
+import functools
+import time
+
 import xcffib
 import xcffib.xproto
 
@@ -148,7 +151,18 @@ class _Group(command.CommandObject):
         to it.
         """
         if self.screen and len(self.windows):
-            with self.disable_mask(xcffib.xproto.EventMask.EnterWindow):
+            start = time.monotonic()
+            outer = self.lavinder.relayout
+            if outer is None:
+                relayout = window.Relayout(
+                    self.lavinder,
+                    grab=getattr(self.lavinder.config, "relayout_grab_server", False),
+                )
+            else:
+                # laid out from within another relayout, which sends it all
+                relayout = outer
+            self.lavinder.relayout = relayout
+            try:
                 normal = [x for x in self.windows if not x.floating]
                 floating = [
                     x for x in self.windows
@@ -163,9 +177,28 @@ class _Group(command.CommandObject):
                                          self.layout.name)
                 if floating:
                     self.floating_layout.layout(floating, screen)
-                if self.current_window and \
-                        self.screen == self.lavinder.current_screen:
+                # once the windows are in place, also within an outer relayout
+                relayout.defer(functools.partial(self._focus_current, warp))
+            finally:
+                self.lavinder.relayout = outer
+                if outer is None:
+                    requests = relayout.commit()
+            if outer is not None:
+                return
+
+            self.lavinder.relayouts += 1
+            self.lavinder.relayout_requests = requests
+            self.lavinder.relayout_time = time.monotonic() - start
+
+    def _focus_current(self, warp):
+        if self.current_window and \
+                self.screen == self.lavinder.current_screen:
+            if warp:
+                with self.current_window.disable_mask(
+                        xcffib.xproto.EventMask.EnterWindow):
                     self.current_window.focus(warp)
+            else:
+                self.current_window.focus(warp)
 
     def _set_screen(self, screen):
         """Set this group's screen to new_screen"""
@@ -30,17 +30,36 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import functools
+import logging
+import time
+
 from .log_utils import logger
 from . import utils
 
 from typing import Dict, Set  # noqa: F401
 
 
+# event name -> tuple of listeners; the tuples are replaced rather than
+# changed, so fire() can iterate them while listeners come and go
 subscriptions = {}  # type: Dict
+# event name -> tuple of (listener, _ListenerStats), kept in step with the
+# above, which is what fire() actually walks
+_listeners = {}  # type: Dict
 SKIPLOG = set()  # type: Set
 lavinder = None
 
 
+class _ListenerStats:
+    __slots__ = ("calls", "time", "max_time", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.max_time = 0.0
+        self.errors = 0
+
+
 def init(q):
     global lavinder
     lavinder = q
@@ -48,6 +67,7 @@ def init(q):
 
 def clear():
     subscriptions.clear()
+    _listeners.clear()
 
 
 class Subscribe:
@@ -59,9 +79,10 @@ class Subscribe:
         self.hooks = hooks
 
     def _subscribe(self, event, func):
-        lst = subscriptions.setdefault(event, [])
-        if func not in lst:
-            lst.append(func)
+        listeners = subscriptions.get(event, ())
+        if func not in listeners:
+            subscriptions[event] = listeners + (func,)
+            _listeners[event] = _listeners.get(event, ()) + ((func, _ListenerStats()),)
         return func
 
     def startup_once(self, func):
@@ -348,29 +369,75 @@ class Unsubscribe(Subscribe):
     overridden to removed calls from hooks.
     """
     def _subscribe(self, event, func):
-        lst = subscriptions.setdefault(event, [])
-        try:
-            lst.remove(func)
-        except ValueError:
+        listeners = subscriptions.get(event, ())
+        if func not in listeners:
             raise utils.LavinderError(
                 "Tried to unsubscribe a hook that was not"
                 " currently subscribed"
             )
+        subscriptions[event] = tuple(i for i in listeners if i != func)
+        _listeners[event] = tuple(i for i in _listeners[event] if i[0] != func)
 
 
 unsubscribe = Unsubscribe()
 
 
 def fire(event, *args, **kwargs):
-    if event not in subscribe.hooks:
-        raise utils.LavinderError("Unknown event: %s" % event)
-    if event not in SKIPLOG:
+    listeners = _listeners.get(event)
+    if listeners is None:
+        if event not in subscribe.hooks:
+            raise utils.LavinderError("Unknown event: %s" % event)
+        listeners = ()
+    if event not in SKIPLOG and logger.isEnabledFor(logging.DEBUG):
         logger.debug("Internal event: %s(%s, %s)", event, args, kwargs)
-    for i in subscriptions.get(event, []):
+
+    perf_counter = time.perf_counter
+    for func, record in listeners:
+        start = perf_counter()
         try:
-            i(*args, **kwargs)
+            func(*args, **kwargs)
         except:  # noqa: E722
             logger.exception("Error in hook %s", event)
+            record.errors += 1
+        elapsed = perf_counter() - start
+        record.calls += 1
+        record.time += elapsed
+        if elapsed > record.max_time:
+            record.max_time = elapsed
+
+
+def _listener_name(func):
+    if isinstance(func, functools.partial):
+        return "partial(%s)" % _listener_name(func.func)
+    if not hasattr(func, "__qualname__"):
+        # a callable object
+        func = type(func)
+    return "%s.%s" % (func.__module__, func.__qualname__)
+
+
+def stats(reset=False):
+    """Return the time spent in each hook listener, slowest first
+
+    Each entry gives the event, the listener's name, how often it was
+    called, the total, average and maximum time in seconds, and how many
+    calls raised an exception.
+    """
+    result = []
+    for event, listeners in _listeners.items():
+        for func, record in listeners:
+            result.append(dict(
+                event=event,
+                listener=_listener_name(func),
+                calls=record.calls,
+                total=record.time,
+                average=record.time / record.calls if record.calls else 0.0,
+                max=record.max_time,
+                errors=record.errors,
+            ))
+            if reset:
+                record.__init__()
+    result.sort(key=lambda i: i["total"], reverse=True)
+    return result
 
 
 @subscribe.client_name_updated
@@ -23,8 +23,24 @@
     use marshal to serialize data - this means that both client and server must
     run the same Python version, and that clients must be trusted (as
     un-marshalling untrusted data can result in arbitrary code execution).
+
+    Two framings are spoken on the same socket. The original one-shot framing
+    sends a single request, half-closes the connection and waits for the reply
+    to be terminated by EOF. A client opening a connection with MUX_MAGIC
+    instead keeps it open for any number of requests: every message is framed
+    as (request id, body length, body), and replies carry the id of the
+    request they answer, so several requests can be in flight at once. The
+    byte following MUX_MAGIC selects the encoding of the frames: marshal,
+    JSON, or the compact binary encoding of ipc_codec, which unlike marshal is
+    safe to use with untrusted clients.
+
+    A client opening a connection with SUBSCRIBE_MAGIC followed by a JSON list
+    of topics and a newline subscribes to those topics instead. The server
+    then streams newline separated JSON messages published on them, without
+    the client sending anything more.
 """
 import asyncio
+import collections
 import marshal
 import os.path
 import socket
@@ -32,39 +48,71 @@ import struct
 import fcntl
 import json
 
+from . import ipc_codec
 from .log_utils import logger
 
 HDRLEN = 4
 
+# Sent by a client, followed by a format byte, to open a persistent
+# multiplexed connection. As a one-shot marshal header it would announce a
+# message of more than 4GB, so it cannot be confused with the old framing.
+MUX_MAGIC = b"\xffLMX"
+MUX_MARSHAL = 0
+MUX_JSON = 1
+# the safe compact encoding of ipc_codec, for clients that are not trusted
+MUX_BINARY = 2
+MUX_HDR = struct.Struct("!LL")
+# Set in the size of a reply frame whose body is the UTF-8 message of an
+# error instead of the reply; the client raises it as an IPCError.
+MUX_ERROR = 0x80000000
+
+# Sent by a client, followed by a JSON list of topics and a newline, to
+# subscribe to messages published by the server.
+SUBSCRIBE_MAGIC = b"\xffLSB"
+# Write buffer size above which a subscriber counts as a slow consumer.
+SUBSCRIBER_HIGH_WATER = 64 * 1024
+# Messages kept for a slow consumer before it is disconnected.
+SUBSCRIBER_BACKLOG = 256
+
+_ONE_SHOT = 0
+_MULTIPLEXED = 1
+_SUBSCRIBED = 2
+
 
 class IPCError(Exception):
     pass
 
 
 class _IPC:
+    # one-shot JSON messages are lists, and any of these as the first byte of
+    # a marshal header would announce a message of more than 100MB
+    _JSON_START = frozenset(b"[{ \t\r\n")
+
     def _unpack(self, data):
+        """Decode a one-shot message, returning it and whether it was JSON
 
+        Which of the two formats is used is told by the first byte, rather
+        than by trying to parse every message as JSON first.
+        """
         if data is None:
             raise IPCError("received data is None")
-        try:
-            return json.loads(data.decode('utf-8')), True
-        except ValueError:
-            pass
-
-        try:
-            assert len(data) >= HDRLEN
-            size = struct.unpack("!L", data[:HDRLEN])[0]
-            assert size >= len(data[HDRLEN:])
-            return self._unpack_body(data[HDRLEN:HDRLEN + size]), False
-        except AssertionError:
+        data = memoryview(data)
+        if len(data) and data[0] in self._JSON_START:
+            try:
+                return self._decode(data, MUX_JSON), True
+            except ValueError:
+                raise IPCError("invalid JSON message")
+
+        if len(data) < HDRLEN or \
+                len(data) != HDRLEN + struct.unpack_from("!L", data)[0]:
             raise IPCError(
                 "error reading reply!"
                 " (probably the socket was disconnected)"
             )
-
-    @staticmethod
-    def _unpack_body(body):
-        return marshal.loads(body)
+        try:
+            return self._decode(data[HDRLEN:], MUX_MARSHAL), False
+        except ValueError:
+            raise IPCError("invalid marshal message")
 
     @staticmethod
     def _pack_json(msg):
@@ -73,9 +121,71 @@ class _IPC:
 
     @staticmethod
     def _pack(msg):
+        """Return the chunks of a one-shot marshal message"""
         msg = marshal.dumps(msg)
         size = struct.pack("!L", len(msg))
-        return size + msg
+        return (size, msg)
+
+    @staticmethod
+    def _encode(msg, fmt):
+        if fmt == MUX_BINARY:
+            return ipc_codec.dumps(msg)
+        if fmt == MUX_JSON:
+            return json.dumps(msg).encode('utf-8')
+        return marshal.dumps(msg)
+
+    @staticmethod
+    def _decode(data, fmt):
+        """Decode a bytes-like object, raising ValueError if it is invalid"""
+        if fmt == MUX_BINARY:
+            return ipc_codec.loads(data)
+        if fmt == MUX_JSON:
+            return json.loads(str(data, 'utf-8'))
+        try:
+            return marshal.loads(data)
+        except (EOFError, TypeError) as e:
+            raise ValueError(str(e))
+
+    @classmethod
+    def _pack_frame(cls, msgid, msg, fmt):
+        """Return the chunks of a frame, to be sent with writelines"""
+        body = cls._encode(msg, fmt)
+        return (MUX_HDR.pack(msgid, len(body)), body)
+
+    @staticmethod
+    def _pack_error_frame(msgid, error):
+        body = error.encode('utf-8')
+        return (MUX_HDR.pack(msgid, MUX_ERROR | len(body)), body)
+
+    @classmethod
+    def _unpack_frames(cls, buf, fmt):
+        """Pop all complete frames off the front of the bytearray buf
+
+        Returns a list of (msgid, message) pairs; an incomplete trailing frame
+        is left in buf. The message of an error frame is an IPCError. The
+        frames are decoded in place, and buf is only shifted once for all of
+        them.
+        """
+        frames = []
+        pos = 0
+        with memoryview(buf) as view:
+            while len(view) - pos >= MUX_HDR.size:
+                msgid, size = MUX_HDR.unpack_from(view, pos)
+                start = pos + MUX_HDR.size
+                end = start + (size & ~MUX_ERROR)
+                if len(view) < end:
+                    break
+                try:
+                    if size & MUX_ERROR:
+                        msg = IPCError(str(view[start:end], 'utf-8', 'replace'))
+                    else:
+                        msg = cls._decode(view[start:end], fmt)
+                except ValueError:
+                    raise IPCError("invalid frame %d" % msgid)
+                frames.append((msgid, msg))
+                pos = end
+        del buf[:pos]
+        return frames
 
 
 class _ClientProtocol(asyncio.Protocol, _IPC):
@@ -95,16 +205,14 @@ class _ClientProtocol(asyncio.Protocol, _IPC):
     """
     def connection_made(self, transport):
         self.transport = transport
-        self.recv = b''
+        self.recv = bytearray()
         self.reply = asyncio.Future()
 
     def send(self, msg, is_json=False):
         if is_json:
-            send_data = self._pack_json(msg)
+            self.transport.write(self._pack_json(msg))
         else:
-            send_data = self._pack(msg)
-
-        self.transport.write(send_data)
+            self.transport.writelines(self._pack(msg))
 
         try:
             self.transport.write_eof()
@@ -131,13 +239,93 @@ class _ClientProtocol(asyncio.Protocol, _IPC):
             self.reply.set_exception(IPCError)
 
 
+class _MuxClientProtocol(asyncio.Protocol, _IPC):
+    """Persistent IPC Client Protocol
+
+    The connection is opened by sending MUX_MAGIC and the format byte. Each
+    request is then written as a frame tagged with a fresh request id and a
+    Future is kept for it; replies are matched back to their Future by id,
+    whatever order they arrive in. When the connection is lost every pending
+    Future fails with an IPCError.
+    """
+    def __init__(self, loop, fmt):
+        asyncio.Protocol.__init__(self)
+        self.loop = loop
+        self.fmt = fmt
+        self.transport = None
+        self.recv = bytearray()
+        self.pending = {}
+        self.msgid = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(MUX_MAGIC + bytes([self.fmt]))
+
+    def request(self, msg):
+        self.msgid = (self.msgid + 1) & 0xffffffff
+        reply = self.loop.create_future()
+        self.pending[self.msgid] = reply
+        self.transport.writelines(self._pack_frame(self.msgid, msg, self.fmt))
+        return reply
+
+    def data_received(self, data):
+        self.recv += data
+        try:
+            frames = self._unpack_frames(self.recv, self.fmt)
+        except IPCError as e:
+            self._fail(e)
+            self.transport.close()
+            return
+        for msgid, msg in frames:
+            reply = self.pending.pop(msgid, None)
+            if reply is None or reply.done():
+                continue
+            if isinstance(msg, IPCError):
+                reply.set_exception(msg)
+            else:
+                reply.set_result(msg)
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self._fail(IPCError("connection to server lost"))
+
+    def _fail(self, exc):
+        pending, self.pending = self.pending, {}
+        for reply in pending.values():
+            if not reply.done():
+                reply.set_exception(exc)
+
+
 class Client:
-    def __init__(self, fname, is_json=False):
+    """IPC client
+
+    By default every message is sent over a new one-shot connection. With
+    persistent=True a single multiplexed connection is opened on first use
+    and kept open until close() is called, which saves the connection setup
+    for every call and lets send_many() pipeline requests.
+
+    With binary=True messages are encoded with ipc_codec, which is compact and
+    safe to decode, instead of marshal. That format is only spoken on
+    multiplexed connections, so non persistent clients then open one for each
+    send.
+    """
+    def __init__(self, fname, is_json=False, persistent=False, binary=False):
         self.fname = fname
         self.loop = asyncio.get_event_loop()
         self.is_json = is_json
+        self.persistent = persistent
+        if binary:
+            self.fmt = MUX_BINARY
+        elif is_json:
+            self.fmt = MUX_JSON
+        else:
+            self.fmt = MUX_MARSHAL
+        self._mux = None
 
     def send(self, msg):
+        if self.persistent or self.fmt == MUX_BINARY:
+            return self.send_many([msg])[0]
+
         client_coroutine = self.loop.create_unix_connection(_ClientProtocol, path=self.fname)
 
         try:
@@ -154,6 +342,65 @@ class Client:
 
         return client_proto.reply.result()
 
+    def send_many(self, msgs):
+        """Send all messages and return the list of their replies"""
+        if not self.persistent and self.fmt != MUX_BINARY:
+            return [self.send(msg) for msg in msgs]
+
+        proto = self._connect()
+        replies = [proto.request(msg) for msg in msgs]
+        try:
+            self.loop.run_until_complete(
+                asyncio.wait_for(asyncio.gather(*replies), timeout=10)
+            )
+        except asyncio.TimeoutError:
+            self.close()
+            raise RuntimeError("Server not responding")
+        finally:
+            if not self.persistent:
+                self.close()
+        return [reply.result() for reply in replies]
+
+    def _connect(self):
+        if self._mux is None or self._mux.transport is None:
+            client_coroutine = self.loop.create_unix_connection(
+                lambda: _MuxClientProtocol(self.loop, self.fmt), path=self.fname
+            )
+            try:
+                _, self._mux = self.loop.run_until_complete(client_coroutine)
+            except OSError:
+                raise IPCError("Could not open %s" % self.fname)
+        return self._mux
+
+    def subscribe(self, topics):
+        """Subscribe to the given topics and yield the published messages
+
+        This blocks waiting for the server and does not return until the
+        connection is closed by the server.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, 0)
+        try:
+            sock.connect(self.fname)
+        except OSError:
+            sock.close()
+            raise IPCError("Could not open %s" % self.fname)
+
+        with sock, sock.makefile("rb") as stream:
+            sock.sendall(SUBSCRIBE_MAGIC + _IPC._pack_json(list(topics)) + b"\n")
+            ack = stream.readline()
+            if not ack:
+                raise IPCError("connection to server lost")
+            ack = json.loads(ack.decode('utf-8'))
+            if "error" in ack:
+                raise IPCError(ack["error"])
+            for line in stream:
+                yield json.loads(line.decode('utf-8'))
+
+    def close(self):
+        if self._mux is not None and self._mux.transport is not None:
+            self._mux.transport.close()
+        self._mux = None
+
     def call(self, data):
         return self.send(data)
 
@@ -172,26 +419,151 @@ class _ServerProtocol(asyncio.Protocol, _IPC):
     4. The client signals that all data is sent by sending an EOF, at which
     point the server then unpacks the data and runs it through the handler.
     The result is returned to the client and the connection is closed.
+
+    If the data starts with MUX_MAGIC, the connection is instead a persistent
+    multiplexed one: every complete frame is run through the handler as soon
+    as it arrives and answered with a frame carrying the same request id, and
+    the connection stays open until the client closes it.
+
+    If it starts with SUBSCRIBE_MAGIC, the connection is registered with the
+    server as a subscriber, see Server.publish.
     """
-    def __init__(self, handler):
+    def __init__(self, handler, server=None):
         asyncio.Protocol.__init__(self)
         self.handler = handler
+        self.server = server
         self.transport = None
         self.data = None
+        # None until the first bytes tell which framing the client speaks
+        self.mode = None
+        self.fmt = MUX_MARSHAL
+        # subscribers only: messages waiting while the client is slow, by key
+        self.topics = ()
+        self.paused = False
+        self.backlog = collections.OrderedDict()
 
     def connection_made(self, transport):
         self.transport = transport
         logger.debug('Connection made to server')
-        self.data = b''
+        self.data = bytearray()
 
     def data_received(self, recv):
         logger.debug('Data received by server')
+        if self.mode == _SUBSCRIBED and self.data is None:
+            # subscribers have nothing more to say
+            return
         self.data += recv
+        if self.mode is None:
+            if len(self.data) <= len(MUX_MAGIC):
+                return
+            magic = self.data[:len(MUX_MAGIC)]
+            if magic == MUX_MAGIC:
+                self.mode = _MULTIPLEXED
+                self.fmt = self.data[len(MUX_MAGIC)]
+                del self.data[:len(MUX_MAGIC) + 1]
+                if self.fmt not in (MUX_MARSHAL, MUX_JSON, MUX_BINARY):
+                    logger.warning('Unknown IPC format, closing connection')
+                    self.transport.close()
+                    return
+                logger.debug('Persistent connection made to server')
+            elif magic == SUBSCRIBE_MAGIC:
+                self.mode = _SUBSCRIBED
+                del self.data[:len(SUBSCRIBE_MAGIC)]
+            else:
+                self.mode = _ONE_SHOT
+        if self.mode == _MULTIPLEXED:
+            self._process_frames()
+        elif self.mode == _SUBSCRIBED:
+            self._process_subscription()
+
+    def _process_subscription(self):
+        end = self.data.find(b"\n")
+        if end < 0:
+            return
+        try:
+            topics = json.loads(self.data[:end].decode('utf-8'))
+        except ValueError:
+            topics = None
+        self.data = None
+        error = None
+        if self.server is None:
+            error = "Subscriptions are not supported"
+        elif not isinstance(topics, list):
+            error = "Expected a list of topics"
+        else:
+            error = self.server.subscribe(self, topics)
+        if error:
+            self.transport.write(self._pack_json({"error": error}) + b"\n")
+            self.transport.close()
+            return
+        self.topics = tuple(topics)
+        self.transport.set_write_buffer_limits(high=SUBSCRIBER_HIGH_WATER)
+        self.transport.write(self._pack_json({"subscribed": topics}) + b"\n")
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        backlog, self.backlog = self.backlog, collections.OrderedDict()
+        for data in backlog.values():
+            self.transport.write(data)
+
+    def push(self, data, key):
+        """Send a published message to a subscriber
+
+        While the client is not reading fast enough messages are kept back,
+        and a newer message with the same key replaces the kept one. Returns
+        False if the client was too slow and has been disconnected.
+        """
+        if self.transport.is_closing():
+            return True
+        if not self.paused:
+            self.transport.write(data)
+            return True
+        self.backlog.pop(key, None)
+        self.backlog[key] = data
+        if len(self.backlog) > SUBSCRIBER_BACKLOG:
+            logger.warning('Disconnecting slow IPC subscriber')
+            self.backlog.clear()
+            self.transport.abort()
+            return False
+        return True
+
+    def connection_lost(self, exc):
+        if self.mode == _SUBSCRIBED and self.server is not None:
+            self.server.unsubscribe(self)
+
+    def _process_frames(self):
+        try:
+            frames = self._unpack_frames(self.data, self.fmt)
+        except IPCError:
+            logger.warning('Invalid frame received, closing connection')
+            self.transport.close()
+            return
+        for msgid, req in frames:
+            if isinstance(req, IPCError):
+                logger.warning('Error frame received, closing connection')
+                self.transport.close()
+                return
+            rep = self.handler(req)
+            if self.transport.is_closing():
+                return
+            try:
+                frame = self._pack_frame(msgid, rep, self.fmt)
+            except (ValueError, TypeError, OverflowError) as e:
+                # only this request fails, not the others on the connection
+                logger.warning('Could not encode IPC reply: %s', e)
+                frame = self._pack_error_frame(msgid, "Could not encode reply: %s" % e)
+            self.transport.writelines(frame)
 
     def eof_received(self):
         logger.debug('EOF received by server')
+        if self.mode in (_MULTIPLEXED, _SUBSCRIBED):
+            # the client closed a persistent connection
+            return
         try:
-            req, is_json = self._unpack(self.data)
+            req, is_json = self._unpack(bytes(self.data))
         except IPCError:
             logger.warn('Invalid data received, closing connection')
             self.transport.close()
@@ -205,13 +577,11 @@ class _ServerProtocol(asyncio.Protocol, _IPC):
 
         rep = self.handler(req)
 
+        logger.debug('Sending result on receive EOF')
         if is_json:
-            result = self._pack_json(rep)
+            self.transport.write(self._pack_json(rep))
         else:
-            result = self._pack(rep)
-
-        logger.debug('Sending result on receive EOF')
-        self.transport.write(result)
+            self.transport.writelines(self._pack(rep))
         logger.debug('Closing connection on receive EOF')
         self.transport.write_eof()
 
@@ -222,6 +592,11 @@ class Server:
         self.handler = handler
         self.loop = loop
         self.server = None
+        # topic -> set of subscribed protocols
+        self.subscribers = collections.defaultdict(set)
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
 
         if os.path.exists(fname):
             os.unlink(fname)
@@ -241,8 +616,63 @@ class Server:
         self.sock.close()
 
     def start(self):
-        serverprotocol = _ServerProtocol(self.handler)
-        server_coroutine = self.loop.create_unix_server(lambda: serverprotocol, sock=self.sock, backlog=5)
+        # each connection needs its own protocol: a persistent connection
+        # keeps its state while others come and go
+        server_coroutine = self.loop.create_unix_server(
+            lambda: _ServerProtocol(self.handler, self), sock=self.sock, backlog=5
+        )
 
         logger.debug('Starting server')
         self.server = self.loop.run_until_complete(server_coroutine)
+
+    def check_topics(self, topics):
+        """Return an error message if a client may not subscribe to topics
+
+        Any topic is accepted by default.
+        """
+        return None
+
+    def subscribe_hooks(self, topics):
+        """Start producing the messages of topics once they were accepted
+
+        Nothing needs to be done by default.
+        """
+
+    def subscribe(self, subscriber, topics):
+        error = self.check_topics(topics)
+        if error:
+            return error
+        self.subscribe_hooks(topics)
+        for topic in topics:
+            self.subscribers[topic].add(subscriber)
+        logger.debug('Subscribed to %s', topics)
+
+    def unsubscribe(self, subscriber):
+        for topic in subscriber.topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    def has_subscribers(self, topic):
+        return topic in self.subscribers
+
+    def publish(self, topic, msg, key=None):
+        """Send msg as JSON to all clients subscribed to topic
+
+        Messages to a slow client with the same topic and key are coalesced,
+        keeping only the latest one.
+        """
+        subscribers = self.subscribers.get(topic)
+        if not subscribers:
+            return
+        data = json.dumps(msg).encode('utf-8') + b"\n"
+        key = (topic, key)
+        for subscriber in list(subscribers):
+            backlog = len(subscriber.backlog)
+            if not subscriber.push(data, key):
+                self.dropped += 1
+            elif backlog and len(subscriber.backlog) == backlog:
+                self.coalesced += 1
+        self.published += 1
@@ -0,0 +1,258 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+    A compact binary encoding of IPC messages.
+
+    The format is the subset of MessagePack covering the types commands take
+    and return: None, booleans, 64 bit integers, floats, strings, bytes, lists
+    (and tuples, which come back as lists) and dictionaries with keys of the
+    other types. Unlike marshal it
+    is safe to decode data from untrusted clients: decoding only ever builds
+    those types, and malformed or truncated input raises ValueError.
+
+    The msgpack module is used when it is installed, as it speaks the same
+    format much faster; otherwise this falls back to a pure Python codec.
+"""
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Nesting deeper than this is refused when decoding.
+MAX_DEPTH = 64
+
+_B = struct.Struct("!B")
+_H = struct.Struct("!H")
+_L = struct.Struct("!L")
+_Q = struct.Struct("!Q")
+_b = struct.Struct("!b")
+_h = struct.Struct("!h")
+_l = struct.Struct("!l")
+_q = struct.Struct("!q")
+_d = struct.Struct("!d")
+
+
+def _pack_int(obj, out):
+    if 0 <= obj < 0x80:
+        out.append(_B.pack(obj))
+    elif -0x20 <= obj < 0:
+        out.append(_b.pack(obj))
+    elif 0 <= obj <= 0xffffffff:
+        if obj <= 0xff:
+            out.append(b"\xcc" + _B.pack(obj))
+        elif obj <= 0xffff:
+            out.append(b"\xcd" + _H.pack(obj))
+        else:
+            out.append(b"\xce" + _L.pack(obj))
+    elif 0 <= obj <= 0xffffffffffffffff:
+        out.append(b"\xcf" + _Q.pack(obj))
+    elif -0x80 <= obj < 0:
+        out.append(b"\xd0" + _b.pack(obj))
+    elif -0x8000 <= obj < 0:
+        out.append(b"\xd1" + _h.pack(obj))
+    elif -0x80000000 <= obj < 0:
+        out.append(b"\xd2" + _l.pack(obj))
+    elif -0x8000000000000000 <= obj < 0:
+        out.append(b"\xd3" + _q.pack(obj))
+    else:
+        raise ValueError("integer out of range: %d" % obj)
+
+
+def _pack_len(n, fix, fixmax, tags, out):
+    if n <= fixmax:
+        out.append(_B.pack(fix | n))
+    elif n <= 0xffff:
+        out.append(tags[0] + _H.pack(n))
+    elif n <= 0xffffffff:
+        out.append(tags[1] + _L.pack(n))
+    else:
+        raise ValueError("object too large")
+
+
+def _pack(obj, out):
+    t = type(obj)
+    if t is str:
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n <= 0x1f:
+            out.append(_B.pack(0xa0 | n))
+        elif n <= 0xff:
+            out.append(b"\xd9" + _B.pack(n))
+        else:
+            _pack_len(n, 0xa0, 0x1f, (b"\xda", b"\xdb"), out)
+        out.append(data)
+    elif t is int:
+        _pack_int(obj, out)
+    elif obj is None:
+        out.append(b"\xc0")
+    elif t is bool:
+        out.append(b"\xc3" if obj else b"\xc2")
+    elif t is float:
+        out.append(b"\xcb" + _d.pack(obj))
+    elif t is list or t is tuple:
+        _pack_len(len(obj), 0x90, 0x0f, (b"\xdc", b"\xdd"), out)
+        for item in obj:
+            _pack(item, out)
+    elif t is dict:
+        _pack_len(len(obj), 0x80, 0x0f, (b"\xde", b"\xdf"), out)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    elif t is bytes or t is bytearray:
+        n = len(obj)
+        if n <= 0xff:
+            out.append(b"\xc4" + _B.pack(n))
+        elif n <= 0xffff:
+            out.append(b"\xc5" + _H.pack(n))
+        else:
+            out.append(b"\xc6" + _L.pack(n))
+        out.append(bytes(obj))
+    elif isinstance(obj, int):
+        _pack_int(int(obj), out)
+    elif isinstance(obj, str):
+        _pack(str(obj), out)
+    else:
+        raise ValueError("unserializable object: %r" % (obj,))
+
+
+def _py_dumps(obj):
+    out = []
+    _pack(obj, out)
+    return b"".join(out)
+
+
+_INTS = {
+    0xcc: _B, 0xcd: _H, 0xce: _L, 0xcf: _Q,
+    0xd0: _b, 0xd1: _h, 0xd2: _l, 0xd3: _q,
+    0xcb: _d, 0xca: struct.Struct("!f"),
+}
+_STRS = {0xd9: _B, 0xda: _H, 0xdb: _L}
+_BINS = {0xc4: _B, 0xc5: _H, 0xc6: _L}
+_ARRAYS = {0xdc: _H, 0xdd: _L}
+_MAPS = {0xde: _H, 0xdf: _L}
+_CONSTANTS = {0xc0: None, 0xc2: False, 0xc3: True}
+
+
+def _py_loads(data):
+    data = bytes(data)
+    end = len(data)
+
+    def take(pos, size):
+        if pos + size > end:
+            raise ValueError("truncated data")
+        return pos + size
+
+    def unpack(pos, depth):
+        # returns the decoded object and the position following it
+        if pos >= end:
+            raise ValueError("truncated data")
+        tag = data[pos]
+        pos += 1
+        if tag < 0x80:
+            return tag, pos
+        if 0xa0 <= tag <= 0xbf:
+            stop = take(pos, tag & 0x1f)
+            return data[pos:stop].decode("utf-8"), stop
+        if tag >= 0xe0:
+            return tag - 0x100, pos
+        if tag <= 0x9f:
+            if depth >= MAX_DEPTH:
+                raise ValueError("nesting too deep")
+            if tag <= 0x8f:
+                return unpack_map(tag & 0x0f, pos, depth + 1)
+            return unpack_array(tag & 0x0f, pos, depth + 1)
+        if tag in _CONSTANTS:
+            return _CONSTANTS[tag], pos
+        fmt = _INTS.get(tag)
+        if fmt is not None:
+            stop = take(pos, fmt.size)
+            return fmt.unpack_from(data, pos)[0], stop
+        fmt = _STRS.get(tag) or _BINS.get(tag)
+        if fmt is not None:
+            pos = take(pos, fmt.size)
+            stop = take(pos, fmt.unpack_from(data, pos - fmt.size)[0])
+            if tag in _BINS:
+                return data[pos:stop], stop
+            return data[pos:stop].decode("utf-8"), stop
+        fmt = _ARRAYS.get(tag) or _MAPS.get(tag)
+        if fmt is not None:
+            if depth >= MAX_DEPTH:
+                raise ValueError("nesting too deep")
+            pos = take(pos, fmt.size)
+            n = fmt.unpack_from(data, pos - fmt.size)[0]
+            if tag in _ARRAYS:
+                return unpack_array(n, pos, depth + 1)
+            return unpack_map(n, pos, depth + 1)
+        raise ValueError("unsupported type 0x%02x" % tag)
+
+    def unpack_array(n, pos, depth):
+        # every item takes at least one byte
+        take(pos, n)
+        result = []
+        append = result.append
+        for _ in range(n):
+            item, pos = unpack(pos, depth)
+            append(item)
+        return result, pos
+
+    def unpack_map(n, pos, depth):
+        take(pos, 2 * n)
+        result = {}
+        for _ in range(n):
+            key, pos = unpack(pos, depth)
+            value, pos = unpack(pos, depth)
+            try:
+                result[key] = value
+            except TypeError:
+                raise ValueError("unhashable key")
+        return result, pos
+
+    try:
+        result, pos = unpack(0, 0)
+    except UnicodeDecodeError:
+        raise ValueError("invalid string")
+    except struct.error:
+        raise ValueError("truncated data")
+    if pos != end:
+        raise ValueError("trailing data")
+    return result
+
+
+def dumps(obj):
+    """Encode obj, raising ValueError for unsupported types"""
+    if msgpack is not None:
+        try:
+            return msgpack.packb(obj, use_bin_type=True)
+        except (TypeError, OverflowError) as e:
+            raise ValueError(str(e))
+    return _py_dumps(obj)
+
+
+def loads(data):
+    """Decode a bytes-like object, raising ValueError if it is invalid"""
+    if msgpack is not None:
+        try:
+            return msgpack.unpackb(
+                data, raw=False, strict_map_key=False, use_list=True,
+            )
+        except Exception as e:
+            raise ValueError(str(e))
+    return _py_loads(data)
@@ -27,6 +27,27 @@ from .. import command, configurable
 from typing import Any, List, Tuple  # noqa: F401
 
 
+class Placement:
+    """Where a layout puts a client
+
+    The arguments are those of the client's place(); a placement without any
+    hides the client instead.
+    """
+    __slots__ = ("client", "args", "kwargs")
+
+    def __init__(self, client, *args, **kwargs):
+        self.client = client
+        self.args = args
+        self.kwargs = kwargs
+
+    def apply(self):
+        if self.args:
+            self.client.place(*self.args, **self.kwargs)
+            self.client.unhide()
+        else:
+            self.client.hide()
+
+
 class Layout(command.CommandObject, configurable.Configurable, metaclass=ABCMeta):
     """This class defines the API that should be exposed by all layouts"""
     @classmethod
@@ -53,8 +74,24 @@ class Layout(command.CommandObject, configurable.Configurable, metaclass=ABCMeta
 
     def layout(self, windows, screen):
         assert windows, "let's eliminate unnecessary calls"
-        for i in windows:
-            self.configure(i, screen)
+        placements = self.arrange(windows, screen)
+        if placements is None:
+            for i in windows:
+                self.configure(i, screen)
+            return
+        for placement in placements:
+            placement.apply()
+
+    def arrange(self, windows, screen):
+        """Work out where all the windows go in a single pass
+
+        Layouts that share work between their windows, such as the sizes of
+        rows and columns or the border colours, can override this to return
+        a `Placement` for each of the windows, in the order they should be
+        placed. The default returns None, and each window is configured on
+        its own instead.
+        """
+        return None
 
     def finalize(self):
         pass
@@ -135,7 +172,6 @@ class Layout(command.CommandObject, configurable.Configurable, metaclass=ABCMeta
         """
         pass
 
-    @abstractmethod
     def configure(self, client, screen):
         """Configure the layout
 
@@ -144,8 +180,17 @@ class Layout(command.CommandObject, configurable.Configurable, metaclass=ABCMeta
             - Configure the dimensions and borders of a window using the
               `.place()` method.
             - Call either `.hide()` or `.unhide()` on the window.
+
+        Layouts implementing `arrange` needn't override it: this arranges
+        just the client and applies its placement.
         """
-        pass
+        placements = self.arrange([client], screen)
+        if placements is None:
+            raise NotImplementedError(
+                "%s implements neither configure nor arrange" % self.__class__.__name__
+            )
+        for placement in placements:
+            placement.apply()
 
     @abstractmethod
     def focus_first(self):
@@ -15,6 +15,8 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import bisect
+
 from .base import Layout
 
 
@@ -90,6 +92,14 @@ class _BspNode():
             self.split_ratio = 100 * v0 / v
         return h, v
 
+    def leaves(self):
+        if self.client:
+            yield self
+        else:
+            for child in self.children:
+                for c in child.leaves():
+                    yield c
+
     def calc_geom(self, x, y, w, h):
         self.x = x
         self.y = y
@@ -160,22 +170,67 @@ class Bsp(Layout):
         self.add_defaults(Bsp.defaults)
         self.root = _BspNode()
         self.current = self.root
+        self._changed()
 
     def clone(self, group):
         c = Layout.clone(self, group)
         c.root = _BspNode()
         c.current = c.root
+        c._changed()
         return c
 
+    def _changed(self):
+        """Forget the client to node map and the spatial index, after the
+        tree or its geometry changed"""
+        self._nodes = None
+        self._edges = None
+        self._geometry_done = False
+
+    def _edge_index(self):
+        """Index the leaves by each of their edges, for finding neighbours
+
+        For every direction this maps the coordinate of the leaves' edge on
+        that side to the leaves along it, sorted by their position along the
+        edge.
+        """
+        if self._edges is None:
+            root = self.root
+            root.calc_geom(root.x, root.y, root.w, root.h)
+            edges = dict(left={}, right={}, up={}, down={})
+            for node in root.leaves():
+                if not node.w or not node.h:
+                    # squeezed out of sight, it's nobody's neighbour
+                    continue
+                edges["left"].setdefault(node.x, []).append((node.y, node))
+                edges["right"].setdefault(node.x + node.w, []).append((node.y, node))
+                edges["up"].setdefault(node.y, []).append((node.x, node))
+                edges["down"].setdefault(node.y + node.h, []).append((node.x, node))
+            for side in edges.values():
+                for coord, leaves in side.items():
+                    leaves.sort(key=lambda leaf: leaf[0])
+                    side[coord] = ([pos for pos, _ in leaves], [n for _, n in leaves])
+            self._edges = edges
+        return self._edges
+
+    def _neighbor(self, side, edge, center, inclusive):
+        """The leaf with its side edge at edge, spanning center"""
+        positions, nodes = self._edge_index()[side].get(edge, ((), ()))
+        if inclusive:
+            idx = bisect.bisect_right(positions, center) - 1
+        else:
+            idx = bisect.bisect_left(positions, center) - 1
+        if idx >= 0:
+            return nodes[idx]
+
     def info(self):
         return dict(
             name=self.name,
             clients=[c.name for c in self.root.clients()])
 
     def get_node(self, client):
-        for node in self.root:
-            if client is node.client:
-                return node
+        if self._nodes is None:
+            self._nodes = {node.client: node for node in self.root.leaves()}
+        return self._nodes.get(client)
 
     def focus(self, client):
         self.current = self.get_node(client)
@@ -183,10 +238,12 @@ class Bsp(Layout):
     def add(self, client):
         node = self.root.get_shortest() if self.fair else self.current
         self.current = node.insert(client, int(self.lower_right), self.ratio)
+        self._changed()
 
     def remove(self, client):
         node = self.get_node(client)
         if node:
+            self._changed()
             if node.parent:
                 node = node.parent.remove(node)
                 newclient = next(node.clients(), None)
@@ -198,9 +255,22 @@ class Bsp(Layout):
             node.client = None
             self.current = self.root
 
-    def configure(self, client, screen):
+    def layout(self, windows, screen):
+        # the geometry of the whole tree is worked out once for all clients
         self.root.calc_geom(screen.x, screen.y, screen.width,
                             screen.height)
+        self._edges = None
+        self._geometry_done = True
+        try:
+            Layout.layout(self, windows, screen)
+        finally:
+            self._geometry_done = False
+
+    def configure(self, client, screen):
+        if not self._geometry_done:
+            self.root.calc_geom(screen.x, screen.y, screen.width,
+                                screen.height)
+            self._edges = None
         node = self.get_node(client)
         color = self.group.lavinder.color_pixel(
             self.border_focus if client.has_focus else self.border_normal)
@@ -218,6 +288,7 @@ class Bsp(Layout):
     def cmd_toggle_split(self):
         if self.current.parent:
             self.current.parent.split_horizontal = not self.current.parent.split_horizontal
+            self._changed()
         self.group.layout_all()
 
     def focus_first(self):
@@ -252,68 +323,20 @@ class Bsp(Layout):
             self.group.focus(client, True)
 
     def find_left(self):
-        child = self.current
-        parent = child.parent
-        while parent:
-            if parent.split_horizontal and child is parent.children[1]:
-                neighbor = parent.children[0]
-                center = self.current.y + self.current.h * 0.5
-                while neighbor.client is None:
-                    if neighbor.split_horizontal or neighbor.children[1].y < center:
-                        neighbor = neighbor.children[1]
-                    else:
-                        neighbor = neighbor.children[0]
-                return neighbor
-            child = parent
-            parent = child.parent
+        node = self.current
+        return self._neighbor("right", node.x, node.y + node.h * 0.5, False)
 
     def find_right(self):
-        child = self.current
-        parent = child.parent
-        while parent:
-            if parent.split_horizontal and child is parent.children[0]:
-                neighbor = parent.children[1]
-                center = self.current.y + self.current.h * 0.5
-                while neighbor.client is None:
-                    if neighbor.split_horizontal or neighbor.children[1].y > center:
-                        neighbor = neighbor.children[0]
-                    else:
-                        neighbor = neighbor.children[1]
-                return neighbor
-            child = parent
-            parent = child.parent
+        node = self.current
+        return self._neighbor("left", node.x + node.w, node.y + node.h * 0.5, True)
 
     def find_up(self):
-        child = self.current
-        parent = child.parent
-        while parent:
-            if not parent.split_horizontal and child is parent.children[1]:
-                neighbor = parent.children[0]
-                center = self.current.x + self.current.w * 0.5
-                while neighbor.client is None:
-                    if not neighbor.split_horizontal or neighbor.children[1].x < center:
-                        neighbor = neighbor.children[1]
-                    else:
-                        neighbor = neighbor.children[0]
-                return neighbor
-            child = parent
-            parent = child.parent
+        node = self.current
+        return self._neighbor("down", node.y, node.x + node.w * 0.5, False)
 
     def find_down(self):
-        child = self.current
-        parent = child.parent
-        while parent:
-            if not parent.split_horizontal and child is parent.children[0]:
-                neighbor = parent.children[1]
-                center = self.current.x + self.current.w * 0.5
-                while neighbor.client is None:
-                    if not neighbor.split_horizontal or neighbor.children[1].x > center:
-                        neighbor = neighbor.children[0]
-                    else:
-                        neighbor = neighbor.children[1]
-                return neighbor
-            child = parent
-            parent = child.parent
+        node = self.current
+        return self._neighbor("up", node.y + node.h, node.x + node.w * 0.5, True)
 
     def cmd_left(self):
         node = self.find_left()
@@ -340,6 +363,7 @@ class Bsp(Layout):
         if node:
             node.client, self.current.client = self.current.client, node.client
             self.current = node
+            self._changed()
             self.group.layout_all()
         elif self.current is not self.root:
             node = self.current
@@ -351,6 +375,7 @@ class Bsp(Layout):
             node.parent = newroot
             self.root = newroot
             self.current = node
+            self._changed()
             self.group.layout_all()
 
     def cmd_shuffle_right(self):
@@ -358,6 +383,7 @@ class Bsp(Layout):
         if node:
             node.client, self.current.client = self.current.client, node.client
             self.current = node
+            self._changed()
             self.group.layout_all()
         elif self.current is not self.root:
             node = self.current
@@ -369,6 +395,7 @@ class Bsp(Layout):
             node.parent = newroot
             self.root = newroot
             self.current = node
+            self._changed()
             self.group.layout_all()
 
     def cmd_shuffle_up(self):
@@ -376,6 +403,7 @@ class Bsp(Layout):
         if node:
             node.client, self.current.client = self.current.client, node.client
             self.current = node
+            self._changed()
             self.group.layout_all()
         elif self.current is not self.root:
             node = self.current
@@ -387,6 +415,7 @@ class Bsp(Layout):
             node.parent = newroot
             self.root = newroot
             self.current = node
+            self._changed()
             self.group.layout_all()
 
     def cmd_shuffle_down(self):
@@ -394,6 +423,7 @@ class Bsp(Layout):
         if node:
             node.client, self.current.client = self.current.client, node.client
             self.current = node
+            self._changed()
             self.group.layout_all()
         elif self.current is not self.root:
             node = self.current
@@ -405,6 +435,7 @@ class Bsp(Layout):
             node.parent = newroot
             self.root = newroot
             self.current = node
+            self._changed()
             self.group.layout_all()
 
     def cmd_grow_left(self):
@@ -414,6 +445,7 @@ class Bsp(Layout):
             if parent.split_horizontal and child is parent.children[1]:
                 parent.split_ratio = max(5,
                                          parent.split_ratio - self.grow_amount)
+                self._changed()
                 self.group.layout_all()
                 break
             child = parent
@@ -426,6 +458,7 @@ class Bsp(Layout):
             if parent.split_horizontal and child is parent.children[0]:
                 parent.split_ratio = min(95,
                                          parent.split_ratio + self.grow_amount)
+                self._changed()
                 self.group.layout_all()
                 break
             child = parent
@@ -438,6 +471,7 @@ class Bsp(Layout):
             if not parent.split_horizontal and child is parent.children[1]:
                 parent.split_ratio = max(5,
                                          parent.split_ratio - self.grow_amount)
+                self._changed()
                 self.group.layout_all()
                 break
             child = parent
@@ -450,6 +484,7 @@ class Bsp(Layout):
             if not parent.split_horizontal and child is parent.children[0]:
                 parent.split_ratio = min(95,
                                          parent.split_ratio + self.grow_amount)
+                self._changed()
                 self.group.layout_all()
                 break
             child = parent
@@ -461,6 +496,7 @@ class Bsp(Layout):
         while parent:
             if parent.split_horizontal and child is parent.children[1]:
                 parent.children = parent.children[::-1]
+                self._changed()
                 self.group.layout_all()
                 break
             child = parent
@@ -472,6 +508,7 @@ class Bsp(Layout):
         while parent:
             if parent.split_horizontal and child is parent.children[0]:
                 parent.children = parent.children[::-1]
+                self._changed()
                 self.group.layout_all()
                 break
             child = parent
@@ -483,6 +520,7 @@ class Bsp(Layout):
         while parent:
             if not parent.split_horizontal and child is parent.children[1]:
                 parent.children = parent.children[::-1]
+                self._changed()
                 self.group.layout_all()
                 break
             child = parent
@@ -494,6 +532,7 @@ class Bsp(Layout):
         while parent:
             if not parent.split_horizontal and child is parent.children[0]:
                 parent.children = parent.children[::-1]
+                self._changed()
                 self.group.layout_all()
                 break
             child = parent
@@ -507,4 +546,5 @@ class Bsp(Layout):
                 distribute = False
         if distribute:
             self.root.distribute()
+        self._changed()
         self.group.layout_all()
@@ -15,7 +15,7 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from .base import Layout, _ClientList
+from .base import Layout, Placement, _ClientList
 
 
 class _Column(_ClientList):
@@ -201,57 +201,68 @@ class Columns(Layout):
             self.remove_column(c)
         return self.columns[self.current].cw
 
-    def configure(self, client, screen):
+    def arrange(self, windows, screen):
+        colors = {
+            (True, True): self.group.lavinder.color_pixel(self.border_focus),
+            (True, False): self.group.lavinder.color_pixel(self.border_focus_stack),
+            (False, True): self.group.lavinder.color_pixel(self.border_normal),
+            (False, False): self.group.lavinder.color_pixel(self.border_normal_stack),
+        }
+        # client -> column, its x and width, and the client's y and height
+        # within the column if it is split
+        geometry = {}
         pos = 0
         for col in self.columns:
-            if client in col:
-                break
+            width = int(0.5 + col.width * screen.width * 0.01 / len(self.columns))
+            x = screen.x + int(0.5 + pos * screen.width * 0.01 / len(self.columns))
             pos += col.width
-        else:
-            client.hide()
-            return
-        if client.has_focus:
-            color = self.group.lavinder.color_pixel(self.border_focus if col.split
-                                                    else self.border_focus_stack)
-        else:
-            color = self.group.lavinder.color_pixel(self.border_normal if col.split
-                                                    else self.border_normal_stack)
-        if len(self.columns) == 1 and (len(col) == 1 or not col.split):
-            border = 0
-        else:
-            border = self.border_width
-        width = int(0.5 + col.width * screen.width * 0.01 / len(self.columns))
-        x = screen.x + int(0.5 + pos * screen.width * 0.01 / len(self.columns))
-        if col.split:
-            pos = 0
+            cpos = 0
             for c in col:
-                if client == c:
-                    break
-                pos += col.heights[c]
-            height = int(
-                0.5 + col.heights[client] * screen.height * 0.01 / len(col))
-            y = screen.y + int(0.5 + pos * screen.height * 0.01 / len(col))
-            client.place(
-                x,
-                y,
-                width - 2 * border,
-                height - 2 * border,
-                border,
-                color,
-                margin=self.margin)
-            client.unhide()
-        elif client == col.cw:
-            client.place(
-                x,
-                screen.y,
-                width - 2 * border,
-                screen.height - 2 * border,
-                border,
-                color,
-                margin=self.margin)
-            client.unhide()
-        else:
-            client.hide()
+                if c in geometry:
+                    continue
+                if col.split:
+                    height = int(
+                        0.5 + col.heights[c] * screen.height * 0.01 / len(col))
+                    y = screen.y + int(0.5 + cpos * screen.height * 0.01 / len(col))
+                else:
+                    height = y = None
+                geometry[c] = (col, x, width, y, height)
+                cpos += col.heights[c]
+
+        placements = []
+        for client in windows:
+            if client not in geometry:
+                placements.append(Placement(client))
+                continue
+            col, x, width, y, height = geometry[client]
+            color = colors[client.has_focus, bool(col.split)]
+            if len(self.columns) == 1 and (len(col) == 1 or not col.split):
+                border = 0
+            else:
+                border = self.border_width
+            if col.split:
+                placements.append(Placement(
+                    client,
+                    x,
+                    y,
+                    width - 2 * border,
+                    height - 2 * border,
+                    border,
+                    color,
+                    margin=self.margin))
+            elif client == col.cw:
+                placements.append(Placement(
+                    client,
+                    x,
+                    screen.y,
+                    width - 2 * border,
+                    screen.height - 2 * border,
+                    border,
+                    color,
+                    margin=self.margin))
+            else:
+                placements.append(Placement(client))
+        return placements
 
     def focus_first(self):
         """Returns first client in first column of layout"""
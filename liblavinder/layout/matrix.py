@@ -26,7 +26,7 @@
 # SOFTWARE.
 import math
 
-from .base import _SimpleLayoutBase
+from .base import Placement, _SimpleLayoutBase
 
 
 class Matrix(_SimpleLayoutBase):
@@ -99,35 +99,35 @@ class Matrix(_SimpleLayoutBase):
         If needed a new row in matrix is created"""
         return self.clients.append(client)
 
-    def configure(self, client, screen):
-        if client not in self.clients:
-            return
-        idx = self.clients.index(client)
-        row = idx // self.columns
-        col = idx % self.columns
+    def arrange(self, windows, screen):
+        indices = {client: idx for idx, client in enumerate(self.clients)}
         column_size = int(math.ceil(len(self.clients) / self.columns))
-        if client.has_focus:
-            px = self.group.lavinder.color_pixel(self.border_focus)
-        else:
-            px = self.group.lavinder.color_pixel(self.border_normal)
+        focus_px = self.group.lavinder.color_pixel(self.border_focus)
+        normal_px = self.group.lavinder.color_pixel(self.border_normal)
         # calculate position and size
         column_width = int(screen.width / float(self.columns))
-        row_height = int(screen.height / float(column_size))
-        xoffset = screen.x + col * column_width
-        yoffset = screen.y + row * row_height
+        row_height = int(screen.height / float(column_size or 1))
         win_width = column_width - 2 * self.border_width
         win_height = row_height - 2 * self.border_width
-        # place
-        client.place(
-            xoffset,
-            yoffset,
-            win_width,
-            win_height,
-            self.border_width,
-            px,
-            margin=self.margin,
-        )
-        client.unhide()
+
+        placements = []
+        for client in windows:
+            idx = indices.get(client)
+            if idx is None:
+                continue
+            row = idx // self.columns
+            col = idx % self.columns
+            placements.append(Placement(
+                client,
+                screen.x + col * column_width,
+                screen.y + row * row_height,
+                win_width,
+                win_height,
+                self.border_width,
+                focus_px if client.has_focus else normal_px,
+                margin=self.margin,
+            ))
+        return placements
 
     cmd_previous = _SimpleLayoutBase.previous
     cmd_next = _SimpleLayoutBase.next
@@ -29,7 +29,7 @@
 
 import math
 
-from .base import _SimpleLayoutBase
+from .base import Placement, _SimpleLayoutBase
 
 
 ROWCOL = 1  # do rows at a time left to right top down
@@ -237,7 +237,7 @@ class RatioTile(_SimpleLayoutBase):
         self.dirty = True
         return _SimpleLayoutBase.remove(self, w)
 
-    def configure(self, win, screen):
+    def arrange(self, windows, screen):
         # force recalc
         if not self.last_screen or self.last_screen != screen:
             self.last_screen = screen
@@ -267,26 +267,28 @@ class RatioTile(_SimpleLayoutBase):
             )
 
             self.dirty = False
-        try:
-            idx = self.clients.index(win)
-        except ValueError:
-            win.hide()
-            return
-        x, y, w, h = self.layout_info[idx]
-        if win.has_focus:
-            bc = self.group.lavinder.color_pixel(self.border_focus)
-        else:
-            bc = self.group.lavinder.color_pixel(self.border_normal)
-        win.place(
-            x,
-            y,
-            w - self.border_width * 2,
-            h - self.border_width * 2,
-            self.border_width,
-            bc,
-            margin=self.margin,
-        )
-        win.unhide()
+        indices = {win: idx for idx, win in enumerate(self.clients)}
+        focus_bc = self.group.lavinder.color_pixel(self.border_focus)
+        normal_bc = self.group.lavinder.color_pixel(self.border_normal)
+
+        placements = []
+        for win in windows:
+            idx = indices.get(win)
+            if idx is None:
+                placements.append(Placement(win))
+                continue
+            x, y, w, h = self.layout_info[idx]
+            placements.append(Placement(
+                win,
+                x,
+                y,
+                w - self.border_width * 2,
+                h - self.border_width * 2,
+                self.border_width,
+                focus_bc if win.has_focus else normal_bc,
+                margin=self.margin,
+            ))
+        return placements
 
     def info(self):
         d = _SimpleLayoutBase.info(self)
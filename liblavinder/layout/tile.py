@@ -30,7 +30,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from .base import _SimpleLayoutBase
+from .base import Placement, _SimpleLayoutBase
 
 
 class Tile(_SimpleLayoutBase):
@@ -108,40 +108,44 @@ class Tile(_SimpleLayoutBase):
             self.clients.add(client, offset_to_current)
         self.reset_master()
 
-    def configure(self, client, screen):
+    def arrange(self, windows, screen):
         screen_width = screen.width
         screen_height = screen.height
         border_width = self.border_width
-        if self.clients and client in self.clients:
-            pos = self.clients.index(client)
-            if client in self.master_windows:
+        focus_bc = self.group.lavinder.color_pixel(self.border_focus)
+        normal_bc = self.group.lavinder.color_pixel(self.border_normal)
+        indices = {client: pos for pos, client in enumerate(self.clients)}
+        slaves = len(self.slave_windows)
+
+        placements = []
+        for client in windows:
+            pos = indices.get(client)
+            if pos is None:
+                placements.append(Placement(client))
+                continue
+            if pos < self.master:
                 w = int(screen_width * self.ratio) \
-                    if len(self.slave_windows) or not self.expand \
+                    if slaves or not self.expand \
                     else screen_width
                 h = screen_height // self.master
                 x = screen.x
                 y = screen.y + pos * h
             else:
                 w = screen_width - int(screen_width * self.ratio)
-                h = screen_height // (len(self.slave_windows))
+                h = screen_height // slaves
                 x = screen.x + int(screen_width * self.ratio)
-                y = screen.y + self.clients[self.master:].index(client) * h
-            if client.has_focus:
-                bc = self.group.lavinder.color_pixel(self.border_focus)
-            else:
-                bc = self.group.lavinder.color_pixel(self.border_normal)
-            client.place(
+                y = screen.y + (pos - self.master) * h
+            placements.append(Placement(
+                client,
                 x,
                 y,
                 w - border_width * 2,
                 h - border_width * 2,
                 border_width,
-                bc,
+                focus_bc if client.has_focus else normal_bc,
                 margin=self.margin,
-            )
-            client.unhide()
-        else:
-            client.hide()
+            ))
+        return placements
 
     def info(self):
         d = _SimpleLayoutBase.info(self)
@@ -436,6 +436,11 @@ class TreeTab(Layout):
     def draw_panel(self, *args):
         if not self._panel:
             return
+        self.group.lavinder.schedule_redraw(self._draw_panel)
+
+    def _draw_panel(self):
+        if not self._panel or self._drawer is None:
+            return
         self._drawer.clear(self.bg_color)
         self._tree.draw(self, 0)
         self._drawer.draw(offsetx=0, width=self.panel_width)
@@ -461,6 +466,7 @@ class TreeTab(Layout):
         Layout.finalize(self)
         if self._drawer is not None:
             self._drawer.finalize()
+            self._drawer = None
 
     def info(self):
         d = Layout.info(self)
@@ -33,7 +33,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from .base import _SimpleLayoutBase
+from .base import Placement, _SimpleLayoutBase
+import itertools
 import math
 
 
@@ -264,41 +265,49 @@ class MonadTall(_SimpleLayoutBase):
             self._maximize_secondary()
         self.group.layout_all()
 
-    def configure(self, client, screen):
-        "Position client based on order and sizes"
+    def arrange(self, windows, screen):
+        "Position clients based on order and sizes"
         # if no sizes or normalize flag is set, normalize
         if not self.relative_sizes or self.do_normalize:
             self.cmd_normalize(False)
 
-        # if client not in this layout
-        if not self.clients or client not in self.clients:
-            client.hide()
-            return
-
-        # determine focus border-color
-        if client.has_focus:
-            px = self.group.lavinder.color_pixel(self.border_focus)
-        else:
-            px = self.group.lavinder.color_pixel(self.border_normal)
-
-        # single client - fullscreen
-        if len(self.clients) == 1:
-            client.place(
-                self.group.screen.dx,
-                self.group.screen.dy,
-                self.group.screen.dwidth - 2 * self.single_border_width,
-                self.group.screen.dheight - 2 * self.single_border_width,
-                self.single_border_width,
-                px,
-                margin=self.single_margin,
-            )
-            client.unhide()
-            return
-        cidx = self.clients.index(client)
-        self._configure_specific(client, screen, px, cidx)
-        client.unhide()
+        focus_px = self.group.lavinder.color_pixel(self.border_focus)
+        normal_px = self.group.lavinder.color_pixel(self.border_normal)
+        indices = {client: cidx for cidx, client in enumerate(self.clients)}
+        # the sum of the relative sizes of the secondary clients before each
+        offsets = list(itertools.accumulate([0] + self.relative_sizes))
+        single = len(self.clients) == 1
+
+        placements = []
+        for client in windows:
+            cidx = indices.get(client)
+            # if client not in this layout
+            if cidx is None:
+                placements.append(Placement(client))
+                continue
+
+            # determine focus border-color
+            px = focus_px if client.has_focus else normal_px
+
+            # single client - fullscreen
+            if single:
+                placements.append(Placement(
+                    client,
+                    self.group.screen.dx,
+                    self.group.screen.dy,
+                    self.group.screen.dwidth - 2 * self.single_border_width,
+                    self.group.screen.dheight - 2 * self.single_border_width,
+                    self.single_border_width,
+                    px,
+                    margin=self.single_margin,
+                ))
+            else:
+                placements.append(
+                    self._configure_specific(client, screen, px, cidx, offsets)
+                )
+        return placements
 
-    def _configure_specific(self, client, screen, px, cidx):
+    def _configure_specific(self, client, screen, px, cidx, offsets):
         """Specific configuration for xmonad tall."""
         # calculate main/secondary pane size
         width_main = int(self.group.screen.dwidth * self.ratio)
@@ -326,9 +335,7 @@ class MonadTall(_SimpleLayoutBase):
             width = width_shared - 2 * self.border_width
             # ypos is the sum of all clients above it
             ypos = self.group.screen.dy + \
-                self._get_absolute_size_from_relative(
-                    sum(self.relative_sizes[:cidx - 1])
-                )
+                self._get_absolute_size_from_relative(offsets[cidx - 1])
             # get height from precalculated height list
             height = self._get_absolute_size_from_relative(
                 self.relative_sizes[cidx - 1]
@@ -338,7 +345,8 @@ class MonadTall(_SimpleLayoutBase):
                 ypos -= self.margin
                 height += self.margin
             # place client based on calculated dimensions
-            client.place(
+            return Placement(
+                client,
                 xpos,
                 ypos,
                 width,
@@ -350,7 +358,8 @@ class MonadTall(_SimpleLayoutBase):
         else:
             # main client
             width = width_main - 2 * self.border_width
-            client.place(
+            return Placement(
+                client,
                 xpos + self.margin,
                 self.group.screen.dy + self.margin,
                 width - self.margin,
@@ -855,7 +864,7 @@ class MonadWide(MonadTall):
         else:
             self._grow_secondary(maxed_size)
 
-    def _configure_specific(self, client, screen, px, cidx):
+    def _configure_specific(self, client, screen, px, cidx, offsets):
         """Specific configuration for xmonad wide."""
         # calculate main/secondary column widths
         height_main = int(self.group.screen.dheight * self.ratio)
@@ -883,9 +892,7 @@ class MonadWide(MonadTall):
             height = height_shared - 2 * self.border_width
             # xpos is the sum of all clients left of it
             xpos = self.group.screen.dx + \
-                self._get_absolute_size_from_relative(
-                    sum(self.relative_sizes[:cidx - 1])
-                )
+                self._get_absolute_size_from_relative(offsets[cidx - 1])
             # get width from precalculated witdh list
             width = self._get_absolute_size_from_relative(
                 self.relative_sizes[cidx - 1]
@@ -895,7 +902,8 @@ class MonadWide(MonadTall):
                 xpos -= self.margin
                 width += self.margin
             # place client based on calculated dimensions
-            client.place(
+            return Placement(
+                client,
                 xpos,
                 ypos,
                 width - 2 * self.border_width,
@@ -907,7 +915,8 @@ class MonadWide(MonadTall):
         else:
             # main client
             height = height_main - 2 * self.border_width
-            client.place(
+            return Placement(
+                client,
                 self.group.screen.dx + self.margin,
                 ypos + self.margin,
                 (self.group.screen.dwidth -
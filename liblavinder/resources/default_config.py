@@ -43,6 +43,9 @@ dgroups_key_binder = None
 dgroups_app_rules = []
 follow_mouse_focus = False
 bring_front_click = True
+coalesce_events = True
+frame_rate = 60
+relayout_grab_server = False
 cursor_warp = False
 auto_fullscreen = False
 focus_on_window_activation = "smart"
@@ -25,10 +25,12 @@
     This can be used standalone or in other shell scripts.
 """
 
+import json
 import pprint
 import argparse
-from liblavinder.command import Client
+from liblavinder.command import Client, lazy
 from liblavinder.command import CommandError, CommandException
+from liblavinder.ipc import IPCError
 
 
 def get_formated_info(obj, cmd, args=True, short=True):
@@ -98,7 +100,9 @@ def get_object(argv):
     Constructs a path to object and returns given object (if it exists).
     """
 
-    client = Client()
+    # a single invocation can make one call per listed command, so keep the
+    # connection open instead of reconnecting for each of them
+    client = Client(persistent=True)
     obj = client
 
     if argv[0] == "cmd":
@@ -139,6 +143,35 @@ def run_function(obj, funcname, args):
     return ret
 
 
+def run_batch(exprs):
+    "Run command expressions like \"group['1'].info()\" in a single request."
+    calls = []
+    for expr in exprs:
+        try:
+            calls.append(eval("lazy." + expr, {"lazy": lazy}))
+        except Exception:
+            print("error: Sorry cannot parse command '{}'".format(expr))
+            exit()
+
+    for expr, ret in zip(exprs, Client().batch(calls)):
+        print(expr)
+        if isinstance(ret, (CommandError, CommandException)):
+            print("error: {}".format(ret))
+        else:
+            pprint.pprint(ret)
+
+
+def print_events(events):
+    "Print the given hook events as JSON lines as they happen."
+    try:
+        for event in Client().subscribe(*events):
+            print(json.dumps(event), flush=True)
+    except KeyboardInterrupt:
+        pass
+    except IPCError as e:
+        print("error: {}".format(e))
+
+
 def print_base_objects():
     "Prints access objects of Client, use cmd for commands."
     actions = ["-o cmd", "-o window", "-o layout", "-o group", "-o bar"]
@@ -154,7 +187,9 @@ Examples:\n\
  lavinder-cmd -o cmd\n\
  lavinder-cmd -o cmd -f prev_layout -i\n\
  lavinder-cmd -o cmd -f prev_layout -a 3 # prev_layout on group 3\n\
- lavinder-cmd -o group 3 -f focus_back\n
+ lavinder-cmd -o group 3 -f focus_back\n\
+ lavinder-cmd -b "windows()" "group['3'].info()" # in one request\n\
+ lavinder-cmd -s focus_change setgroup # print events as they happen\n
 '''
     fmt = argparse.RawDescriptionHelpFormatter
 
@@ -170,9 +205,21 @@ Examples:\n\
     parser.add_argument('--info', '-i', dest='info', action='store_true',
                         help='''With both --object and --function args prints\
                         documentation for function.''')
+    parser.add_argument('--batch', '-b', dest='batch', nargs='+',
+                        help='''Run the given commands, like "windows()" or\
+                        "group['1'].info()", with a single request.''')
+    parser.add_argument('--subscribe', '-s', dest='events', nargs='+',
+                        help='''Print the given hook events, like focus_change,\
+                        as JSON lines as they happen.''')
     args = parser.parse_args()
 
-    if args.obj_spec:
+    if args.batch:
+        run_batch(args.batch)
+
+    elif args.events:
+        print_events(args.events)
+
+    elif args.obj_spec:
 
         obj = get_object(args.obj_spec)
 
@@ -255,6 +255,53 @@ class QSh:
         else:
             return "No such command: %s" % arg
 
+    def do_batch(self, arg):
+        """Run several commands of the current object in a single request
+
+        Commands are separated by ";". Each result is shown on its own line,
+        and a failing command does not stop the others.
+
+        Examples
+        ========
+
+            > batch windows(); groups(); screens()
+
+            > cd group/1
+            group['1']> batch info(); next_window()
+        """
+        calls = []
+        for part in arg.split(";"):
+            part = part.strip()
+            if not part:
+                continue
+            match = re.search(r"\W", part)
+            if match:
+                cmd_name, args = part[:match.start()], part[match.start():]
+            else:
+                cmd_name, args = part, "()"
+            if cmd_name not in self._commands:
+                return "No such command: %s" % cmd_name
+            cmd = getattr(self.current, cmd_name)
+            try:
+                calls.append(eval(
+                    "call%s" % args,
+                    {},
+                    dict(call=lambda *a, **k: command._Call(cmd.selectors, cmd.name, *a, **k))
+                ))
+            except SyntaxError as v:
+                return "Syntax error in expression: %s" % v.text
+
+        lines = []
+        for call, val in zip(calls, self.clientroot.batch(calls)):
+            if isinstance(val, command.CommandException):
+                val = "Command exception: %s" % val
+            elif isinstance(val, command.CommandError):
+                val = "Command error: %s" % val
+            elif not isinstance(val, str):
+                val = pprint.pformat(val)
+            lines.append("%s: %s" % (call.name, val))
+        return "\n".join(lines)
+
     def do_exit(self, args):
         """Exit qshell"""
         sys.exit(0)
@@ -173,12 +173,13 @@ class _Widget(command.CommandObject, configurable.Configurable):
     def _configure(self, lavinder, bar):
         self.lavinder = lavinder
         self.bar = bar
-        self.drawer = drawer.Drawer(
-            lavinder,
-            self.win.wid,
-            self.bar.width,
-            self.bar.height
-        )
+        # The bar fits the drawer to the widget's length when it lays the
+        # widgets out, so it only needs to span the bar's breadth here.
+        if self.bar.horizontal:
+            width, height = 1, self.bar.height
+        else:
+            width, height = self.bar.width, 1
+        self.drawer = drawer.Drawer(lavinder, self.win.wid, width, height)
         if not self.configured:
             self.configured = True
             self.lavinder.call_soon(self.timer_setup)
@@ -190,8 +191,7 @@ class _Widget(command.CommandObject, configurable.Configurable):
 
     def clear(self):
         self.drawer.set_source_rgb(self.bar.background)
-        self.drawer.fillrect(self.offsetx, self.offsety, self.width,
-                             self.height)
+        self.drawer.fillrect(0, 0, self.width, self.height)
 
     def info(self):
         return dict(
@@ -235,7 +235,9 @@ class _Widget(command.CommandObject, configurable.Configurable):
         """
             Method that draws the widget. You may call this explicitly to
             redraw the widget, but only if the length of the widget hasn't
-            changed. If it has, you must call bar.draw instead.
+            changed. If it has, you must call bar.draw instead, or better
+            bar.damage(widget, bar.GEOMETRY), which only redraws the widgets
+            whose position or length actually changed.
         """
         raise NotImplementedError
 
@@ -294,6 +296,10 @@ class _TextBox(_Widget):
         ("markup", False, "Whether or not to use pango markup"),
     ]  # type: List[Tuple[str, Any, str]]
 
+    # Whether to keep the rendered text around in drawer.text_surface_cache,
+    # for widgets that show the same few strings over and over again.
+    cache_text = False
+
     def __init__(self, text=" ", width=bar.CALCULATED, **config):
         self.layout = None
         _Widget.__init__(self, width, **config)
@@ -359,6 +365,7 @@ class _TextBox(_Widget):
             self.fontsize,
             self.fontshadow,
             markup=self.markup,
+            cache=self.cache_text,
         )
 
     def calculate_length(self):
@@ -393,7 +400,9 @@ class _TextBox(_Widget):
             self.fontsize = fontsize
         if fontshadow is not UNSPECIFIED:
             self.fontshadow = fontshadow
-        self.bar.draw()
+        # text rendered in the old font won't be shown again
+        drawer.text_surface_cache.clear()
+        self.bar.damage(self, bar.GEOMETRY)
 
     def info(self):
         d = _Widget.info(self)
@@ -452,12 +461,12 @@ class InLoopPollText(_TextBox):
         old_width = self.layout.width
         if self.text != text:
             self.text = text
-            # If our width hasn't changed, we just draw ourselves. Otherwise,
-            # we draw the whole bar.
+            # If our width hasn't changed, only we need redrawing. Otherwise,
+            # the bar has to lay out the widgets again.
             if self.layout.width == old_width:
-                self.draw()
+                self.bar.damage(self, bar.CONTENT)
             else:
-                self.bar.draw()
+                self.bar.damage(self, bar.GEOMETRY)
 
 
 class ThreadedPollText(InLoopPollText):
@@ -530,9 +539,9 @@ class ThreadPoolText(_TextBox):
         self.text = text
 
         if self.layout.width == old_width:
-            self.draw()
+            self.bar.damage(self, bar.CONTENT)
         else:
-            self.bar.draw()
+            self.bar.damage(self, bar.GEOMETRY)
 
     def poll(self):
         pass
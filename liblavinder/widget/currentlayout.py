@@ -41,6 +41,7 @@ class CurrentLayout(base._TextBox):
     the bar containing the widget, is on.
     """
     orientations = base.ORIENTATION_HORIZONTAL
+    cache_text = True
 
     def __init__(self, width=bar.CALCULATED, **config):
         base._TextBox.__init__(self, "", width, **config)
@@ -31,13 +31,17 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import array
+import collections
+
 import cairocffi
 
 from . import base
+from .sampler import sampler, proc_path, parse_stat, parse_meminfo, \
+    parse_int, parse_fields
 from liblavinder.log_utils import logger
 from os import statvfs
 import time
-import platform
 
 __all__ = [
     'CPUGraph',
@@ -49,8 +53,61 @@ __all__ = [
 ]
 
 
+class _Samples:
+    """A fixed number of samples in a ring buffer, with their running maximum
+
+    Pushing a sample overwrites the oldest one in place, and the maximum is
+    kept up to date with a monotonic queue, so neither needs to go over all
+    the samples.
+    """
+    def __init__(self, size, value=0):
+        self.size = size
+        self.fill(value)
+
+    def fill(self, value):
+        """Set all the samples to value"""
+        self._data = array.array("d", [value]) * self.size
+        # where the next sample goes, which is where the oldest one is
+        self._pos = 0
+        # the number of samples pushed, used to number them
+        self._count = 0
+        # (number, value) of the samples that may still become the maximum,
+        # in decreasing order of value. The initial samples are numbered
+        # -size to -1 and all have the same value.
+        self._maxes = collections.deque([(-1, value)])
+
+    def push(self, value, count=1):
+        data, size, maxes = self._data, self.size, self._maxes
+        for _ in range(count):
+            data[self._pos] = value
+            self._pos = (self._pos + 1) % size
+            number = self._count
+            self._count += 1
+            while maxes and maxes[-1][1] <= value:
+                maxes.pop()
+            maxes.append((number, value))
+            if maxes[0][0] <= number - size:
+                maxes.popleft()
+
+    @property
+    def max(self):
+        return self._maxes[0][1]
+
+    @property
+    def latest(self):
+        return self._data[self._pos - 1]
+
+    def oldest_first(self):
+        return self._data[self._pos:] + self._data[:self._pos]
+
+    def __len__(self):
+        return self.size
+
+
 class _Graph(base._Widget):
     fixed_upper_bound = False
+    # the sampler.ProcFile the graph is updated from, if it has one
+    source = None
     defaults = [
         ("graph_color", "18BAEB", "Graph color"),
         ("fill_color", "1667EB.3", "Fill color for linefill graph"),
@@ -68,13 +125,25 @@ class _Graph(base._Widget):
     def __init__(self, width=100, **config):
         base._Widget.__init__(self, width, **config)
         self.add_defaults(_Graph.defaults)
-        self.values = [0] * self.samples
+        self._samples = _Samples(self.samples)
+        # the x coordinates of the samples, for the last width and type drawn
+        self._xs = (None, [])
         self.maxvalue = 0
         self.oldtime = time.time()
         self.lag_cycles = 0
 
     def timer_setup(self):
-        self.timeout_add(self.frequency, self.update)
+        if self.source is not None:
+            sampler.subscribe(
+                self.lavinder, self.source, self.frequency, self.update
+            )
+        else:
+            self.timeout_add(self.frequency, self.update)
+
+    def finalize(self):
+        if self.source is not None:
+            sampler.unsubscribe(self.source, self.frequency, self.update)
+        base._Widget.finalize(self)
 
     @property
     def graphwidth(self):
@@ -84,22 +153,40 @@ class _Graph(base._Widget):
     def graphheight(self):
         return self.bar.height - self.margin_y * 2 - self.border_width * 2
 
+    @property
+    def values(self):
+        """The samples, newest first"""
+        return self._samples.oldest_first()[::-1].tolist()
+
+    @values.setter
+    def values(self, values):
+        self._samples.fill(0)
+        for value in reversed(values[:self.samples]):
+            self._samples.push(value)
+
+    def _points(self, x, y, step, values):
+        key = (x, step, len(values))
+        if self._xs[0] != key:
+            self._xs = (key, [x + i * step for i in range(len(values))])
+        sign = self.val(1)
+        return zip(self._xs[1], [y - sign * val for val in values])
+
     def draw_box(self, x, y, values):
         step = self.graphwidth / float(self.samples)
         self.drawer.set_source_rgb(self.graph_color)
-        for val in values:
-            val = self.val(val)
-            self.drawer.fillrect(x, y - val, step, val)
-            x += step
+        rectangle = self.drawer.ctx.rectangle
+        for px, py in self._points(x, y, step, values):
+            rectangle(px, py, step, y - py)
+        self.drawer.ctx.fill()
 
     def draw_line(self, x, y, values):
         step = self.graphwidth / float(self.samples - 1)
         self.drawer.ctx.set_line_join(cairocffi.LINE_JOIN_ROUND)
         self.drawer.set_source_rgb(self.graph_color)
         self.drawer.ctx.set_line_width(self.line_width)
-        for val in values:
-            self.drawer.ctx.line_to(x, y - self.val(val))
-            x += step
+        line_to = self.drawer.ctx.line_to
+        for px, py in self._points(x, y, step, values):
+            line_to(px, py)
         self.drawer.ctx.stroke()
 
     def draw_linefill(self, x, y, values):
@@ -107,8 +194,9 @@ class _Graph(base._Widget):
         self.drawer.ctx.set_line_join(cairocffi.LINE_JOIN_ROUND)
         self.drawer.set_source_rgb(self.graph_color)
         self.drawer.ctx.set_line_width(self.line_width)
-        for index, val in enumerate(values):
-            self.drawer.ctx.line_to(x + index * step, y - self.val(val))
+        line_to = self.drawer.ctx.line_to
+        for px, py in self._points(x, y, step, values):
+            line_to(px, py)
         self.drawer.ctx.stroke_preserve()
         self.drawer.ctx.line_to(
             x + (len(values) - 1) * step,
@@ -144,8 +232,8 @@ class _Graph(base._Widget):
             y += self.graphheight
         elif not self.start_pos == 'top':
             raise ValueError("Unknown starting position: %s." % self.start_pos)
-        k = 1.0 / (self.maxvalue or 1)
-        scaled = [self.graphheight * val * k for val in reversed(self.values)]
+        k = self.graphheight / (self.maxvalue or 1)
+        scaled = [val * k for val in self._samples.oldest_first()]
 
         if self.type == "box":
             self.draw_box(x, y, scaled)
@@ -164,11 +252,10 @@ class _Graph(base._Widget):
             # the graph samples limit
             self.lag_cycles = 1
 
-        self.values = ([value] * min(self.samples, self.lag_cycles)) + self.values
-        self.values = self.values[:self.samples]
+        self._samples.push(value, min(self.samples, self.lag_cycles))
 
         if not self.fixed_upper_bound:
-            self.maxvalue = max(self.values)
+            self.maxvalue = self._samples.max
         self.draw()
 
     def update(self):
@@ -178,10 +265,11 @@ class _Graph(base._Widget):
         self.oldtime = newtime
 
         self.update_graph()
-        self.timeout_add(self.frequency, self.update)
+        if self.source is None:
+            self.timeout_add(self.frequency, self.update)
 
     def fulfill(self, value):
-        self.values = [value] * len(self.values)
+        self._samples.fill(value)
 
 
 class CPUGraph(_Graph):
@@ -197,33 +285,23 @@ class CPUGraph(_Graph):
         _Graph.__init__(self, **config)
         self.add_defaults(CPUGraph.defaults)
         self.maxvalue = 100
+        self.source = sampler.source(proc_path('/proc/stat'), parse_stat)
         self.oldvalues = self._getvalues()
 
     def _getvalues(self):
-        proc = '/proc/stat'
-        if platform.system() == "FreeBSD":
-            proc = '/compat/linux' + proc
-
-        with open(proc) as file:
-            lines = file.readlines()
-
-            # default to all cores (first line)
-            line = lines.pop(0)
+        cpus = sampler.read(self.source)
 
-            # core specified, grab the corresponding line
-            if isinstance(self.core, int):
-                # we already removed the first line from the list,
-                # so it's 0 indexed now :D
-                line = lines[self.core]
+        # default to all cores (first line)
+        name = "cpu"
 
-                if not line.startswith("cpu%s" % self.core):
-                    raise ValueError("No such core: %s" % self.core)
-            if platform.system() == 'FreeBSD':
-                name, user, nice, sys, idle = line.split(None, 4)
-            else:
-                name, user, nice, sys, idle, iowait, tail = line.split(None, 6)
+        # core specified, grab the corresponding line
+        if isinstance(self.core, int):
+            name = "cpu%s" % self.core
+            if name not in cpus:
+                raise ValueError("No such core: %s" % self.core)
 
-            return (int(user), int(nice), int(sys), int(idle))
+        user, nice, sys, idle = cpus[name][:4]
+        return (user, nice, sys, idle)
 
     def update_graph(self):
         nval = self._getvalues()
@@ -238,27 +316,20 @@ class CPUGraph(_Graph):
             push_value = busy * 100.0 / total
             self.push(push_value)
         else:
-            self.push(self.values[0])
+            self.push(self._samples.latest)
         self.oldvalues = nval
 
 
 def get_meminfo():
-    val = {}
-    proc = '/proc/meminfo'
-    if platform.system() == "FreeBSD":
-        proc = "/compat/linux" + proc
-    with open(proc) as file:
-        for line in file:
-            if line.lstrip().startswith("total"):
-                pass
-            else:
-                key, tail = line.strip().split(':')
-                uv = tail.split()
-                val[key] = int(uv[0])
+    val = dict(sampler.read(_meminfo()))
     val['MemUsed'] = val['MemTotal'] - val['MemFree']
     return val
 
 
+def _meminfo():
+    return sampler.source(proc_path('/proc/meminfo'), parse_meminfo)
+
+
 class MemoryGraph(_Graph):
     """Displays a memory usage graph"""
     orientations = base.ORIENTATION_HORIZONTAL
@@ -266,6 +337,7 @@ class MemoryGraph(_Graph):
 
     def __init__(self, **config):
         _Graph.__init__(self, **config)
+        self.source = _meminfo()
         val = self._getvalues()
         self.maxvalue = val['MemTotal']
 
@@ -289,6 +361,7 @@ class SwapGraph(_Graph):
 
     def __init__(self, **config):
         _Graph.__init__(self, **config)
+        self.source = _meminfo()
         val = self._getvalues()
         self.maxvalue = val['SwapTotal']
         swap = val['SwapTotal'] - val['SwapFree'] - val.get('SwapCached', 0)
@@ -337,18 +410,18 @@ class NetGraph(_Graph):
             interface=self.interface,
             type=self.bandwidth_type == 'down' and 'rx_bytes' or 'tx_bytes'
         )
+        self.source = sampler.source(self.filename, parse_int)
         self.bytes = 0
         self.bytes = self._get_values()
 
     def _get_values(self):
         try:
-            with open(self.filename) as file:
-                val = int(file.read())
-                rval = val - self.bytes
-                self.bytes = val
-                return rval
-        except IOError:
+            val = sampler.read(self.source)
+        except (IOError, ValueError):
             return 0
+        rval = val - self.bytes
+        self.bytes = val
+        return rval
 
     def update_graph(self):
         val = self._get_values()
@@ -417,14 +490,14 @@ class HDDBusyGraph(_Graph):
         self.path = '/sys/block/{dev}/stat'.format(
             dev=self.device
         )
+        self.source = sampler.source(self.path, parse_fields)
         self._prev = 0
 
     def _get_values(self):
         try:
             # io_ticks is field number 9
-            with open(self.path) as f:
-                io_ticks = int(f.read().split()[9])
-        except IOError:
+            io_ticks = int(sampler.read(self.source)[9])
+        except (IOError, ValueError):
             return 0
         activity = io_ticks - self._prev
         self._prev = io_ticks
@@ -71,7 +71,8 @@ class _GroupBase(base._TextBox, base.PaddingMixin, base.MarginMixin):
             "ffffff",
             self.font,
             self.fontsize,
-            self.fontshadow
+            self.fontshadow,
+            cache=True,
         )
         self.setup_hooks()
 
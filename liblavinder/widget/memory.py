@@ -19,15 +19,12 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 from liblavinder.widget import base
+from liblavinder.widget.sampler import sampler, proc_path, parse_meminfo
 
 
 def get_meminfo():
-    val = {}
-    with open('/proc/meminfo') as file:
-        for line in file:
-            key, tail = line.split(':')
-            uv = tail.split()
-            val[key] = int(uv[0]) // 1000
+    source = sampler.source(proc_path('/proc/meminfo'), parse_meminfo)
+    val = {key: value // 1000 for key, value in sampler.read(source).items()}
     val['MemUsed'] = val['MemTotal'] - val['MemFree']
     return val
 
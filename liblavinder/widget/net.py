@@ -19,8 +19,7 @@
 # SOFTWARE.
 from liblavinder.log_utils import logger
 from . import base
-
-from typing import List  # noqa: F401
+from .sampler import sampler, parse_net_dev
 
 
 class Net(base.ThreadedPollText):
@@ -54,16 +53,10 @@ class Net(base.ThreadedPollText):
         return b, letter
 
     def get_stats(self):
-        lines = []  # type: List[str]
-        with open('/proc/net/dev', 'r') as f:
-            lines = f.readlines()[2:]
+        source = sampler.source('/proc/net/dev', parse_net_dev)
         interfaces = {}
-        for s in lines:
-            int_s = s.split()
-            name = int_s[0][:-1]
-            down = float(int_s[1])
-            up = float(int_s[-8])
-            interfaces[name] = {'down': down, 'up': up}
+        for name, (down, up) in sampler.read(source).items():
+            interfaces[name] = {'down': float(down), 'up': float(up)}
         return interfaces
 
     def _format(self, down, up):
@@ -0,0 +1,206 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+    A sampler of system statistics shared by the widgets showing them.
+
+    Each source file in /proc or /sys is kept open and read again from the
+    start, rather than opened anew for every sample, and parsed once per
+    read. Widgets subscribe to a source at an update interval; on every tick
+    of an interval each of its sources is read once and all the subscribers
+    are then called, reading the same snapshot through `read`.
+"""
+import platform
+import threading
+
+from liblavinder.log_utils import logger
+
+
+def proc_path(path):
+    """The path of a /proc file, which FreeBSD's linprocfs mounts elsewhere"""
+    if platform.system() == "FreeBSD":
+        return "/compat/linux" + path
+    return path
+
+
+def parse_stat(data):
+    """The cpu lines of /proc/stat, as a dict of the name to the counters"""
+    cpus = {}
+    for line in data.splitlines():
+        if not line.startswith("cpu"):
+            break
+        fields = line.split()
+        cpus[fields[0]] = [int(i) for i in fields[1:]]
+    return cpus
+
+
+def parse_meminfo(data):
+    """/proc/meminfo as a dict of the name to the value in kB"""
+    val = {}
+    for line in data.splitlines():
+        if line.lstrip().startswith("total"):
+            continue
+        key, tail = line.split(":")
+        val[key] = int(tail.split()[0])
+    return val
+
+
+def parse_net_dev(data):
+    """/proc/net/dev as a dict of the interface to its rx and tx bytes"""
+    interfaces = {}
+    for line in data.splitlines()[2:]:
+        name, stats = line.split(":", 1)
+        stats = stats.split()
+        interfaces[name.strip()] = (int(stats[0]), int(stats[8]))
+    return interfaces
+
+
+def parse_int(data):
+    return int(data)
+
+
+def parse_fields(data):
+    return data.split()
+
+
+class ProcFile:
+    """A file that is kept open and read from the start every time"""
+    def __init__(self, path, parse):
+        self.path = path
+        self.parse = parse
+        self.reads = 0
+        self._file = None
+        # threaded poll widgets read from their own threads
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path)
+                else:
+                    self._file.seek(0)
+                data = self._file.read()
+            except (OSError, ValueError):
+                self.close()
+                raise
+            self.reads += 1
+        return self.parse(data)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _Interval:
+    def __init__(self, lavinder, interval):
+        self.lavinder = lavinder
+        self.interval = interval
+        # source -> callbacks
+        self.subscribers = {}
+        self.handle = None
+
+    def schedule(self, tick):
+        if self.handle is None:
+            self.handle = self.lavinder.call_later(self.interval, tick, self)
+
+    def cancel(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+
+class Sampler:
+    def __init__(self):
+        self._sources = {}
+        self._intervals = {}
+        # the snapshots of the sources being read by the current tick
+        self._current = {}
+
+    def source(self, path, parse):
+        """Get the shared ProcFile for path, parsed with parse"""
+        key = (path, parse)
+        source = self._sources.get(key)
+        if source is None:
+            source = self._sources[key] = ProcFile(path, parse)
+        return source
+
+    def read(self, source):
+        """Get a snapshot of source, which is shared by all the subscribers
+        called for the current tick"""
+        try:
+            snapshot = self._current[source]
+        except KeyError:
+            return source()
+        if isinstance(snapshot, Exception):
+            raise snapshot
+        return snapshot
+
+    def subscribe(self, lavinder, source, interval, callback):
+        """Call callback every interval seconds, along with everything else
+        subscribed at the same interval"""
+        group = self._intervals.get(interval)
+        if group is None:
+            group = self._intervals[interval] = _Interval(lavinder, interval)
+        group.subscribers.setdefault(source, []).append(callback)
+        group.schedule(self._tick)
+
+    def unsubscribe(self, source, interval, callback):
+        group = self._intervals.get(interval)
+        if group is None:
+            return
+        callbacks = group.subscribers.get(source, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            group.subscribers.pop(source, None)
+        if not group.subscribers:
+            group.cancel()
+            del self._intervals[interval]
+
+    def _tick(self, group):
+        group.handle = None
+        try:
+            # a parser failing on an unexpected file is raised again to the
+            # widgets reading it, like an OSError
+            for source in group.subscribers:
+                try:
+                    self._current[source] = source()
+                except Exception as e:
+                    self._current[source] = e
+            for callbacks in list(group.subscribers.values()):
+                for callback in list(callbacks):
+                    try:
+                        callback()
+                    except Exception:
+                        logger.exception("Error in %s:", callback)
+        finally:
+            self._current = {}
+            # every widget at this interval would freeze otherwise
+            if group.subscribers:
+                group.schedule(self._tick)
+
+    def info(self):
+        """The number of reads of each source"""
+        return {
+            source.path: source.reads for source in self._sources.values()
+        }
+
+
+sampler = Sampler()
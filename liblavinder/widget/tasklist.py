@@ -151,6 +151,8 @@ class TaskList(base._Widget, base.PaddingMixin, base.MarginMixin):
         self.add_defaults(base.PaddingMixin.defaults)
         self.add_defaults(base.MarginMixin.defaults)
         self._icons_cache = {}
+        # wid -> (name and state, task name, box width)
+        self._tasks_cache = {}
         self._box_end_positions = []
         self.markup = False
         if self.spacing is None:
@@ -216,6 +218,26 @@ class TaskList(base._Widget, base.PaddingMixin, base.MarginMixin):
 
         return "%s%s" % (state, window_name)
 
+    def get_task(self, window):
+        """
+        Get the task name and box width for given window, which are only
+        computed again when the window's name or state changed.
+        """
+        state = (
+            window.name,
+            window.minimized,
+            window.maximized,
+            window.floating,
+            # only the focused window's markup differs
+            bool(self.markup_focused) and window is window.group.current_window,
+        )
+        entry = self._tasks_cache.get(window.window.wid)
+        if entry is None or entry[0] != state:
+            name = self.get_taskname(window)
+            entry = (state, name, self.box_width(name))
+            self._tasks_cache[window.window.wid] = entry
+        return entry[1], entry[2]
+
     @property
     def windows(self):
         return self.bar.screen.group.windows
@@ -238,7 +260,8 @@ class TaskList(base._Widget, base.PaddingMixin, base.MarginMixin):
                        (window_count - 1) * self.spacing)
         width_avg = width_total / window_count
 
-        names = [self.get_taskname(w) for w in windows]
+        tasks = [self.get_task(w) for w in windows]
+        names = [name for name, _ in tasks]
 
         if self.icon_size == 0:
             icons = len(windows) * [None]
@@ -253,9 +276,9 @@ class TaskList(base._Widget, base.PaddingMixin, base.MarginMixin):
             # Default behaviour: calculated width for each task according to
             # icon and task name consisting
             # of state abbreviation and window name
-            width_boxes = [(self.box_width(names[idx]) +
-                            ((self.icon_size + self.padding_x) if icons[idx] else 0))
-                           for idx in range(window_count)]
+            icon_width = self.icon_size + self.padding_x
+            width_boxes = [(width + (icon_width if icon else 0))
+                           for (_, width), icon in zip(tasks, icons)]
 
         # Obey max_title_width if specified
         if self.max_title_width:
@@ -306,18 +329,29 @@ class TaskList(base._Widget, base.PaddingMixin, base.MarginMixin):
         if wid in self._icons_cache:
             self._icons_cache.pop(wid)
 
+    def remove_task_cache(self, window):
+        self._tasks_cache.pop(window.window.wid, None)
+
     def invalidate_cache(self, window):
         self.remove_icon_cache(window)
         self.update(window)
 
+    def invalidate_task(self, window):
+        self.remove_task_cache(window)
+        self.update(window)
+
+    def remove_caches(self, window):
+        self.remove_icon_cache(window)
+        self.remove_task_cache(window)
+
     def setup_hooks(self):
-        hook.subscribe.client_name_updated(self.update)
+        hook.subscribe.client_name_updated(self.invalidate_task)
         hook.subscribe.focus_change(self.update)
         hook.subscribe.float_change(self.update)
         hook.subscribe.client_urgent_hint_changed(self.update)
 
         hook.subscribe.net_wm_icon_change(self.invalidate_cache)
-        hook.subscribe.client_killed(self.remove_icon_cache)
+        hook.subscribe.client_killed(self.remove_caches)
 
     def drawtext(self, text, textcolor, width):
         if self.markup:
@@ -385,30 +419,33 @@ class TaskList(base._Widget, base.PaddingMixin, base.MarginMixin):
         if cache:
             return cache
 
-        icons = sorted(
-            iter(window.icons.items()),
-            key=lambda x: abs(self.icon_size - int(x[0].split("x")[0]))
+        size = min(
+            window.icons,
+            key=lambda size: abs(self.icon_size - int(size.split("x")[0]))
         )
-        icon = icons[0]
-        width, height = map(int, icon[0].split("x"))
+        width, height = map(int, size.split("x"))
+        data = window.icons[size]
 
         img = cairocffi.ImageSurface.create_for_data(
-            icon[1],
+            data,
             cairocffi.FORMAT_ARGB32,
             width,
             height
         )
 
-        surface = cairocffi.SurfacePattern(img)
-
-        scaler = cairocffi.Matrix()
+        # scale the icon once here rather than every time it's painted
+        scale = self.icon_size / height
+        surface = cairocffi.ImageSurface(
+            cairocffi.FORMAT_ARGB32,
+            max(int(width * scale), 1),
+            self.icon_size
+        )
+        ctx = cairocffi.Context(surface)
+        ctx.scale(scale, scale)
+        ctx.set_source_surface(img)
+        ctx.paint()
+        surface.flush()
 
-        if height != self.icon_size:
-            sp = height / self.icon_size
-            height = self.icon_size
-            width /= sp
-            scaler.scale(sp, sp)
-        surface.set_matrix(scaler)
         self._icons_cache[window.window.wid] = surface
         return surface
 
@@ -421,7 +458,7 @@ class TaskList(base._Widget, base.PaddingMixin, base.MarginMixin):
 
         self.drawer.ctx.save()
         self.drawer.ctx.translate(x, y)
-        self.drawer.ctx.set_source(surface)
+        self.drawer.ctx.set_source_surface(surface)
         self.drawer.ctx.paint()
         self.drawer.ctx.restore()
 
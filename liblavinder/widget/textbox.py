@@ -30,6 +30,7 @@ from . import base
 class TextBox(base._TextBox):
     """A flexible textbox that can be updated from bound keys, scripts, and qshell"""
     orientations = base.ORIENTATION_HORIZONTAL
+    cache_text = True
     defaults = [
         ("font", "sans", "Text font"),
         ("fontsize", None, "Font pixel size. Calculated if None."),
@@ -43,7 +44,7 @@ class TextBox(base._TextBox):
 
     def update(self, text):
         self.text = text
-        self.bar.draw()
+        self.bar.damage(self, bar.GEOMETRY)
 
     def cmd_update(self, text):
         """Update the text in a TextBox widget"""
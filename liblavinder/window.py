@@ -17,9 +17,11 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-import array
+import collections.abc
 import contextlib
+import functools
 import inspect
+import operator
 import traceback
 import warnings
 from xcffib.xproto import EventMask, StackMode, SetMode
@@ -30,6 +32,11 @@ from . import utils
 from . import hook
 from .log_utils import logger
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 # ICCM Constants
 NoValue = 0x0000
@@ -151,6 +158,147 @@ def _float_setter(attr):
     return setter
 
 
+# x * alpha // 255 for every channel value x, at index alpha << 8 | x
+_PREMULTIPLIED = bytes(x * a // 255 for a in range(256) for x in range(256))
+
+
+def premultiply(data):
+    """Premultiply the colour channels of ARGB32 pixels by their alpha
+
+    Returns the pixels in a new writable buffer, as cairo needs for
+    ImageSurface.create_for_data.
+    """
+    if numpy is not None:
+        pixels = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 4)
+        pixels = pixels.astype(numpy.uint16)
+        pixels[:, :3] *= pixels[:, 3:]
+        pixels[:, :3] //= 255
+        return bytearray(pixels.astype(numpy.uint8).tobytes())
+
+    pixels = bytearray(data)
+    alpha = pixels[3::4]
+    if alpha.count(255) == len(alpha):
+        return pixels
+    rows = list(map((256).__mul__, alpha))
+    for channel in range(3):
+        pixels[channel::4] = bytes(map(
+            _PREMULTIPLIED.__getitem__,
+            map(operator.add, rows, pixels[channel::4]),
+        ))
+    return pixels
+
+
+class NetWmIcons(collections.abc.Mapping):
+    """The icons in a _NET_WM_ICON property, by "WIDTHxHEIGHT" size
+
+    Only the sizes are read from the property data up front; the pixels of
+    a size are premultiplied the first time it is looked up, so the sizes
+    nobody draws are never converted.
+    """
+    def __init__(self, data):
+        self._data = data
+        # size -> (offset, length) of its pixels in data
+        self._sizes = {}
+        self._icons = {}
+
+        words = memoryview(data)[:len(data) // 4 * 4].cast("I")
+        pos = 0
+        while pos + 2 <= len(words):
+            width, height = words[pos], words[pos + 1]
+            pos += 2
+            if not width or not height or pos + width * height > len(words):
+                break
+            self._sizes["%sx%s" % (width, height)] = (4 * pos, 4 * width * height)
+            pos += width * height
+
+    def __getitem__(self, size):
+        icon = self._icons.get(size)
+        if icon is None:
+            offset, length = self._sizes[size]
+            icon = premultiply(memoryview(self._data)[offset:offset + length])
+            self._icons[size] = icon
+        return icon
+
+    def __iter__(self):
+        return iter(self._sizes)
+
+    def __len__(self):
+        return len(self._sizes)
+
+
+class Relayout:
+    """Changes to windows that are sent to the X server in one burst
+
+    While a relayout is the lavinder's current one, place(), hide() and
+    unhide() add the requests they would send to it instead. commit() then
+    sends them in the order they were made, with the events they would
+    cause masked only on the windows actually moved, mapped or unmapped,
+    and optionally with the server grabbed so that no intermediate state
+    gets drawn. What has to happen after that, like focusing, is deferred
+    until then.
+    """
+    def __init__(self, lavinder, grab=False):
+        self.lavinder = lavinder
+        self.grab = grab
+        # (window, requests, event mask to disable while sending them)
+        self.changes = []
+        self.deferred = []
+
+    def add(self, win, requests, mask=0):
+        self.changes.append((win, requests, mask))
+
+    def defer(self, func):
+        """Call func once the requests have been sent"""
+        self.deferred.append(func)
+
+    def commit(self):
+        """Send everything, returning the number of requests sent"""
+        requests = self._send()
+        for func in self.deferred:
+            func()
+        return requests
+
+    def _send(self):
+        masks = {}
+        for win, _, mask in self.changes:
+            if mask:
+                masks[win] = masks.get(win, 0) | mask
+        if not self.changes:
+            return 0
+
+        conn = self.lavinder.conn
+        if self.grab:
+            conn.grab_server()
+        sent = 0
+        try:
+            for win, mask in masks.items():
+                win._disable_mask(mask)
+            for win, requests, _ in self.changes:
+                for request in requests:
+                    # a client that went away must not hold up the others
+                    try:
+                        request()
+                    except (xcffib.xproto.WindowError, xcffib.xproto.AccessError):
+                        logger.debug("Relayout request to window %s failed", win.window.wid)
+                        win._forget_placement()
+                sent += 1
+        except Exception:
+            # place() already took these as the windows' state on the server
+            for win, _, _ in self.changes[sent:]:
+                win._forget_placement()
+            raise
+        finally:
+            for win in masks:
+                win._reset_mask()
+            if self.grab:
+                conn.ungrab_server()
+            conn.flush()
+
+        return 2 * len(masks) + 2 * self.grab + sum(
+            len(requests) for _, requests, _ in self.changes
+        )
+
+
 class _Window(command.CommandObject):
     _window_mask = 0  # override in child class
 
@@ -185,6 +333,10 @@ class _Window(command.CommandObject):
 
         self.borderwidth = 0
         self.bordercolor = None
+        # what place() last sent to the X server: the geometry and border
+        # width, and the border colour
+        self._configured = None
+        self._border_pixel = None
         self.name = "<no name>"
         self.strut = None
         self.state = NormalState
@@ -418,12 +570,25 @@ class _Window(command.CommandObject):
 
     def hide(self):
         # We don't want to get the UnmapNotify for this unmap
-        with self.disable_mask(xcffib.xproto.EventMask.StructureNotify):
-            self.window.unmap()
+        relayout = self.lavinder.relayout
+        if relayout is None:
+            with self.disable_mask(xcffib.xproto.EventMask.StructureNotify):
+                self.window.unmap()
+        else:
+            # checking the unmap would cost a round trip per window
+            relayout.add(
+                self,
+                [functools.partial(self.window.unmap, check=False)],
+                EventMask.StructureNotify,
+            )
         self.hidden = True
 
     def unhide(self):
-        self.window.map()
+        relayout = self.lavinder.relayout
+        if relayout is None:
+            self.window.map()
+        else:
+            relayout.add(self, [self.window.map], EventMask.EnterWindow)
         self.state = NormalState
         self.hidden = False
 
@@ -443,26 +608,21 @@ class _Window(command.CommandObject):
             eventmask=self._window_mask
         )
 
+    def _forget_placement(self):
+        """Make the next place() send the whole geometry and border again"""
+        self._configured = None
+        self._border_pixel = None
+
     def place(self, x, y, width, height, borderwidth, bordercolor,
-              above=False, force=False, margin=None):
+              above=False, force=False, margin=None, notify=False):
         """Places the window at the specified location with the given size.
 
         If force is false, than it tries to obey hints
-        """
 
-        # TODO: self.x/y/height/width are updated BEFORE
-        # place is called, so there's no way to know if only
-        # the position is changed, so we are sending
-        # the ConfigureNotify every time place is called
-        #
-        # # if position change and size don't
-        # # send a configure notify. See ICCCM 4.2.3
-        # send_notify = False
-        # if (self.x != x or self.y != y) and \
-        #    (self.width == width and self.height == height):
-        #       send_notify = True
-        # #for now, we just:
-        send_notify = True
+        Only what changed since the window was last placed is sent to the X
+        server. If notify is true the client gets a ConfigureNotify even if
+        nothing changed, as the reply to its ConfigureRequest.
+        """
 
         # Adjust the placement to account for layout margins, if there are any.
         if margin is not None:
@@ -483,23 +643,47 @@ class _Window(command.CommandObject):
         self.borderwidth = borderwidth
         self.bordercolor = bordercolor
 
-        kwarg = dict(
-            x=x,
-            y=y,
-            width=width,
-            height=height,
-            borderwidth=borderwidth,
-        )
+        geometry = (x, y, width, height, borderwidth)
+        previous = self._configured or (None,) * 5
+        kwarg = {
+            name: value
+            for name, value, old in zip(
+                ("x", "y", "width", "height", "borderwidth"), geometry, previous
+            )
+            if value != old
+        }
+        # the stacking order also changes behind our back (clicks, new
+        # windows), so a raise is always sent
         if above:
             kwarg['stackmode'] = StackMode.Above
 
-        self.window.configure(**kwarg)
-
-        if send_notify:
-            self.send_configure_notify(x, y, width, height)
-
-        if bordercolor is not None:
-            self.window.set_attribute(borderpixel=bordercolor)
+        requests = []
+        if kwarg:
+            requests.append(functools.partial(self.window.configure, **kwarg))
+            self._configured = geometry
+
+        # The server only sends a real ConfigureNotify if the window was
+        # resized or its border changed; otherwise ICCCM 4.2.3 has us send a
+        # synthetic one, when it was moved or the client asked for it.
+        resized = not {"width", "height", "borderwidth"}.isdisjoint(kwarg)
+        moved = "x" in kwarg or "y" in kwarg
+        if not resized and (moved or notify):
+            requests.append(functools.partial(
+                self.send_configure_notify, x, y, width, height
+            ))
+
+        if bordercolor is not None and bordercolor != self._border_pixel:
+            requests.append(functools.partial(
+                self.window.set_attribute, borderpixel=bordercolor
+            ))
+            self._border_pixel = bordercolor
+
+        relayout = self.lavinder.relayout
+        if relayout is None:
+            for request in requests:
+                request()
+        elif requests:
+            relayout.add(self, requests, EventMask.EnterWindow if kwarg else 0)
 
     def send_configure_notify(self, x, y, width, height):
         """Send a synthetic ConfigureNotify"""
@@ -722,7 +906,8 @@ class Static(_Window):
             self.width,
             self.height,
             self.borderwidth,
-            self.bordercolor
+            self.bordercolor,
+            notify=True,
         )
         return False
 
@@ -1121,6 +1306,7 @@ class Window(_Window):
                 x, y,
                 width, height,
                 self.borderwidth, self.bordercolor,
+                notify=True,
             )
         self.update_state()
         return False
@@ -1131,33 +1317,7 @@ class Window(_Window):
         icon = self.window.get_property('_NET_WM_ICON', 'CARDINAL')
         if not icon:
             return
-        icon = list(map(ord, icon.value))
-
-        icons = {}
-        while True:
-            if not icon:
-                break
-            size = icon[:8]
-            if len(size) != 8 or not size[0] or not size[4]:
-                break
-
-            icon = icon[8:]
-
-            width = size[0]
-            height = size[4]
-
-            next_pix = width * height * 4
-            data = icon[:next_pix]
-
-            arr = array.array("B", data)
-            for i in range(0, len(arr), 4):
-                mult = arr[i + 3] / 255.
-                arr[i + 0] = int(arr[i + 0] * mult)
-                arr[i + 1] = int(arr[i + 1] * mult)
-                arr[i + 2] = int(arr[i + 2] * mult)
-            icon = icon[next_pix:]
-            icons["%sx%s" % (width, height)] = arr
-        self.icons = icons
+        self.icons = NetWmIcons(icon.value.buf())
         hook.fire("net_wm_icon_change", self)
 
     def handle_ClientMessage(self, event):  # noqa: N802
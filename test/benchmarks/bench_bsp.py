@@ -0,0 +1,113 @@
+"""
+    Scaling benchmark of the Bsp layout, from 10 to 500 clients.
+
+    Bsp used to work out the geometry of the whole tree, and walk the tree to
+    find the client's node, for every client it configured, so a relayout
+    took O(n^2) time. It now works the geometry out once per relayout and
+    keeps a map of clients to nodes. Neighbours are found through an index of
+    the leaves' edges rather than by walking the tree.
+
+    Run with:
+
+        python -m test.benchmarks.bench_bsp
+"""
+import timeit
+
+from liblavinder.layout.bsp import Bsp
+
+COUNTS = (10, 50, 100, 200, 500)
+
+
+class Screen:
+    x = 0
+    y = 0
+    width = 3840
+    height = 2160
+
+
+class FakeLavinder:
+    def color_pixel(self, color):
+        return 0
+
+
+class FakeGroup:
+    lavinder = FakeLavinder()
+
+    def layout_all(self):
+        pass
+
+
+class FakeClient:
+    has_focus = False
+
+    def place(self, *args, **kwargs):
+        pass
+
+    def unhide(self):
+        pass
+
+
+class LegacyBsp(Bsp):
+    def layout(self, windows, screen):
+        for client in windows:
+            self.configure(client, screen)
+
+    def configure(self, client, screen):
+        self._geometry_done = False
+        Bsp.configure(self, client, screen)
+
+    def get_node(self, client):
+        for node in self.root:
+            if client is node.client:
+                return node
+
+    def find_left(self):
+        child = self.current
+        parent = child.parent
+        while parent:
+            if parent.split_horizontal and child is parent.children[1]:
+                neighbor = parent.children[0]
+                center = self.current.y + self.current.h * 0.5
+                while neighbor.client is None:
+                    if neighbor.split_horizontal or neighbor.children[1].y < center:
+                        neighbor = neighbor.children[1]
+                    else:
+                        neighbor = neighbor.children[0]
+                return neighbor
+            child = parent
+            parent = child.parent
+
+
+def setup(cls, count):
+    layout = cls()
+    layout.group = FakeGroup()
+    clients = [FakeClient() for _ in range(count)]
+    for client in clients:
+        layout.add(client)
+    layout.layout(clients, Screen)
+    return layout, clients
+
+
+def main():
+    print("%8s %22s %22s" % ("clients", "relayout (ms)", "find_left (us)"))
+    print("%8s %10s %11s %10s %11s" % ("", "legacy", "indexed", "legacy", "indexed"))
+    for count in COUNTS:
+        row = []
+        for cls in (LegacyBsp, Bsp):
+            layout, clients = setup(cls, count)
+            row.append(min(timeit.repeat(
+                lambda: layout.layout(clients, Screen), number=3, repeat=3,
+            )) / 3 * 1000)
+        for cls in (LegacyBsp, Bsp):
+            layout, clients = setup(cls, count)
+
+            def find():
+                for client in clients:
+                    layout.focus(client)
+                    layout.find_left()
+            row.append(min(timeit.repeat(find, number=1, repeat=3)) / count * 1e6)
+        print("%8d %10.2f %11.2f %10.2f %11.2f" % ((count,) + tuple(row)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+    Microbenchmark for the X event dispatch done in Lavinder._xpoll.
+
+    Compares the cached dispatch table against the previous implementation,
+    which re-derived the event name and probed the handlers with
+    hasattr/getattr for every single event. The event mix mimics a browser
+    and a couple of terminals spamming MotionNotify/PropertyNotify.
+
+    Run with:
+
+        python -m test.benchmarks.bench_dispatch
+"""
+import timeit
+
+from liblavinder.core.manager import Lavinder
+
+
+class MotionNotifyEvent:
+    def __init__(self, wid):
+        self.event = wid
+        self.event_x = 10
+        self.event_y = 10
+
+
+class PropertyNotifyEvent:
+    def __init__(self, wid):
+        self.window = wid
+        self.atom = 1
+
+
+class FakeWindow:
+    def handle_PropertyNotify(self, e):  # noqa: N802
+        return False
+
+
+def legacy_target_chain(lavinder, ename, e):
+    chain = []
+    handler = "handle_%s" % ename
+    event_events = [
+        "EnterNotify",
+        "ButtonPress",
+        "ButtonRelease",
+        "KeyPress",
+    ]
+    if hasattr(e, "window"):
+        c = lavinder.windows_map.get(e.window)
+    elif hasattr(e, "drawable"):
+        c = lavinder.windows_map.get(e.drawable)
+    elif ename in event_events:
+        c = lavinder.windows_map.get(e.event)
+    else:
+        c = None
+
+    if c is not None and hasattr(c, handler):
+        chain.append(getattr(c, handler))
+
+    if hasattr(lavinder, handler):
+        chain.append(getattr(lavinder, handler))
+    return chain
+
+
+def legacy_dispatch(lavinder, events):
+    for e in events:
+        ename = e.__class__.__name__
+        if ename.endswith("Event"):
+            ename = ename[:-5]
+        if e.__class__ not in lavinder.ignored_events:
+            for h in legacy_target_chain(lavinder, ename, e):
+                r = h(e)
+                if not r:
+                    break
+
+
+def cached_dispatch(lavinder, events):
+    dispatch = lavinder._event_dispatch
+    ignored_events = lavinder.ignored_events
+    for e in events:
+        if e.__class__ in ignored_events:
+            continue
+        entry = dispatch.get(e.__class__)
+        if entry is None:
+            entry = lavinder._resolve_event(e)
+        lavinder._dispatch_event(entry, e)
+
+
+def make_lavinder(nwindows):
+    lavinder = Lavinder.__new__(Lavinder)
+    lavinder.windows_map = {wid: FakeWindow() for wid in range(nwindows)}
+    lavinder.ignored_events = set()
+    lavinder._event_dispatch = {}
+    lavinder._drag = None
+    lavinder.mouse_position = (0, 0)
+    return lavinder
+
+
+def main(nevents=100000, nwindows=30, repeat=5):
+    lavinder = make_lavinder(nwindows)
+    events = []
+    for i in range(nevents):
+        wid = i % nwindows
+        if i % 3:
+            events.append(PropertyNotifyEvent(wid))
+        else:
+            events.append(MotionNotifyEvent(wid))
+
+    results = {}
+    for name, func in (("legacy", legacy_dispatch), ("cached", cached_dispatch)):
+        best = min(timeit.repeat(lambda: func(lavinder, events), number=1, repeat=repeat))
+        results[name] = best
+        print("%-7s %8.0f events/s (%.1f us/event)" % (
+            name, nevents / best, best / nevents * 1e6
+        ))
+    print("speedup %.2fx" % (results["legacy"] / results["cached"]))
+
+
+if __name__ == "__main__":
+    main()
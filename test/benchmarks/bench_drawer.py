@@ -0,0 +1,99 @@
+"""
+    Benchmark of the X server pixmap memory used by bar widgets.
+
+    Every widget used to get a drawer backed by a pixmap the size of the whole
+    bar; drawers now start small and are fitted to the widget by the bar. This
+    lays out three 4K bars of 25 widgets both ways and reports the pixmap
+    memory the X server attributes to us (through the X-Resource extension
+    when the server has it), and how many pixmaps get reallocated while the
+    widgets' lengths change the way a clock or a window name does.
+
+    It needs an X server, e.g.:
+
+        Xvfb :99 -screen 0 3840x2160x24 &
+        DISPLAY=:99 python -m test.benchmarks.bench_drawer
+"""
+import os
+import random
+
+import xcffib
+import xcffib.res
+
+from liblavinder import drawer
+from liblavinder.core import xcbq
+
+BARS = 3
+BAR_WIDTH = 3840
+BAR_HEIGHT = 32
+WIDGETS = 25
+TICKS = 1000
+
+
+class FakeLavinder:
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def widget_lengths(rnd):
+    # a window name stretched over whatever the other widgets leave
+    lengths = [rnd.randint(8, 200) for _ in range(WIDGETS - 1)]
+    lengths.append(BAR_WIDTH - sum(lengths))
+    return lengths
+
+
+def pixmap_bytes(conn, xid):
+    try:
+        ext = conn.conn(xcffib.res.key)
+        reply = ext.QueryClientPixmapBytes(xid).reply()
+    except Exception:
+        return None
+    return reply.bytes + (reply.bytes_overflow << 32)
+
+
+def fmt(n):
+    return "n/a" if n is None else "%.1f MiB" % (n / 1024.0 / 1024.0)
+
+
+def run(conn, fitted, rnd):
+    lavinder = FakeLavinder(conn)
+    root = conn.default_screen.root.wid
+    # the bars' own drawers are the same either way
+    bars = [drawer.Drawer(lavinder, root, BAR_WIDTH, BAR_HEIGHT) for _ in range(BARS)]
+    widgets = []
+    for _ in range(BARS):
+        for length in widget_lengths(rnd):
+            if fitted:
+                d = drawer.Drawer(lavinder, root, 1, BAR_HEIGHT)
+                d.resize(length, BAR_HEIGHT)
+            else:
+                d = drawer.Drawer(lavinder, root, BAR_WIDTH, BAR_HEIGHT)
+            widgets.append(d)
+    conn.conn.flush()
+    measured = pixmap_bytes(conn, bars[0].gc)
+    computed = sum(d.pixmap_bytes for d in bars + widgets)
+
+    reallocs = 0
+    if fitted:
+        for _ in range(TICKS):
+            d = rnd.choice(widgets)
+            length = max(1, d.width + rnd.randint(-6, 6))
+            reallocs += d.resize(length, BAR_HEIGHT)
+    conn.conn.flush()
+
+    for d in bars + widgets:
+        d.finalize()
+    conn.conn.flush()
+    return measured, computed, reallocs
+
+
+def main():
+    conn = xcbq.Connection(os.environ.get("DISPLAY"))
+    for name, fitted in (("bar-sized", False), ("fitted", True)):
+        measured, computed, reallocs = run(conn, fitted, random.Random(0))
+        print("%-10s X server: %-10s computed: %-10s reallocations/%d resizes: %d"
+              % (name, fmt(measured), fmt(computed), TICKS, reallocs))
+    conn.finalize()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+    Microbenchmark of the sample storage of the graph widgets.
+
+    Compares pushing samples into _Graph's ring buffer, with its running
+    maximum, against the previous implementation, which rebuilt the list of
+    samples and took its max() on every push. Also times turning the samples
+    into the points of the graph's path, which happens on every draw.
+
+    Run with:
+
+        python -m test.benchmarks.bench_graph
+"""
+import random
+import timeit
+
+from liblavinder.widget.graph import _Samples
+
+SAMPLES = 100
+HEIGHT = 20
+WIDTH = 94
+
+
+class LegacySamples:
+    def __init__(self, size):
+        self.size = size
+        self.values = [0] * size
+        self.maxvalue = 0
+
+    def push(self, value):
+        self.values = [value] + self.values
+        self.values = self.values[:self.size]
+        self.maxvalue = max(self.values)
+
+    def points(self, x, y, step):
+        k = 1.0 / (self.maxvalue or 1)
+        scaled = [HEIGHT * val * k for val in reversed(self.values)]
+        points = []
+        for val in scaled:
+            points.append((x, y - val))
+            x += step
+        return points
+
+
+class RingSamples:
+    def __init__(self, size):
+        self.samples = _Samples(size)
+        self.xs = None
+
+    def push(self, value):
+        self.samples.push(value)
+        self.maxvalue = self.samples.max
+
+    def points(self, x, y, step):
+        if self.xs is None:
+            self.xs = [x + i * step for i in range(self.samples.size)]
+        k = HEIGHT / (self.maxvalue or 1)
+        return list(zip(self.xs, [y - val * k for val in self.samples.oldest_first()]))
+
+
+def main():
+    values = [random.random() * 100 for _ in range(10000)]
+    step = WIDTH / float(SAMPLES - 1)
+    number = 20
+    for name, cls in (("legacy", LegacySamples), ("ring buffer", RingSamples)):
+        samples = cls(SAMPLES)
+
+        def push():
+            for value in values:
+                samples.push(value)
+
+        def points():
+            for _ in range(1000):
+                samples.points(3, 23, step)
+
+        push_time = min(timeit.repeat(push, number=1, repeat=number))
+        points_time = min(timeit.repeat(points, number=1, repeat=number))
+        print("%-12s push: %9.0f samples/s   path: %7.1f us/draw" % (
+            name, len(values) / push_time, points_time / 1000 * 1e6,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+    Benchmark of decoding _NET_WM_ICON.
+
+    The property of a browser carries the same icon at several sizes, from
+    16x16 up to 256x256. The previous decoder turned the whole property into a
+    list of ints and premultiplied every pixel of every size in a Python loop;
+    NetWmIcons only reads the sizes and premultiplies the one size that the
+    task list draws, on the buffer of the reply.
+
+    Run with:
+
+        python -m test.benchmarks.bench_icons
+"""
+import array
+import random
+import timeit
+
+from liblavinder import window
+
+SIZES = (16, 24, 32, 48, 64, 128, 256)
+ICON_SIZE = 24
+
+
+def net_wm_icon(rnd):
+    words = array.array("I")
+    for size in SIZES:
+        words.extend([size, size])
+        # mostly opaque, with antialiased and transparent edges
+        words.extend(
+            rnd.choice([0, 0x80000000, 0xff000000]) | rnd.getrandbits(24)
+            for _ in range(size * size)
+        )
+    return words.tobytes()
+
+
+def legacy_decode(value):
+    # value as the reply's list of single bytes
+    icon = list(map(ord, value))
+    icons = {}
+    while True:
+        if not icon:
+            break
+        size = icon[:8]
+        if len(size) != 8 or not size[0] or not size[4]:
+            break
+        icon = icon[8:]
+        width = size[0]
+        height = size[4]
+        next_pix = width * height * 4
+        data = icon[:next_pix]
+        arr = array.array("B", data)
+        for i in range(0, len(arr), 4):
+            mult = arr[i + 3] / 255.
+            arr[i + 0] = int(arr[i + 0] * mult)
+            arr[i + 1] = int(arr[i + 1] * mult)
+            arr[i + 2] = int(arr[i + 2] * mult)
+        icon = icon[next_pix:]
+        icons["%sx%s" % (width, height)] = arr
+    return icons
+
+
+def lazy_decode(data):
+    icons = window.NetWmIcons(data)
+    size = min(icons, key=lambda size: abs(ICON_SIZE - int(size.split("x")[0])))
+    return icons[size]
+
+
+def every_size(data):
+    icons = window.NetWmIcons(data)
+    return [icons[size] for size in icons]
+
+
+def main():
+    data = net_wm_icon(random.Random(0))
+    # the legacy decoder reads sizes from their low byte only, so compare
+    # the decoders without the 256x256 icon
+    small = data[:-(8 + 4 * 256 * 256)]
+    value = [bytes([b]) for b in small]
+    print("property: %d sizes, %.1f KiB" % (len(SIZES), len(data) / 1024.0))
+    print("numpy: %s" % ("yes" if window.numpy is not None else "no"))
+
+    for name, func, arg, number in (
+        ("legacy, every size", legacy_decode, value, 1),
+        ("lazy, every size", every_size, small, 1),
+        ("lazy, one size", lazy_decode, small, 100),
+        ("lazy, one size (with 256x256)", lazy_decode, data, 100),
+    ):
+        took = min(timeit.repeat(lambda: func(arg), number=number, repeat=5)) / number
+        print("%-30s %8.3f ms" % (name, took * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+    Benchmark of IPC command throughput, one-shot vs persistent connections.
+
+    A server with a trivial handler runs in a thread; the client issues the
+    same command over a new connection per call (the original framing), over
+    one persistent multiplexed connection one call at a time, and pipelined
+    with send_many.
+
+    The second part times encoding and decoding a cmd_windows() reply for a
+    300 window session in each format, including the previous one-shot
+    decoding which tried JSON first.
+
+    Run with:
+
+        python -m test.benchmarks.bench_ipc
+"""
+import json
+import marshal
+import os
+import struct
+import tempfile
+import time
+import timeit
+
+from liblavinder import ipc, ipc_codec
+from test.test_ipc import run_server
+
+
+def handler(req):
+    return (0, None)
+
+
+def windows_reply(nwindows=300):
+    windows = [
+        dict(
+            name="Window %d - Mozilla Firefox" % i,
+            x=0, y=20, width=1280, height=780,
+            group=str(i % 9), id=0x1200000 + i,
+            floating=False,
+            float_info=dict(x=0, y=0, width=640, height=480),
+            wm_class=["Navigator", "firefox"],
+            shortname=None,
+            pid=1000 + i,
+            fullscreen=False,
+            minimized=False,
+        )
+        for i in range(nwindows)
+    ]
+    return (0, windows)
+
+
+def legacy_unpack(data):
+    try:
+        return json.loads(data.decode('utf-8')), True
+    except ValueError:
+        pass
+    size = struct.unpack("!L", data[:4])[0]
+    return marshal.loads(data[4:4 + size]), False
+
+
+def time_it(func, number=50):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def serialization():
+    reply = windows_reply()
+    proto = ipc._IPC()
+    one_shot = b"".join(proto._pack(reply))
+    print("%-22s %9s %9s %7s" % ("300 windows reply", "encode", "decode", "bytes"))
+    print("%-22s %9s %8.2fms %7d" % (
+        "marshal, JSON first", "", time_it(lambda: legacy_unpack(one_shot)) * 1000,
+        len(one_shot)
+    ))
+    print("%-22s %9s %8.2fms %7d" % (
+        "marshal, sniffed", "", time_it(lambda: proto._unpack(one_shot)) * 1000,
+        len(one_shot)
+    ))
+
+    cases = [("marshal", ipc.MUX_MARSHAL), ("json", ipc.MUX_JSON), ("binary", ipc.MUX_BINARY)]
+    msgpack = ipc_codec.msgpack
+    for name, fmt in cases + [("binary, pure python", ipc.MUX_BINARY)]:
+        if name == "binary, pure python":
+            ipc_codec.msgpack = None
+        elif fmt == ipc.MUX_BINARY and msgpack is None:
+            name += " (no msgpack)"
+        data = proto._encode(reply, fmt)
+        encode = time_it(lambda: proto._encode(reply, fmt))
+        decode = time_it(lambda: proto._decode(data, fmt))
+        print("%-22s %8.2fms %8.2fms %7d" % (name, encode * 1000, decode * 1000, len(data)))
+    ipc_codec.msgpack = msgpack
+
+
+def main(ncalls=2000):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "ipc")
+        _, stop = run_server(fname, handler)
+        msg = ([], "status", (), {})
+
+        formats = (("marshal", {}), ("json", {"is_json": True}), ("binary", {"binary": True}))
+        for fmt, kwargs in formats:
+            one_shot = ipc.Client(fname, **kwargs)
+            persistent = ipc.Client(fname, persistent=True, **kwargs)
+            persistent.call(msg)
+
+            cases = (
+                ("one-shot", lambda: [one_shot.call(msg) for _ in range(ncalls)]),
+                ("persistent", lambda: [persistent.call(msg) for _ in range(ncalls)]),
+                ("pipelined", lambda: persistent.send_many([msg] * ncalls)),
+            )
+            for name, func in cases:
+                start = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - start
+                print("%-7s %-10s %8.0f calls/s" % (fmt, name, ncalls / elapsed))
+            persistent.close()
+        stop()
+
+    print()
+    serialization()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+    Benchmark of the CPU time a relayout takes in the tiling layouts.
+
+    Layouts implementing Layout.arrange() place all their windows in one
+    pass, rather than working out the shared sizes, positions and border
+    colours again for every window in configure(). This times layout() on
+    groups of increasing size, with fake windows so that only the layouts'
+    own work is measured.
+
+    Run with:
+
+        python -m test.benchmarks.bench_layouts
+"""
+import time
+
+from liblavinder import layout
+
+COUNTS = (10, 50, 200)
+LAYOUTS = (
+    ("MonadTall", {}),
+    ("MonadWide", {}),
+    ("RatioTile", {}),
+    ("Matrix", {}),
+    ("Tile", {}),
+    ("Columns", {"num_columns": 4}),
+)
+
+
+class FakeScreen:
+    x = dx = 0
+    y = dy = 0
+    width = dwidth = 3840
+    height = dheight = 2160
+
+
+class FakeLavinder:
+    def color_pixel(self, color):
+        return 0
+
+
+class FakeGroup:
+    name = "bench"
+    screen = FakeScreen()
+    lavinder = FakeLavinder()
+
+    def layout_all(self, warp=False):
+        pass
+
+
+class FakeWindow:
+    has_focus = False
+
+    def place(self, *args, **kwargs):
+        pass
+
+    def hide(self):
+        pass
+
+    def unhide(self):
+        pass
+
+
+def relayout_time(name, config, count):
+    lay = getattr(layout, name)(**config).clone(FakeGroup())
+    windows = [FakeWindow() for _ in range(count)]
+    for window in windows:
+        lay.add(window)
+    windows[count // 2].has_focus = True
+    lay.focus(windows[count // 2])
+    rounds = max(5, 20000 // count)
+    best = None
+    for _ in range(5):
+        start = time.process_time()
+        for _ in range(rounds):
+            lay.layout(windows, FakeScreen)
+        took = (time.process_time() - start) / rounds
+        best = took if best is None else min(best, took)
+    return best
+
+
+def main():
+    print("%-10s" % "layout" + "".join("%12s" % ("%d windows" % n) for n in COUNTS))
+    for name, config in LAYOUTS:
+        times = [relayout_time(name, config, count) for count in COUNTS]
+        print("%-10s" % name + "".join("%9.3f ms" % (t * 1000) for t in times))
+
+
+if __name__ == "__main__":
+    main()
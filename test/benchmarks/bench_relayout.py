@@ -0,0 +1,77 @@
+"""
+    Benchmark of relaying out a group of 50 windows.
+
+    Opens WINDOWS test windows on a running lavinder, then moves the focus
+    around them, which lays the group out every time, and reports the X
+    requests and the time each relayout took according to lavinder_info(),
+    with and without relayout_grab_server. Moving a window in the stack
+    changes every window's geometry; moving the focus only changes borders.
+
+    Start lavinder in a nested X server with the layout to measure, e.g.:
+
+        Xephyr :99 -screen 1920x1080 &
+        DISPLAY=:99 lavinder &
+        DISPLAY=:99 python -m test.benchmarks.bench_relayout
+"""
+import os
+import subprocess
+import sys
+import time
+
+from liblavinder.command import Client
+
+WINDOWS = 50
+ROUNDS = 100
+
+
+def spawn_windows(client, count):
+    script = os.path.join(os.path.dirname(__file__), "..", "scripts", "window.py")
+    display = os.environ["DISPLAY"]
+    procs = []
+    start = len(client.windows())
+    for i in range(count):
+        procs.append(subprocess.Popen([sys.executable, script, display, "bench%d" % i]))
+    while len(client.windows()) < start + count:
+        time.sleep(0.1)
+    return procs
+
+
+def measure(client, command):
+    requests = 0
+    took = 0
+    for _ in range(ROUNDS):
+        command()
+        relayout = client.lavinder_info()["relayout"]
+        requests += relayout["last_requests"]
+        took += relayout["last_time"]
+    return requests / ROUNDS, took / ROUNDS
+
+
+def main():
+    client = Client(persistent=True)
+    procs = spawn_windows(client, WINDOWS)
+    try:
+        print("%d windows, layout %s" % (WINDOWS, client.layout.info()["name"]))
+        for grab in (False, True):
+            client.eval("self.config.relayout_grab_server = %r" % grab)
+            for name, command in (
+                ("focus", client.group.next_window),
+                ("shuffle", client.layout.shuffle_down),
+            ):
+                try:
+                    requests, took = measure(client, command)
+                except Exception as e:
+                    print("%-8s %s" % (name, e))
+                    continue
+                print("%-8s grab=%-5s %6.1f requests %8.3f ms per relayout" % (
+                    name, grab, requests, took * 1000,
+                ))
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -68,3 +68,30 @@ def test_bsp_window_focus_cycle(lavinder):
 
     # assert window focus cycle, according to order in layout
     assert_focus_path(lavinder, 'two', 'float1', 'float2', 'one', 'three')
+
+
+@bsp_config
+def test_bsp_directions(lavinder):
+    lavinder.test_window("one")
+    lavinder.test_window("two")
+    lavinder.test_window("three")
+    # one | three
+    # -----------
+    #     two
+    assert lavinder.c.layout.info()['clients'] == ['one', 'three', 'two']
+    assert_focused(lavinder, "three")
+
+    lavinder.c.layout.left()
+    assert_focused(lavinder, "one")
+    lavinder.c.layout.right()
+    assert_focused(lavinder, "three")
+    lavinder.c.layout.down()
+    assert_focused(lavinder, "two")
+    lavinder.c.layout.up()
+    assert_focused(lavinder, "one")
+
+    # neighbours are found again after the tree changes
+    lavinder.c.layout.shuffle_right()
+    assert lavinder.c.layout.info()['clients'] == ['three', 'one', 'two']
+    lavinder.c.layout.left()
+    assert_focused(lavinder, "three")
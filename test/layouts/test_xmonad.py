@@ -128,6 +128,17 @@ def test_tall_add_clients(lavinder):
     assert_focused(lavinder, 'four')
 
 
+@monadtall_config
+def test_tall_focus_sends_borders_only(lavinder):
+    lavinder.test_window('one')
+    lavinder.test_window('two')
+    lavinder.test_window('three')
+    lavinder.c.layout.previous()
+    assert_focused(lavinder, 'two')
+    # only the borders of the windows losing and gaining focus changed
+    assert lavinder.c.lavinder_info()["relayout"]["last_requests"] == 2
+
+
 @monadwide_config
 def test_wide_add_clients(lavinder):
     lavinder.test_window('one')
@@ -119,6 +119,40 @@ def test_draw(lavinder):
     assert b["widgets"][0]["name"] == "groupbox"
 
 
+@gb_config
+def test_drawer_fits_widget(lavinder):
+    # widgets draw to a pixmap sized to the widget, not to the whole bar
+    info = lavinder.c.bar["top"].info()
+    text = lavinder.c.widget["text"]
+    length = text.info()["length"]
+    assert text.eval("self.drawer.pixmap_height") == (True, "50")
+    width = int(text.eval("self.drawer.pixmap_width")[1])
+    assert length <= width < info["width"]
+
+    text.update("a much longer piece of text than before")
+    assert text.info()["length"] > length
+    width = int(text.eval("self.drawer.pixmap_width")[1])
+    assert text.info()["length"] <= width
+
+
+@gb_config
+def test_partial_redraw(lavinder):
+    bar = lavinder.c.bar["top"]
+    text = lavinder.c.widget["text"]
+    before = bar.info()["redraws"]
+
+    # a widget changing its text only redraws the widgets it moves
+    text.update("some rather longer text")
+    text.update("short")
+    redraws = bar.info()["redraws"]
+    assert redraws["full"] == before["full"]
+    assert redraws["partial"] > before["partial"]
+    assert text.get() == "short"
+
+    bar.eval("self.draw()")
+    assert bar.info()["redraws"]["full"] == redraws["full"] + 1
+
+
 @gb_config
 def test_prompt(lavinder):
     assert lavinder.c.widget["prompt"].info()["width"] == 0
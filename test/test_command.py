@@ -21,11 +21,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import threading
+import time
+
 import pytest
 
 import liblavinder
 import liblavinder.confreader
 import liblavinder.config
+import liblavinder.ipc
 import liblavinder.layout
 import liblavinder.bar
 import liblavinder.widget
@@ -213,6 +217,72 @@ def test_call_unknown(lavinder):
         lavinder.c.layout.nonexistent()
 
 
+@server_config
+def test_batch(lavinder):
+    lazy = liblavinder.command.lazy
+    status, groups, unknown, bad_args, info = lavinder.c.batch([
+        lazy.status(),
+        lazy.groups(),
+        lazy.nonexistent(),
+        lazy.status(1),
+        ([("layout", None)], "info", (), {}),
+    ])
+    assert status == "OK"
+    assert sorted(groups) == ["a", "b", "c"]
+    assert isinstance(unknown, liblavinder.command.CommandError)
+    assert isinstance(bad_args, liblavinder.command.CommandException)
+    assert info["group"] == "a"
+
+
+@server_config
+def test_batch_invalid(lavinder):
+    lazy = liblavinder.command.lazy
+    first, bad_selector, bad_name, last = lavinder.c.batch([
+        lazy.status(),
+        (5, "status", (), {}),
+        ([], 5, (), {}),
+        lazy.status(),
+    ])
+    assert first == last == "OK"
+    assert isinstance(bad_selector, liblavinder.command.CommandError)
+    assert "Invalid command" in str(bad_selector)
+    assert isinstance(bad_name, liblavinder.command.CommandError)
+
+
+@server_config
+def test_batch_restart(lavinder):
+    lazy = liblavinder.command.lazy
+    restart, shutdown, status = lavinder.c.batch([
+        lazy.restart(),
+        lazy.shutdown(),
+        lazy.status(),
+    ])
+    assert isinstance(restart, liblavinder.command.CommandError)
+    assert isinstance(shutdown, liblavinder.command.CommandError)
+    # the server is still there for the rest of the batch
+    assert status == "OK"
+
+
+@server_config
+def test_subscribe(lavinder):
+    with pytest.raises(liblavinder.ipc.IPCError):
+        next(lavinder.c.subscribe("nonexistent"))
+
+    events = lavinder.c.subscribe("setgroup", "focus_change")
+    received = []
+    consumer = threading.Thread(target=lambda: received.append(next(events)), daemon=True)
+    consumer.start()
+    for _ in range(100):
+        if lavinder.c.lavinder_info()["subscriptions"]["clients"]:
+            break
+        time.sleep(0.05)
+
+    lavinder.c.group["b"].toscreen()
+    consumer.join(5)
+    assert received[0]["event"] in ("setgroup", "focus_change")
+    assert received[0]["group"] == "b"
+
+
 @server_config
 def test_items_lavinder(lavinder):
     v = lavinder.c.items("group")
@@ -0,0 +1,110 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from liblavinder import drawer
+
+
+def test_layout_cache():
+    cache = drawer.LayoutCache(size=2)
+    created = []
+
+    def create():
+        created.append(object())
+        return created[-1]
+
+    a = cache.get("a", create)
+    assert a[0] is created[0]
+    assert cache.get("a", create) is a
+    cache.get("b", create)
+    # "a" was used more recently than "b", so "b" is evicted
+    cache.get("a", create)
+    cache.get("c", create)
+    assert cache.get("a", create) is a
+    cache.get("b", create)
+    assert len(created) == 4
+    assert cache.info() == dict(layouts=2, hits=3, misses=4)
+
+    cache.clear()
+    assert cache.info()["layouts"] == 0
+
+
+class FakeSurface:
+    def __init__(self, height):
+        self.height = height
+
+    def get_stride(self):
+        return 100
+
+    def get_height(self):
+        return self.height
+
+
+def test_surface_cache():
+    cache = drawer.SurfaceCache(max_bytes=1000)
+    rendered = []
+
+    def render(height):
+        def render():
+            rendered.append(FakeSurface(height))
+            return rendered[-1], 2
+        return render
+
+    assert cache.get("a", render(4)) == (rendered[0], 2)
+    assert cache.get("a", render(4)) == (rendered[0], 2)
+    cache.get("b", render(4))
+    assert cache.info() == dict(surfaces=2, bytes=800, hits=1, misses=2)
+
+    # "a" is the least recently used, so it makes room for "c"
+    cache.get("c", render(3))
+    assert cache.info()["bytes"] == 700
+    cache.get("a", render(4))
+    assert len(rendered) == 4
+
+    # surfaces larger than the whole cache are never kept
+    cache.get("d", render(20))
+    assert cache.info()["surfaces"] == 2
+
+    cache.clear()
+    assert cache.info()["bytes"] == 0
+
+
+def test_rgba():
+    assert drawer.rgba("#ff0000") == (1.0, 0.0, 0.0, 1)
+    assert drawer.rgba("ff0000.5") is drawer.rgba("ff0000.5")
+    assert drawer.rgba((0, 255, 0)) == (0.0, 1.0, 0.0, 1)
+    assert drawer.rgba([0, 0, 255]) == (0.0, 0.0, 1.0, 1)
+
+
+def test_gradient():
+    colours = ("ff0000", "0000ff")
+    gradient = drawer._gradient(colours, 20)
+    assert drawer._gradient(colours, 20) is gradient
+    assert gradient.get_color_stops_rgba() == [
+        (0.0, 1.0, 0.0, 0.0, 1.0),
+        (1.0, 0.0, 0.0, 1.0, 1.0),
+    ]
+    assert drawer._gradient(colours, 30) is not gradient
+
+
+def test_is_gradient():
+    assert drawer._is_gradient(["ff0000", "0000ff"])
+    assert drawer._is_gradient(("ff0000", "0000ff"))
+    assert drawer._is_gradient(((255, 0, 0), (0, 0, 255)))
+    assert not drawer._is_gradient((255, 0, 0))
+    assert not drawer._is_gradient((255, 0, 0, 0.5))
+    assert not drawer._is_gradient("ff0000")
@@ -94,6 +94,51 @@ def test_can_unsubscribe_from_hook():
     assert test.val == 3
 
 
+@pytest.mark.usefixtures("hook_fixture")
+def test_hook_stats():
+    test = Call(0)
+
+    def failing(val):
+        raise ValueError(val)
+
+    liblavinder.hook.subscribe.group_window_add(test)
+    liblavinder.hook.subscribe.group_window_add(failing)
+    liblavinder.hook.fire("group_window_add", 1)
+    liblavinder.hook.fire("group_window_add", 2)
+    assert test.val == 2
+
+    stats = {i["listener"]: i for i in liblavinder.hook.stats()}
+    assert stats["test.test_hook.test_hook_stats.<locals>.failing"]["errors"] == 2
+    call_stats = stats["test.test_hook.Call"]
+    assert call_stats["event"] == "group_window_add"
+    assert call_stats["calls"] == 2
+    assert call_stats["errors"] == 0
+    assert call_stats["total"] >= call_stats["max"] >= call_stats["average"] > 0
+
+    liblavinder.hook.stats(reset=True)
+    assert all(i["calls"] == 0 for i in liblavinder.hook.stats())
+
+    liblavinder.hook.unsubscribe.group_window_add(failing)
+    assert len(liblavinder.hook.stats()) == 1
+
+
+@pytest.mark.usefixtures("hook_fixture")
+def test_unsubscribe_while_firing():
+    calls = []
+
+    def once(val):
+        calls.append(val)
+        liblavinder.hook.unsubscribe.group_window_add(once)
+
+    test = Call(0)
+    liblavinder.hook.subscribe.group_window_add(once)
+    liblavinder.hook.subscribe.group_window_add(test)
+    liblavinder.hook.fire("group_window_add", 1)
+    liblavinder.hook.fire("group_window_add", 2)
+    assert calls == [1]
+    assert test.val == 2
+
+
 def test_can_subscribe_to_startup_hooks(lavinder_nospawn):
     config = BareConfig
     for attr in dir(default_config):
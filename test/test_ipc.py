@@ -0,0 +1,264 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from liblavinder import ipc, ipc_codec
+
+
+def run_server(fname, handler):
+    """Start an ipc.Server with its own event loop in a daemon thread
+
+    Returns the server and a function stopping it again.
+    """
+    loop = asyncio.new_event_loop()
+    server = ipc.Server(fname, handler, loop)
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        server.start()
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        server.close()
+        loop.close()
+    return server, stop
+
+
+def in_loop(server, func, *args):
+    """Run func in the thread of the server's event loop and wait for it"""
+    done = threading.Event()
+    result = []
+
+    def run():
+        result.append(func(*args))
+        done.set()
+    server.loop.call_soon_threadsafe(run)
+    done.wait()
+    return result[0]
+
+
+def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+@pytest.fixture
+def ipc_server(tmpdir):
+    fname = str(tmpdir.join("ipc"))
+    server, stop = run_server(fname, lambda req: ["reply", req])
+    server.fname = fname
+    yield server
+    stop()
+
+
+def command(name):
+    return [[], name, [], {}]
+
+
+formats = pytest.mark.parametrize("fmt", [{}, {"is_json": True}, {"binary": True}])
+
+
+@formats
+def test_one_shot(ipc_server, fmt):
+    client = ipc.Client(ipc_server.fname, **fmt)
+    assert client.call(command("status")) == ["reply", command("status")]
+    assert client.send_many([command("a"), command("b")]) == [
+        ["reply", command("a")], ["reply", command("b")]
+    ]
+
+
+@formats
+def test_persistent(ipc_server, fmt):
+    client = ipc.Client(ipc_server.fname, persistent=True, **fmt)
+    assert client.call(command("status")) == ["reply", command("status")]
+    proto = client._mux
+
+    msgs = [command(str(i)) for i in range(100)]
+    assert client.send_many(msgs) == [["reply", msg] for msg in msgs]
+    # all of it went over the same connection
+    assert client._mux is proto
+    assert not proto.pending
+
+    # a closed connection is reopened on the next call
+    client.close()
+    assert client.call(command("again")) == ["reply", command("again")]
+    assert client._mux is not proto
+    client.close()
+
+    # one-shot clients still work alongside persistent ones
+    one_shot = ipc.Client(ipc_server.fname, **fmt)
+    assert one_shot.call(command("status")) == ["reply", command("status")]
+
+
+@formats
+def test_persistent_unencodable_reply(tmpdir, fmt):
+    fname = str(tmpdir.join("ipc"))
+    server, stop = run_server(fname, lambda req: object() if req[1] == "bad" else req[1])
+    try:
+        client = ipc.Client(fname, persistent=True, **fmt)
+        assert client.call(command("one")) == "one"
+        proto = client._mux
+        with pytest.raises(ipc.IPCError):
+            client.call(command("bad"))
+        # only that request failed, the connection is still up
+        assert client.call(command("two")) == "two"
+        assert client._mux is proto
+        client.close()
+    finally:
+        stop()
+
+
+def test_one_shot_format():
+    proto = ipc._IPC()
+    msg = [[], "status", [], {}]
+    assert proto._unpack(b"".join(proto._pack(msg))) == (msg, False)
+    assert proto._unpack(proto._pack_json(msg)) == (msg, True)
+    with pytest.raises(ipc.IPCError):
+        proto._unpack(b"".join(proto._pack(msg))[:-1])
+    with pytest.raises(ipc.IPCError):
+        proto._unpack(b"[1, 2")
+
+
+def test_frames():
+    proto = ipc._IPC()
+    buf = bytearray()
+    for msgid in range(3):
+        buf += b"".join(proto._pack_frame(msgid, ["msg", msgid], ipc.MUX_BINARY))
+    partial = proto._pack_frame(3, "partial", ipc.MUX_BINARY)
+    buf += partial[0] + partial[1][:2]
+
+    assert proto._unpack_frames(buf, ipc.MUX_BINARY) == [(i, ["msg", i]) for i in range(3)]
+    assert bytes(buf) == partial[0] + partial[1][:2]
+    buf += partial[1][2:]
+    assert proto._unpack_frames(buf, ipc.MUX_BINARY) == [(3, "partial")]
+    assert not buf
+
+    buf += ipc.MUX_HDR.pack(4, 1) + b"\xc1"
+    with pytest.raises(ipc.IPCError):
+        proto._unpack_frames(buf, ipc.MUX_BINARY)
+
+
+@pytest.fixture(params=["msgpack", "python"])
+def codec(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(ipc_codec, "msgpack", None)
+    elif ipc_codec.msgpack is None:
+        pytest.skip("msgpack is not installed")
+    return ipc_codec
+
+
+def test_codec(codec):
+    values = [
+        None, True, False, 0, 1, 127, 128, 255, 256, 65536, 2 ** 32, 2 ** 64 - 1,
+        -1, -32, -33, -200, -2 ** 31 - 1, -2 ** 63, 1.5, "", "x" * 31, "x" * 32,
+        "é" * 70000, b"", b"\x00" * 300, [], list(range(20)), {},
+        {i: str(i) for i in range(20)}, {"a": [{"b": None}]},
+    ]
+    for value in values:
+        assert codec.loads(codec.dumps(value)) == value
+    assert codec.loads(codec.dumps((1, (2, 3)))) == [1, [2, 3]]
+    # both codecs speak the same format
+    assert codec.dumps(values) == ipc_codec._py_dumps(values)
+
+    for value in (2 ** 64, object()):
+        with pytest.raises(ValueError):
+            codec.dumps(value)
+
+
+@pytest.mark.parametrize("data", [
+    b"", b"\xc1", b"\x92\x01", b"\xda\x00", b"\xa3ab", b"\xa2\xff\xfe",
+    b"\xdd\xff\xff\xff\xff", b"\x00\x00", b"\xcb\x00", b"\x81\x90\x01",
+    b"\x91" * 100000 + b"\x00",
+])
+def test_codec_invalid(codec, data):
+    with pytest.raises(ValueError):
+        codec.loads(data)
+
+
+def test_subscribe(ipc_server):
+    received = []
+    client = ipc.Client(ipc_server.fname)
+
+    def consume():
+        for msg in client.subscribe(["a", "b"]):
+            received.append(msg)
+            if len(received) == 2:
+                return
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    wait_for(lambda: ipc_server.has_subscribers("b"))
+
+    in_loop(ipc_server, ipc_server.publish, "a", {"n": 1})
+    in_loop(ipc_server, ipc_server.publish, "c", {"n": 2})
+    in_loop(ipc_server, ipc_server.publish, "b", {"n": 3})
+    consumer.join(2)
+    assert received == [{"n": 1}, {"n": 3}]
+
+    # the subscription ends with the connection
+    wait_for(lambda: not ipc_server.has_subscribers("a"))
+
+
+def test_subscribe_slow_consumer(ipc_server, monkeypatch):
+    monkeypatch.setattr(ipc, "SUBSCRIBER_BACKLOG", 4)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, 0)
+    sock.connect(ipc_server.fname)
+    sock.sendall(ipc.SUBSCRIBE_MAGIC + json.dumps(["a"]).encode() + b"\n")
+    wait_for(lambda: ipc_server.has_subscribers("a"))
+
+    # never read: fill up the socket and the write buffer, then messages with
+    # the same key are coalesced
+    msg = {"data": "x" * 10000}
+    for _ in range(200):
+        in_loop(ipc_server, ipc_server.publish, "a", msg, "same")
+    assert ipc_server.coalesced
+    assert not ipc_server.dropped
+
+    # messages that cannot be coalesced get the client dropped
+    for i in range(5):
+        in_loop(ipc_server, ipc_server.publish, "a", msg, i)
+    assert ipc_server.dropped == 1
+    wait_for(lambda: not ipc_server.has_subscribers("a"))
+    sock.close()
+
+
+def test_subscribe_rejected(ipc_server, monkeypatch):
+    subscribed = []
+    monkeypatch.setattr(ipc_server, "check_topics", lambda topics: "No such topic")
+    monkeypatch.setattr(ipc_server, "subscribe_hooks", subscribed.append)
+    with pytest.raises(ipc.IPCError):
+        next(ipc.Client(ipc_server.fname).subscribe(["a"]))
+    # checking the topics has no side effects
+    assert subscribed == []
@@ -29,6 +29,7 @@ import logging
 import pytest
 import subprocess
 import time
+import xcffib.xproto
 
 import liblavinder
 import liblavinder.layout
@@ -1066,6 +1067,92 @@ def test_color_pixel(lavinder):
     lavinder.c.eval("self.color_pixel(\"ffffff\")")
 
 
+@manager_config
+def test_color_pixel_cache(lavinder):
+    # the layouts' border colours are allocated at startup
+    colors = lavinder.c.lavinder_info()["colors"]
+    assert colors["pixels"] > 0
+
+    _, pixel = lavinder.c.eval("self.color_pixel(\"#123456\")")
+    _, again = lavinder.c.eval("self.color_pixel(\"#123456\")")
+    assert pixel == again
+    saved = lavinder.c.lavinder_info()["colors"]["round_trips_saved"]
+    assert saved >= colors["round_trips_saved"] + 1
+
+
+@manager_config
+def test_lavinder_info(lavinder):
+    lavinder.test_window("one")
+    info = lavinder.c.lavinder_info()
+    assert info["socketname"] == lavinder.sockfile
+    assert info["manage_round_trips"] > 0
+    startup = info["startup"]
+    assert 0 < startup["grab_keys"] <= startup["scan_complete"] <= startup["startup_complete"]
+    assert startup["scan_windows"] == 0
+
+
+@manager_config
+def test_relayout_grab_server(lavinder):
+    lavinder.c.eval("self.config.relayout_grab_server = True")
+    lavinder.test_window("one")
+    # the server was released again, or the second window couldn't map
+    lavinder.test_window("two")
+    relayout = lavinder.c.lavinder_info()["relayout"]
+    assert relayout["count"] > 0
+    # at least the grab and its release
+    assert relayout["last_requests"] >= 2
+    assert lavinder.c.eval("self.relayout is None") == (True, "True")
+
+
+@manager_config
+@no_xinerama
+def test_raise_after_click(lavinder):
+    lavinder.c.eval("self.config.bring_front_click = True")
+    lavinder.test_window("one")
+    lavinder.c.window.toggle_floating()
+    one = lavinder.c.window.info()["id"]
+    lavinder.test_window("two")
+    lavinder.c.window.toggle_floating()
+    two = lavinder.c.window.info()["id"]
+
+    def top():
+        _, stack = lavinder.c.eval(
+            "[w.wid for w in self.root.query_tree()[2] if w.wid in (%d, %d)][-1]" % (one, two)
+        )
+        return int(stack)
+
+    assert top() == two
+
+    # clicking restacks the window without going through place()
+    lavinder.c.eval(
+        "self.cmd_focus_by_click(type('Click', (), dict(child=%d, root=0, time=0))())" % one
+    )
+    assert top() == one
+
+    # raising the other window again must reach the server
+    lavinder.c.window[two].toggle_maximize()
+    assert top() == two
+
+
+@manager_config
+def test_frame_rate(lavinder):
+    before = lavinder.c.lavinder_info()["render"]
+
+    # a burst of redraws of the same bar is painted in a single frame
+    lavinder.c.eval("[self.current_screen.bottom.damage(w) "
+                    "for w in self.current_screen.bottom.widgets * 20]")
+
+    @Retry(ignore_exceptions=(AssertionError,))
+    def frame_drawn():
+        render = lavinder.c.lavinder_info()["render"]
+        assert render["frames"] > before["frames"]
+        return render
+
+    render = frame_drawn()
+    assert render["redraw_requests"] >= before["redraw_requests"] + 1
+    assert render["frames"] - before["frames"] <= 2
+
+
 @manager_config
 def test_change_loglevel(lavinder):
     assert lavinder.c.loglevel() == logging.INFO
@@ -1085,3 +1172,75 @@ def test_change_loglevel(lavinder):
     lavinder.c.critical()
     assert lavinder.c.loglevel() == logging.CRITICAL
     assert lavinder.c.loglevelname() == 'CRITICAL'
+
+
+class PropertyNotifyEvent:
+    def __init__(self, window):
+        self.window = window
+
+
+class DispatchWindow:
+    def __init__(self):
+        self.seen = []
+
+    def handle_PropertyNotify(self, e):  # noqa: N802
+        self.seen.append(("class", e))
+        return True
+
+
+def test_event_dispatch():
+    q = liblavinder.core.manager.Lavinder.__new__(liblavinder.core.manager.Lavinder)
+    q._event_dispatch = {}
+    managed = []
+    q.handle_PropertyNotify = managed.append
+    win, patched = DispatchWindow(), DispatchWindow()
+    q.windows_map = {1: win, 2: patched}
+    patched.handle_PropertyNotify = lambda e: patched.seen.append(("instance", e))
+
+    e1, e2, e3 = PropertyNotifyEvent(1), PropertyNotifyEvent(2), PropertyNotifyEvent(3)
+    entry = q._resolve_event(e1)
+    assert entry[:3] == ("PropertyNotify", "handle_PropertyNotify", "window")
+    assert q._event_dispatch[PropertyNotifyEvent] is entry
+
+    for e in (e1, e2, e3):
+        q._dispatch_event(entry, e)
+    # the class handler returns True, so the event also reaches the manager;
+    # the instance handler returns None and stops the chain
+    assert win.seen == [("class", e1)]
+    assert patched.seen == [("instance", e2)]
+    assert managed == [e1, e3]
+
+    assert len(q.get_target_chain("PropertyNotify", e1)) == 2
+    assert len(q.get_target_chain("PropertyNotify", e3)) == 1
+
+
+def test_coalesce_events():
+    xproto = xcffib.xproto
+    cw = xproto.ConfigWindow
+
+    def motion(x):
+        return xproto.MotionNotifyEvent.synthetic(0, 0, 1, 1, 0, x, x, x, x, 0, True)
+
+    def prop(wid, atom):
+        return xproto.PropertyNotifyEvent.synthetic(wid, atom, 0, 0)
+
+    def configure(wid, mask, x=0, width=0):
+        return xproto.ConfigureRequestEvent.synthetic(0, 1, wid, 0, x, 0, width, 0, 0, mask)
+
+    m1, m2, m3 = motion(1), motion(2), motion(3)
+    p1, p2, p3 = prop(2, 10), prop(2, 11), prop(2, 10)
+    c1, c2 = configure(3, cw.X, x=5), configure(3, cw.Width, width=50)
+    mapreq = xproto.MapRequestEvent.synthetic(1, 4)
+
+    events, dropped = liblavinder.core.manager.coalesce_events(
+        [m1, p1, c1, m2, p2, mapreq, m3, p3, c2]
+    )
+    assert events == [p1, c1, m2, p2, mapreq, m3, p3, c2]
+    assert dropped == 1
+
+    events, dropped = liblavinder.core.manager.coalesce_events([m1, p1, c1, m2, p3, c2])
+    assert events == [m2, p3, c2]
+    assert dropped == 3
+    # the dropped request's X is merged into the kept one
+    assert c2.value_mask == cw.X | cw.Width
+    assert (c2.x, c2.width) == (5, 50)
@@ -115,6 +115,15 @@ def test_call(lavinder):
     assert "Command exception" in v
 
 
+@sh_config
+def test_batch(lavinder):
+    lavinder.sh = liblavinder.sh.QSh(lavinder.c)
+    assert lavinder.sh.do_batch("status(); status(1)").splitlines()[0] == "status: OK"
+    assert "Command exception" in lavinder.sh.do_batch("status(); status(1)")
+    assert "No such command" in lavinder.sh.do_batch("status(); nonexistent()")
+    assert "Syntax error" in lavinder.sh.do_batch("status(((")
+
+
 @sh_config
 def test_complete(lavinder):
     lavinder.sh = liblavinder.sh.QSh(lavinder.c)
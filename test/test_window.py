@@ -0,0 +1,145 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import array
+
+import pytest
+import xcffib.xproto
+
+from liblavinder import window
+
+
+def net_wm_icon(*icons):
+    words = array.array("I")
+    for width, height, pixel in icons:
+        words.extend([width, height])
+        words.frombytes(bytes(pixel) * width * height)
+    return words.tobytes()
+
+
+def test_net_wm_icons():
+    data = net_wm_icon(
+        (2, 2, [200, 100, 50, 255]),
+        (3, 1, [200, 100, 50, 128]),
+        (1, 1, [255, 255, 255, 0]),
+    )
+    icons = window.NetWmIcons(data)
+    assert sorted(icons) == ["1x1", "2x2", "3x1"]
+    assert not icons._icons
+
+    assert icons["2x2"] == bytearray([200, 100, 50, 255] * 4)
+    assert icons["3x1"] == bytearray([100, 50, 25, 128] * 3)
+    assert icons["1x1"] == bytearray(4)
+    assert icons["2x2"] is icons["2x2"]
+
+
+def test_net_wm_icons_truncated():
+    data = net_wm_icon((1, 1, [1, 2, 3, 255]), (4, 4, [1, 2, 3, 255]))
+    assert list(window.NetWmIcons(data[:-4])) == ["1x1"]
+    assert list(window.NetWmIcons(data[:6])) == []
+    assert list(window.NetWmIcons(b"")) == []
+
+
+def test_premultiply():
+    pixels = bytes(range(256)) * 4
+    expected = bytearray(pixels)
+    for i in range(0, len(expected), 4):
+        mult = expected[i + 3] / 255.
+        for j in range(3):
+            expected[i + j] = int(expected[i + j] * mult)
+    result = window.premultiply(pixels)
+    assert isinstance(result, bytearray)
+    # x * a / 255. rounds down a few exact multiples
+    assert all(abs(a - b) <= 1 for a, b in zip(result, expected))
+
+
+class FakeConn:
+    def __init__(self):
+        self.calls = []
+
+    def grab_server(self):
+        self.calls.append("grab")
+
+    def ungrab_server(self):
+        self.calls.append("ungrab")
+
+    def flush(self):
+        self.calls.append("flush")
+
+
+class FakeWindow:
+    def __init__(self, wid, calls):
+        self.window = type("XWindow", (), {"wid": wid})
+        self.calls = calls
+
+    def _disable_mask(self, mask):
+        self.calls.append(("disable", self.window.wid))
+
+    def _reset_mask(self):
+        self.calls.append(("reset", self.window.wid))
+
+    def _forget_placement(self):
+        self.calls.append(("forget", self.window.wid))
+
+
+def test_relayout_window_gone():
+    conn = FakeConn()
+    lavinder = type("Lavinder", (), {"conn": conn})
+    relayout = window.Relayout(lavinder, grab=True)
+    one, two = FakeWindow(1, conn.calls), FakeWindow(2, conn.calls)
+
+    def gone():
+        raise xcffib.xproto.WindowError.__new__(xcffib.xproto.WindowError)
+
+    relayout.add(one, [gone, lambda: conn.calls.append("configure 1")], 1)
+    relayout.add(two, [lambda: conn.calls.append("configure 2")], 1)
+    relayout.commit()
+    # the window that went away doesn't stop the others from being placed,
+    # and every mask is restored
+    assert conn.calls == [
+        "grab", ("disable", 1), ("disable", 2), ("forget", 1), "configure 1",
+        "configure 2", ("reset", 1), ("reset", 2), "ungrab", "flush",
+    ]
+
+
+def test_relayout_aborted():
+    conn = FakeConn()
+    lavinder = type("Lavinder", (), {"conn": conn})
+    relayout = window.Relayout(lavinder)
+    one, two = FakeWindow(1, conn.calls), FakeWindow(2, conn.calls)
+
+    def broken():
+        raise RuntimeError
+
+    relayout.add(one, [lambda: conn.calls.append("configure 1")])
+    relayout.add(two, [broken])
+    with pytest.raises(RuntimeError):
+        relayout.commit()
+    # the window whose requests may not have gone out is placed from
+    # scratch the next time
+    assert conn.calls == ["configure 1", ("forget", 2), "flush"]
+
+
+def test_relayout_deferred():
+    conn = FakeConn()
+    lavinder = type("Lavinder", (), {"conn": conn})
+    relayout = window.Relayout(lavinder)
+    relayout.defer(lambda: conn.calls.append("focus"))
+    relayout.add(FakeWindow(1, conn.calls), [lambda: conn.calls.append("configure 1")])
+    relayout.commit()
+    assert conn.calls == ["configure 1", "flush", "focus"]
@@ -65,3 +65,39 @@ def test_masks():
 def test_translate_masks():
     assert xcbq.translate_masks(["shift", "control"])
     assert xcbq.translate_masks([]) == 0
+
+
+def test_prefetch(xdisplay):
+    conn = xcbq.Connection(xdisplay)
+    win = conn.create_window(1, 2, 640, 480)
+    win.set_property("_NET_WM_NAME", "one")
+    # intern all the atoms first
+    win.prefetch(xcbq.MANAGE_PROPERTIES)
+    win.clear_prefetch()
+
+    round_trips = conn.round_trips
+    sent = win.prefetch(xcbq.MANAGE_PROPERTIES, attributes=True, geometry=True)
+    assert sent == len(xcbq.MANAGE_PROPERTIES) + 2
+    assert win.prefetch(xcbq.MANAGE_PROPERTIES) == 0
+    assert win.get_name() == "one"
+    assert win.get_geometry().width == 640
+    assert win.get_attributes().override_redirect == 0
+    assert win.get_wm_class() == tuple()
+    assert conn.round_trips == round_trips
+
+    # setting a property drops its prefetched value
+    win.set_property("_NET_WM_NAME", "two")
+    assert win.get_name() == "two"
+    assert conn.round_trips == round_trips + 1
+
+    win.clear_prefetch()
+    win.get_geometry()
+    assert conn.round_trips == round_trips + 2
+
+
+def test_atom_cache(xdisplay):
+    conn = xcbq.Connection(xdisplay)
+    for name in xcbq.PropertyMap:
+        assert name in conn.atoms.atoms
+    # everything is interned in a single round trip
+    assert conn.round_trips == 1
@@ -0,0 +1,56 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import random
+
+from liblavinder.widget import graph
+
+
+def test_samples():
+    samples = graph._Samples(5)
+    legacy = [0] * 5
+    rnd = random.Random(0)
+    for _ in range(500):
+        value = rnd.choice([0, 50, rnd.random() * 100])
+        count = rnd.choice([0, 1, 1, 2, 5])
+        samples.push(value, count)
+        legacy = ([value] * count + legacy)[:5]
+        assert samples.max == max(legacy)
+        assert samples.latest == legacy[0]
+        assert samples.oldest_first().tolist() == legacy[::-1]
+
+    samples.fill(3)
+    assert samples.max == 3
+    assert samples.oldest_first().tolist() == [3] * 5
+
+
+def test_graph_push(monkeypatch):
+    monkeypatch.setattr(graph._Graph, "draw", lambda self: None)
+    g = graph._Graph(samples=4)
+    g.lag_cycles = 1
+    for value in (1, 5, 2, 3, 4):
+        g.push(value)
+    assert g.values == [4, 3, 2, 5]
+    assert g.maxvalue == 5
+    g.push(1)
+    assert g.maxvalue == 4
+
+    # lag is made up for by repeating the sample
+    g.lag_cycles = 2
+    g.push(2)
+    assert g.values == [2, 2, 1, 4]
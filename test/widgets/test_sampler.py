@@ -0,0 +1,137 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from liblavinder.widget import sampler
+
+NET_DEV = """\
+Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets ...
+    lo:  1000      10    0    0    0     0          0         0     1000      10    0    0    0     0       0          0
+  eth0: 20000     200    0    0    0     0          0         0     3000      30    0    0    0     0       0          0
+"""
+
+
+class FakeLavinder:
+    def __init__(self):
+        self.timers = []
+
+    def call_later(self, delay, func, *args):
+        handle = FakeHandle(delay, func, args)
+        self.timers.append(handle)
+        return handle
+
+
+class FakeHandle:
+    def __init__(self, delay, func, args):
+        self.delay, self.func, self.args = delay, func, args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        self.func(*self.args)
+
+
+def test_parse():
+    assert sampler.parse_net_dev(NET_DEV) == {"lo": (1000, 1000), "eth0": (20000, 3000)}
+    stat = "cpu  1 2 3 4 5\ncpu0 1 2 3 4 5\nintr 5\n"
+    assert sampler.parse_stat(stat) == {"cpu": [1, 2, 3, 4, 5], "cpu0": [1, 2, 3, 4, 5]}
+    meminfo = "MemTotal:  2000 kB\nMemFree:  1000 kB\n"
+    assert sampler.parse_meminfo(meminfo) == {"MemTotal": 2000, "MemFree": 1000}
+
+
+def test_proc_file(tmpdir):
+    path = tmpdir.join("stat")
+    path.write("1")
+    source = sampler.ProcFile(str(path), sampler.parse_int)
+    assert source() == 1
+    path.write("22")
+    assert source() == 22
+    assert source.reads == 2
+    source.close()
+
+
+def test_shared_read(tmpdir):
+    path = tmpdir.join("counter")
+    path.write("1")
+    s = sampler.Sampler()
+    source = s.source(str(path), sampler.parse_int)
+    assert s.source(str(path), sampler.parse_int) is source
+
+    lavinder = FakeLavinder()
+    seen = []
+
+    def one():
+        seen.append(("one", s.read(source)))
+
+    def two():
+        seen.append(("two", s.read(source)))
+
+    s.subscribe(lavinder, source, 1, one)
+    s.subscribe(lavinder, source, 1, two)
+    assert len(lavinder.timers) == 1
+
+    path.write("5")
+    lavinder.timers.pop().run()
+    assert seen == [("one", 5), ("two", 5)]
+    assert source.reads == 1
+    # the next tick is scheduled
+    assert len(lavinder.timers) == 1
+
+    s.unsubscribe(source, 1, one)
+    s.unsubscribe(source, 1, two)
+    assert lavinder.timers[0].cancelled
+
+
+def test_read_error(tmpdir):
+    s = sampler.Sampler()
+    source = s.source(str(tmpdir.join("missing")), sampler.parse_int)
+    lavinder = FakeLavinder()
+    errors = []
+
+    def callback():
+        try:
+            s.read(source)
+        except IOError:
+            errors.append(True)
+
+    s.subscribe(lavinder, source, 1, callback)
+    lavinder.timers.pop().run()
+    assert errors == [True]
+
+
+def test_parse_error(tmpdir):
+    path = tmpdir.join("stat")
+    path.write("unexpected")
+    s = sampler.Sampler()
+    source = s.source(str(path), lambda data: data.split()[5])
+    lavinder = FakeLavinder()
+    errors = []
+
+    def callback():
+        try:
+            s.read(source)
+        except IndexError:
+            errors.append(True)
+
+    s.subscribe(lavinder, source, 1, callback)
+    lavinder.timers.pop().run()
+    assert errors == [True]
+    # the widgets at this interval keep being updated
+    assert len(lavinder.timers) == 1
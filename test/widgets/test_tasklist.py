@@ -0,0 +1,109 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from liblavinder.widget import tasklist
+
+
+class FakeWin:
+    def __init__(self, wid):
+        self.wid = wid
+
+
+class FakeWindow:
+    def __init__(self, group, wid, name):
+        self.group = group
+        self.horizontal = True
+        self.window = FakeWin(wid)
+        self.name = name
+        self.minimized = False
+        self.maximized = False
+        self.floating = False
+        self.icons = {}
+
+
+class FakeGroup:
+    def __init__(self):
+        self.windows = []
+        self.current_window = None
+
+
+class FakeBar:
+    def __init__(self, group):
+        self.screen = self
+        self.group = group
+        self.horizontal = True
+
+
+def make_tasklist(monkeypatch, count, **config):
+    group = FakeGroup()
+    group.windows = [FakeWindow(group, i, "window %d" % i) for i in range(count)]
+    group.current_window = group.windows[0]
+    widget = tasklist.TaskList(**config)
+    widget.bar = FakeBar(group)
+    widget.length = 10000
+    widget.measured = []
+
+    def box_width(text):
+        widget.measured.append(text)
+        return len(text)
+    monkeypatch.setattr(widget, "box_width", box_width)
+    return widget, group
+
+
+def test_focus_change_reuses_widths(monkeypatch):
+    widget, group = make_tasklist(monkeypatch, 50, icon_size=0)
+    widths = [w for _, _, _, w in widget.calc_box_widths()]
+    assert len(widget.measured) == 50
+
+    del widget.measured[:]
+    group.current_window = group.windows[10]
+    assert [w for _, _, _, w in widget.calc_box_widths()] == widths
+    assert widget.measured == []
+
+    # only the windows that changed are measured again
+    group.windows[3].name = "renamed"
+    group.windows[4].floating = True
+    list(widget.calc_box_widths())
+    assert widget.measured == ["renamed", "V window 4"]
+
+
+def test_focus_markup(monkeypatch):
+    widget, group = make_tasklist(
+        monkeypatch, 3, icon_size=0, markup_focused="<b>{}</b>",
+    )
+    list(widget.calc_box_widths())
+    del widget.measured[:]
+    group.current_window = group.windows[1]
+    list(widget.calc_box_widths())
+    # the windows losing and gaining focus
+    assert len(widget.measured) == 2
+
+
+def test_task_cache_hooks(monkeypatch):
+    widget, group = make_tasklist(monkeypatch, 2, icon_size=0)
+    monkeypatch.setattr(widget, "update", lambda window=None: None)
+    list(widget.calc_box_widths())
+    window = group.windows[1]
+
+    widget.invalidate_task(window)
+    del widget.measured[:]
+    list(widget.calc_box_widths())
+    assert widget.measured == ["window 1"]
+
+    widget.remove_caches(window)
+    assert 1 not in widget._tasks_cache